@@ -0,0 +1,73 @@
+'''
+Shared setup of the standalone benchmarks: settings defaults, so importing
+the app packages needs no .env, and a RedisDataManager on a local Redis or
+on fakeredis with a counted (and optionally delayed) round trip
+'''
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+# importing the article package reads the settings, nothing connects to these
+for name, value in (
+    ("API_KEY", "benchmark"),
+    ("REDIS_HOST", "localhost"),
+    ("REDIS_PORT", "6379"),
+    ("DB_NAME", "articles"),
+    ("DB_PASSWORD", "benchmark"),
+):
+    os.environ.setdefault(name, value)
+
+from loguru import logger  # noqa: E402
+from redis.asyncio import Redis  # noqa: E402
+
+from article.service import RedisDataManager  # noqa: E402
+from article.service.redis import COUNT_VIEW_SCRIPT, CountingConnectionPool  # noqa: E402
+
+
+logger.remove()
+logger.add(sys.stderr, level="WARNING")
+
+
+class RoundTrips:
+    ''' Counts the packets sent to Redis, a pipeline is one packet '''
+    total: int = 0
+    latency: float = 0.0
+
+
+def fake_connection_class():
+    from fakeredis.aioredis import FakeAsyncRedisConnection
+
+    class CountedFakeConnection(FakeAsyncRedisConnection):
+        async def send_packed_command(self, *args, **kwargs):
+            RoundTrips.total += 1
+            if RoundTrips.latency:
+                await asyncio.sleep(RoundTrips.latency)
+            return await super().send_packed_command(*args, **kwargs)
+
+    return CountedFakeConnection
+
+
+def create_redis_man(url: str | None, latency_ms: float = 0.0, **kwargs) -> RedisDataManager:
+    '''
+    A manager on the Redis at url, or on a fresh fakeredis server when url is None.
+    latency_ms is added to every fakeredis round trip to stand in for the network,
+    asyncio.sleep rounds short delays up, so it is an upper bound
+    '''
+    if url is None:
+        import fakeredis
+
+        RoundTrips.latency = latency_ms / 1000
+        redis_man = RedisDataManager("localhost", 6379, 10, **kwargs)
+        redis_man.pool = CountingConnectionPool(
+            connection_class=fake_connection_class(),
+            server=fakeredis.FakeServer(),
+            max_connections=10,
+        )
+    else:
+        redis_man = RedisDataManager("localhost", 6379, 10, **kwargs)
+        redis_man.pool = CountingConnectionPool.from_url(url, max_connections=10)
+    redis_man.client = Redis(connection_pool=redis_man.pool)
+    redis_man.count_view_script = redis_man.client.register_script(COUNT_VIEW_SCRIPT)
+    return redis_man
@@ -0,0 +1,190 @@
+'''
+Plans and timings of the keyset listing page on a large table, against the
+Postgres from the usual .env (DB_* settings):
+
+    python benchmarks/listing_index.py --rows 1000000
+
+The articles are generated in a separate "listing_benchmark" schema with the
+indexes of the model, so the app tables are not touched. For the first, a
+middle and the last page of a day, with and without a category, it runs
+EXPLAIN ANALYZE of PostgresDataManager.articles_page_query and reports the
+scan node, the index and the execution time. The old cast(published_at AS
+date) filter is run too for comparison. --keep leaves the schema for the
+next run, which then skips the seeding
+'''
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import common  # noqa: F401  sets up sys.path and the settings
+import database
+from article.service import PostgresDataManager
+from article.utils import ArticleCursor
+from database import Base
+
+
+SCHEMA = "listing_benchmark"
+# one article every 30 seconds, a million rows cover about a year
+SEED_ROWS = """
+INSERT INTO articles (category, title, description, url, views, published_at, content)
+SELECT
+    (ARRAY['business', 'entertainment', 'general', 'health', 'science', 'sports', 'technology'])[n % 7 + 1],
+    'Title ' || n,
+    'Description ' || n,
+    'https://bench.local/' || n,
+    n % 1000,
+    TIMESTAMP '2025-10-01' + (n * INTERVAL '30 seconds'),
+    'Content ' || n
+FROM generate_series(CAST(:start AS integer), CAST(:stop AS integer)) AS n
+"""
+OLD_PAGE = """
+SELECT id, title, category, views, published_at FROM articles
+WHERE CAST(published_at AS DATE) = CAST(:day AS DATE) {category}
+ORDER BY published_at DESC, id DESC LIMIT :limit
+"""
+
+
+async def seed(engine, rows: int, batch_size: int) -> None:
+    async with engine.begin() as connection:
+        count = await connection.scalar(
+            text(
+                "SELECT count(*) FROM information_schema.tables "
+                "WHERE table_schema = :schema AND table_name = 'articles'"
+            ),
+            {"schema": SCHEMA},
+        )
+        if count and await connection.scalar(text("SELECT count(*) FROM articles")) == rows:
+            print(f"{rows} rows are already seeded")
+            return
+        await connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await connection.run_sync(Base.metadata.create_all)
+    started_at = time.perf_counter()
+    for start in range(1, rows + 1, batch_size):
+        async with engine.begin() as connection:
+            await connection.execute(
+                text(SEED_ROWS), {"start": start, "stop": min(rows, start + batch_size - 1)}
+            )
+    async with engine.begin() as connection:
+        await connection.execute(text("VACUUM ANALYZE articles"))
+    print(f"seeded {rows} rows in {time.perf_counter() - started_at:.0f} s")
+
+
+def scan_nodes(plan: dict) -> list[str]:
+    ''' The scan nodes of a JSON plan, with their index '''
+    nodes = []
+    if "Scan" in plan["Node Type"]:
+        index = plan.get("Index Name")
+        nodes.append(f"{plan['Node Type']}" + (f" on {index}" if index else ""))
+    for child in plan.get("Plans", []):
+        nodes.extend(scan_nodes(child))
+    return nodes
+
+
+async def explain(connection, statement: str, params: dict, runs: int) -> tuple[str, float]:
+    ''' Scan nodes of the plan and the median execution time in ms '''
+    timings = []
+    for _ in range(runs):
+        reply = await connection.scalar(
+            text(f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}"), params
+        )
+        plan = (json.loads(reply) if isinstance(reply, str) else reply)[0]
+        timings.append(plan["Execution Time"])
+    return ", ".join(scan_nodes(plan["Plan"])), statistics.median(timings)
+
+
+def compiled(query) -> str:
+    return str(
+        query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    )
+
+
+async def cursor_at(connection, day: date, category: str | None, offset: int) -> str | None:
+    ''' Cursor of the row before the page that starts at offset rows into the day '''
+    if offset == 0:
+        return None
+    row = (
+        await connection.execute(
+            text(
+                "SELECT published_at, id FROM articles "
+                "WHERE published_at >= CAST(:day AS DATE) "
+                "AND published_at < CAST(:day AS DATE) + 1 "
+                + ("AND category = :category " if category else "")
+                + "ORDER BY published_at DESC, id DESC OFFSET :offset LIMIT 1"
+            ),
+            {"day": day, "category": category, "offset": offset - 1},
+        )
+    ).one()
+    return ArticleCursor.encode(ArticleCursor.datetime_to_timestamp(row[0]), row[1])
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = create_async_engine(
+        database.url_connect_db,
+        connect_args={"server_settings": {"search_path": SCHEMA}},
+        isolation_level="AUTOCOMMIT",
+    )
+    try:
+        await seed(engine, args.rows, args.batch_size)
+        async with engine.connect() as connection:
+            first_day, last_day = (
+                await connection.execute(
+                    text("SELECT min(published_at)::date, max(published_at)::date FROM articles")
+                )
+            ).one()
+            # a full day in the middle of the table
+            day_date = first_day + (last_day - first_day) / 2
+            day = f"{day_date:%Y-%m-%d}"
+            print(f"{args.rows} rows, day {day}, pages of {args.limit}, median of {args.runs} runs")
+            print(f"{'listing':<10}{'page':<8}{'ms':>8}  plan")
+            for category in (None, "science"):
+                day_rows = await connection.scalar(
+                    text(
+                        "SELECT count(*) FROM articles WHERE published_at >= CAST(:day AS DATE) "
+                        "AND published_at < CAST(:day AS DATE) + 1"
+                        + (" AND category = :category" if category else "")
+                    ),
+                    {"day": day_date, "category": category},
+                )
+                name = category or "day"
+                last_page = (day_rows - 1) // args.limit * args.limit
+                for page, offset in (
+                    ("first", 0), ("middle", last_page // 2 // args.limit * args.limit), ("last", last_page)
+                ):
+                    cursor = await cursor_at(connection, day_date, category, offset)
+                    query = PostgresDataManager.articles_page_query(
+                        day, category=category, cursor=cursor, limit=args.limit
+                    )
+                    plan, milliseconds = await explain(connection, compiled(query), {}, args.runs)
+                    print(f"{name:<10}{page:<8}{milliseconds:>8.3f}  {plan}")
+                plan, milliseconds = await explain(
+                    connection,
+                    OLD_PAGE.format(category="AND category = :category" if category else ""),
+                    {"day": day_date, "category": category, "limit": args.limit},
+                    args.runs,
+                )
+                print(f"{name:<10}{'old':<8}{milliseconds:>8.3f}  {plan}")
+    finally:
+        if not args.keep:
+            async with engine.begin() as connection:
+                await connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=31, help="one extra row, as the loader reads")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded schema")
+    asyncio.run(main(parser.parse_args()))
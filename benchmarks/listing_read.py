@@ -0,0 +1,113 @@
+'''
+Listing read path against the Postgres from the usual .env: full ORM
+entities (the old path) versus the projected listing rows of
+PostgresDataManager.iter_articles, over one day in keyset batches.
+
+    python benchmarks/listing_read.py --date 2026-10-17 --rounds 5
+
+Reports rows/sec and the bytes of the column values read per row
+'''
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from sqlalchemy import select
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+os.environ.setdefault("API_KEY", "benchmark")
+
+from article import Articles, create_session  # noqa: E402
+from article.service import PostgresDataManager  # noqa: E402
+from article.utils import DateFormatter  # noqa: E402
+from database import engine  # noqa: E402
+
+
+COLUMNS = ("id", "title", "category", "views", "published_at", "description", "content")
+
+
+def value_size(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    # int4 and timestamp are 4 and 8 bytes on the wire
+    return 8
+
+
+async def iter_entities(date_: str, batch_size: int) -> AsyncIterator[list[Articles]]:
+    ''' The read path before the projection: ORM entities through the session '''
+    day_start, day_end = DateFormatter.converting_string_to_day_range(date_)
+    last_id = None
+    while True:
+        async with create_session() as session:
+            query = select(Articles).where(
+                Articles.published_at >= day_start, Articles.published_at < day_end
+            )
+            if last_id is not None:
+                query = query.where(Articles.id < last_id)
+            query = query.order_by(Articles.id.desc()).limit(batch_size)
+            articles = (await session.scalars(query)).all()
+        if not articles:
+            return
+        yield articles
+        last_id = articles[-1].id
+
+
+async def measure(
+    name: str, batches: Callable[[], AsyncIterator[list]], rounds: int
+) -> dict:
+    rows = size = 0
+    started_at = time.perf_counter()
+    for _ in range(rounds):
+        async for batch in batches():
+            rows += len(batch)
+            size += sum(
+                value_size(getattr(row, column, None)) for row in batch for column in COLUMNS
+            )
+    duration = time.perf_counter() - started_at
+    return {
+        "name": name,
+        "rows_per_s": round(rows / duration, 1) if duration else 0.0,
+        "bytes_per_row": round(size / rows, 1) if rows else 0.0,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    postgre_man = PostgresDataManager()
+    cases: list[Callable[[], Awaitable[dict]]] = [
+        lambda: measure(
+            "orm entities", lambda: iter_entities(args.date, args.batch_size), args.rounds
+        ),
+        lambda: measure(
+            "listing rows",
+            lambda: postgre_man.iter_articles(args.date, batch_size=args.batch_size),
+            args.rounds,
+        ),
+        lambda: measure(
+            "listing rows with body",
+            lambda: postgre_man.iter_articles(
+                args.date, batch_size=args.batch_size, with_body=True
+            ),
+            args.rounds,
+        ),
+    ]
+    try:
+        for case in cases:
+            result = await case()
+            print(f"{result['name']:<24}{result['rows_per_s']:>14} rows/s{result['bytes_per_row']:>12} B/row")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--date", default=DateFormatter.converting_date_to_string(1))
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
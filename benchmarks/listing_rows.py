@@ -0,0 +1,87 @@
+'''
+Decoding of the HMGET rows of a listing page, no services needed:
+
+    python benchmarks/listing_rows.py --rows 5000 --rounds 20
+
+Compares the old path (decode every value, one model per row), the current
+one (bytes rows validated by LISTING_ROWS_ADAPTER in one call) and
+model_construct over decoded rows
+'''
+import argparse
+import timeit
+
+import pydantic
+
+import common  # noqa: F401  sets up sys.path and the settings
+from article.schemas import Category, DisplayOnPageArticleSchema
+from article.service.redis import LISTING_ROWS_ADAPTER
+from article.utils import DecodeValues
+
+
+def build_rows(count: int) -> list[list[bytes | None]]:
+    ''' HMGET replies as the pipeline returns them, every 50th hash has expired '''
+    categories = list(Category)
+    rows: list[list[bytes | None]] = []
+    for number in range(count):
+        if number % 50 == 49:
+            rows.append([None, None, None, None])
+            continue
+        rows.append(
+            [
+                str(number).encode(),
+                f"Article title number {number} about markets and policy".encode(),
+                str(categories[number % len(categories)]).encode(),
+                str(number * 7).encode(),
+            ]
+        )
+    return rows
+
+
+def old_path(rows: list[list[bytes | None]]) -> list[DisplayOnPageArticleSchema]:
+    ''' get_listing_rows before the batched validation '''
+    fields = ["id", "title", "category", "views"]
+    return [
+        DisplayOnPageArticleSchema(
+            **{field: row[i].decode("utf-8") for i, field in enumerate(fields)}
+        )
+        for row in rows
+        if row[0] is not None
+    ]
+
+
+def current_path(rows: list[list[bytes | None]]) -> list[DisplayOnPageArticleSchema]:
+    return LISTING_ROWS_ADAPTER.validate_python(DecodeValues.matching_listing_rows(rows))
+
+
+def construct_path(rows: list[list[bytes | None]]) -> list[DisplayOnPageArticleSchema]:
+    fields = DecodeValues.LISTING_FIELDS
+    return [
+        DisplayOnPageArticleSchema.model_construct(
+            **{field: value.decode("utf-8") for field, value in zip(fields, row)}
+        )
+        for row in rows
+        if row[0] is not None
+    ]
+
+
+def main(args: argparse.Namespace) -> None:
+    rows = build_rows(args.rows)
+    cases = {
+        "model per row (old)": old_path,
+        "batched adapter (current)": current_path,
+        "model_construct": construct_path,
+    }
+    print(f"{args.rows} rows, pydantic {pydantic.VERSION}, best of 5")
+    print(f"{'case':<28}{'us / row':>10}")
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(lambda: case(rows), number=args.rounds, repeat=5))
+        print(f"{name:<28}{seconds / args.rounds / args.rows * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    main(parser.parse_args())
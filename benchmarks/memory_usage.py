@@ -0,0 +1,165 @@
+'''
+Redis memory per cached article: the old layout (one hash with description
+and content) against the current one (listing hash plus the BodyCodec value
+in article:body:{id}). Needs a real Redis, fakeredis has no MEMORY USAGE:
+
+    python benchmarks/memory_usage.py --redis-url redis://localhost:6379/15 --articles 100000
+
+Reports MEMORY USAGE of the article keys summed over all articles and the
+used_memory growth of the server, the latter includes the listing sorted sets
+the current writer adds. --listpack-value raises hash-max-listpack-value
+(hash-max-ziplist-value before Redis 7) for the run, so the small hashes keep
+the compact encoding with long titles. Use a spare Redis database, the
+benchmark flushes it
+'''
+import argparse
+import asyncio
+import random
+import string
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from common import create_redis_man
+from article.service import RedisDataManager
+from article.utils import BodyCodec
+
+
+# a few thousand random words, a tiny vocabulary would compress far better than news text
+_WORDS_RNG = random.Random(0)
+WORDS = [
+    "".join(_WORDS_RNG.choices(string.ascii_lowercase, k=_WORDS_RNG.randint(2, 9)))
+    for _ in range(3000)
+]
+
+
+@dataclass
+class Article:
+    id: int
+    title: str
+    category: str
+    description: str
+    views: int
+    published_at: datetime
+    content: str
+
+
+def build_articles(count: int) -> list[Article]:
+    ''' NewsAPI-like sizes: titles of ~70 bytes, descriptions of ~200, content cut at 200 chars '''
+    rng = random.Random(14)
+    categories = ("business", "general", "health", "science", "sports", "technology")
+    day_start = datetime(2026, 10, 17)
+    return [
+        Article(
+            id=number,
+            title=" ".join(rng.choices(WORDS, k=11)).capitalize(),
+            category=categories[number % len(categories)],
+            description=" ".join(rng.choices(WORDS, k=30)),
+            views=rng.randrange(1000),
+            published_at=day_start + timedelta(seconds=rng.randrange(86400)),
+            content=" ".join(rng.choices(WORDS, k=30))[:200] + " [+2400 chars]",
+        )
+        for number in range(1, count + 1)
+    ]
+
+
+async def write_old_layout(redis_man: RedisDataManager, batch: list[Article]) -> None:
+    ''' The cache before the split: every field in article:id:{id} '''
+    async with redis_man.client.pipeline(transaction=False) as pipeline:
+        for article in batch:
+            pipeline.hset(
+                f"article:id:{article.id}",
+                mapping={
+                    "id": article.id,
+                    "title": article.title,
+                    "category": article.category,
+                    "description": article.description,
+                    "views": article.views,
+                    "published_at": f"{article.published_at:%Y-%m-%d %H:%M:%S}",
+                    "content": article.content,
+                },
+            )
+        await pipeline.execute()
+
+
+async def write_current_layout(redis_man: RedisDataManager, batch: list[Article]) -> None:
+    await redis_man.insert_articles(batch, with_body=True)
+
+
+async def memory_of(redis_man: RedisDataManager, articles: list[Article], batch_size: int):
+    ''' Sums MEMORY USAGE of the hash and body keys, counts the hash encodings '''
+    total = 0
+    encodings: Counter[str] = Counter()
+    for start in range(0, len(articles), batch_size):
+        async with redis_man.client.pipeline(transaction=False) as pipeline:
+            for article in articles[start:start + batch_size]:
+                pipeline.memory_usage(f"article:id:{article.id}", samples=0)
+                pipeline.memory_usage(f"article:body:{article.id}", samples=0)
+                pipeline.object("encoding", f"article:id:{article.id}")
+            replies = await pipeline.execute()
+        total += sum(reply or 0 for reply in replies[0::3]) + sum(reply or 0 for reply in replies[1::3])
+        encodings.update(
+            (reply.decode() if isinstance(reply, bytes) else str(reply)) for reply in replies[2::3]
+        )
+    return total, encodings
+
+
+async def measure(name, redis_man, writer, articles, batch_size) -> None:
+    await redis_man.client.flushdb()
+    used_before = (await redis_man.client.info("memory"))["used_memory"]
+    for start in range(0, len(articles), batch_size):
+        await writer(redis_man, articles[start:start + batch_size])
+    used_after = (await redis_man.client.info("memory"))["used_memory"]
+    keys_bytes, encodings = await memory_of(redis_man, articles, batch_size)
+    print(
+        f"{name:<22}{keys_bytes / len(articles):>16.1f}{(used_after - used_before) / 2**20:>18.1f}"
+        f"  {', '.join(f'{encoding}: {count}' for encoding, count in encodings.most_common())}"
+    )
+
+
+async def set_listpack_value(redis_man: RedisDataManager, value: int) -> tuple[str, str]:
+    ''' Sets the hash value limit of the compact encoding, returns (name, old value) '''
+    for name in ("hash-max-listpack-value", "hash-max-ziplist-value"):
+        current = await redis_man.client.config_get(name)
+        if current:
+            await redis_man.client.config_set(name, value)
+            return name, current[name]
+    raise RuntimeError("Redis has no hash value limit setting")
+
+
+async def main(args: argparse.Namespace) -> None:
+    redis_man = create_redis_man(args.redis_url)
+    restore = None
+    if args.listpack_value:
+        restore = await set_listpack_value(redis_man, args.listpack_value)
+    articles = build_articles(args.articles)
+    server = await redis_man.client.info("server")
+    codec = "zstd" if BodyCodec.encode("", "")[:1] == BodyCodec.ZSTD else "zlib"
+    print(
+        f"{args.articles} articles, Redis {server['redis_version']}, body codec {codec}, "
+        f"compression level {redis_man.compression_level}"
+    )
+    if restore:
+        print(f"{restore[0]} {args.listpack_value} (was {restore[1]})")
+    print(f"{'layout':<22}{'B / article':>16}{'used_memory MB':>18}  hash encoding")
+    try:
+        await measure("one hash (old)", redis_man, write_old_layout, articles, args.batch_size)
+        await measure(
+            "hash + body (current)", redis_man, write_current_layout, articles, args.batch_size
+        )
+    finally:
+        await redis_man.client.flushdb()
+        if restore:
+            await redis_man.client.config_set(*restore)
+        await redis_man.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--redis-url", required=True, help="a real Redis, MEMORY USAGE is needed")
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--listpack-value", type=int, default=0, help="e.g. 256, server default when 0")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,121 @@
+'''
+Redis cache writer: the old per-article writer (HSET and two SADD, each
+awaited) against RedisDataManager.insert_articles (one MULTI/EXEC pipeline
+per batch, with TTLs).
+
+    python benchmarks/redis_writer.py --articles 500 --latency-ms 0.2
+    python benchmarks/redis_writer.py --redis-url redis://localhost:6379/15
+
+Without --redis-url the writers run on fakeredis and --latency-ms is added
+to every round trip to stand in for the network. Use a spare Redis database,
+the benchmark flushes it
+'''
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from common import RoundTrips, create_redis_man
+from article.service import RedisDataManager
+
+
+@dataclass
+class Article:
+    id: int
+    title: str
+    category: str
+    description: str
+    views: int
+    published_at: datetime
+    content: str
+
+
+def build_articles(count: int) -> list[Article]:
+    categories = ("business", "general", "health", "science", "sports", "technology")
+    day_start = datetime(2026, 10, 17)
+    return [
+        Article(
+            id=number,
+            title=f"Article title number {number}",
+            category=categories[number % len(categories)],
+            description="Short description of the article " * 4,
+            views=number % 100,
+            published_at=day_start + timedelta(seconds=number * 17 % 86400),
+            content="Body text of the article " * 40,
+        )
+        for number in range(1, count + 1)
+    ]
+
+
+async def old_writer(redis_man: RedisDataManager, articles: list[Article]) -> None:
+    ''' The writer before the pipeline: three awaited commands per article, no TTL '''
+    client = redis_man.client
+    for article in articles:
+        published_at = f"{article.published_at:%Y-%m-%d}"
+        await client.hset(
+            f"article:id:{article.id}",
+            mapping={
+                "id": article.id,
+                "title": article.title,
+                "category": article.category,
+                "description": article.description,
+                "views": article.views,
+                "published_at": published_at,
+                "content": article.content,
+            },
+        )
+        await client.sadd(f"article:date:{published_at}", f"article:id:{article.id}")
+        await client.sadd(f"article:category:{article.category}", f"article:id:{article.id}")
+
+
+async def measure(name, redis_man, writer, articles, rounds) -> None:
+    durations = []
+    trips_before = RoundTrips.total
+    for _ in range(rounds):
+        await redis_man.client.flushdb()
+        started_at = time.perf_counter()
+        await writer(articles)
+        durations.append(time.perf_counter() - started_at)
+    # one flushdb per round, a real Redis is not counted
+    trips = (RoundTrips.total - trips_before - rounds) / rounds
+    durations.sort()
+    trips_column = f"{trips:>12.0f}" if trips >= 0 else f"{'-':>12}"
+    print(f"{name:<22}{durations[len(durations) // 2] * 1000:>14.2f}{trips_column}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    redis_man = create_redis_man(args.redis_url, latency_ms=args.latency_ms)
+    articles = build_articles(args.articles)
+    await redis_man.client.ping()
+    print(f"{args.articles} articles, median of {args.rounds} rounds")
+    print(f"{'writer':<22}{'ms / batch':>14}{'round trips':>12}")
+    try:
+        await measure(
+            "per-article awaits",
+            redis_man,
+            lambda batch: old_writer(redis_man, batch),
+            articles,
+            args.rounds,
+        )
+        await measure(
+            "pipeline (current)",
+            redis_man,
+            lambda batch: redis_man.insert_articles(batch, with_body=True),
+            articles,
+            args.rounds,
+        )
+    finally:
+        await redis_man.client.flushdb()
+        await redis_man.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--articles", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--redis-url", default=None, help="a local Redis, fakeredis by default")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="fakeredis round trip delay")
+    asyncio.run(main(parser.parse_args()))
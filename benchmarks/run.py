@@ -0,0 +1,359 @@
+'''
+Benchmark harness: boots the FastAPI app in-process against the Postgres and
+Redis from the usual .env, feeds it from the local stub NewsAPI and drives
+the scenarios with concurrent clients. Results go to benchmarks/results/<label>.json,
+files of two commits can be diffed directly.
+
+    python benchmarks/run.py --clients 20 --requests 2000 --label before
+
+Scenarios:
+    cold_listing   - caches are dropped before every round of `clients` requests,
+                     so each round fills the listing from Postgres
+    warm_listing   - listings of all categories with warm caches
+    detail         - detail pages of random seeded articles
+    view_increment - detail pages of a few hot articles, then one view flush
+    large_listing_buffered, large_listing_streaming
+                   - the whole of yesterday as one page of --large-page rows with
+                     caches dropped, rendered buffered and then streamed.
+                     A 10k-article day is --articles 1500
+
+Every scenario reports the time to the first body byte (ttfb_ms), the
+resident set size of the process before the timed rounds and its peak during
+them (rss_before_mb, peak_rss_mb, sampled every 5 ms from /proc on Linux),
+and the peak of the Python heap during one extra round of requests
+(peak_traced_mb). That round runs under tracemalloc after the timed ones, so
+the tracing does not slow the latencies. The clients drop the body chunks as
+they arrive, so the peaks are the app's own. The allocator keeps freed memory
+for reuse, so a scenario after a hungrier one shows a lower RSS peak than it
+would on its own. To compare the RSS of two scenarios, run each in a fresh
+process with --scenarios:
+
+    python benchmarks/run.py --articles 1500 --scenarios large_listing_buffered
+    python benchmarks/run.py --articles 1500 --scenarios large_listing_streaming
+'''
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import aiohttp
+import uvicorn
+from sqlalchemy import event
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+sys.path.insert(0, str(SRC))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+# templates and static files are resolved relative to src
+os.chdir(SRC)
+os.environ.setdefault("API_KEY", "benchmark")
+
+from stub_newsapi import start_stub  # noqa: E402
+from core import settings  # noqa: E402
+from article.schemas import Category  # noqa: E402
+from article.utils import DateFormatter  # noqa: E402
+from database import engine  # noqa: E402
+
+
+CATEGORIES = [str(category) for category in Category]
+SCENARIOS = (
+    "cold_listing",
+    "warm_listing",
+    "detail",
+    "view_increment",
+    "large_listing_buffered",
+    "large_listing_streaming",
+)
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int = 0
+    errors: int = 0
+    duration: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    ttfbs: list[float] = field(default_factory=list)
+    peak_traced_mb: float = 0.0
+    rss_before_mb: float | None = None
+    peak_rss_mb: float | None = None
+    db_queries: int = 0
+    redis_connections: int = 0
+    extra: dict = field(default_factory=dict)
+
+    @staticmethod
+    def percentile(values: list[float], share: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+    def to_dict(self) -> dict:
+        requests = self.requests or 1
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "duration_s": round(self.duration, 3),
+            "throughput_rps": round(self.requests / self.duration, 1) if self.duration else 0.0,
+            "latency_ms": {
+                name: round(self.percentile(self.latencies, share) * 1000, 3)
+                for name, share in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+            },
+            "ttfb_ms": {
+                name: round(self.percentile(self.ttfbs, share) * 1000, 3)
+                for name, share in (("p50", 0.5), ("p95", 0.95))
+            },
+            "rss_before_mb": self.rss_before_mb,
+            "peak_rss_mb": self.peak_rss_mb,
+            "peak_traced_mb": self.peak_traced_mb,
+            "db_queries_per_request": round(self.db_queries / requests, 3),
+            "redis_connections_per_request": round(self.redis_connections / requests, 3),
+            **self.extra,
+        }
+
+
+class RssSampler(threading.Thread):
+    ''' Keeps the peak resident set size of this process, sampled every interval seconds '''
+    def __init__(self, interval: float = 0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = 0
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def current() -> int | None:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            return None
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            self.peak = max(self.peak, self.current() or 0)
+            self._stopped.wait(self.interval)
+
+    def stop(self) -> float | None:
+        ''' The peak in MB, None where /proc is not available '''
+        self._stopped.set()
+        self.join()
+        return round(self.peak / 2**20, 1) if self.peak else None
+
+
+class Harness:
+    def __init__(self, app, base_url: str, clients: int, seed: int):
+        self.app = app
+        self.base_url = base_url
+        self.clients = clients
+        self.rng = random.Random(seed)
+        self.db_queries = 0
+        self.article_ids: list[int] = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._count_query)
+
+    def _count_query(self, *args) -> None:
+        self.db_queries += 1
+
+    async def seed(self) -> None:
+        ''' Ingests yesterday from the stub, the run is idempotent thanks to ON CONFLICT '''
+        await self.app.state.ingestion_worker.run_once()
+        day = DateFormatter.converting_date_to_string(1)
+        async for articles in self.app.state.postgre_man.iter_articles(day):
+            self.article_ids.extend(article.id for article in articles)
+
+    async def drop_caches(self) -> None:
+        state = self.app.state
+        state.page_cache._pages.clear()
+        state.article_loader.snapshots.clear()
+        state.detail_cache.l1.clear()
+        client = state.redis_man.client
+        keys = [
+            key for pattern in ("article:date:*", "article:category:*", "article:fresh:*")
+            async for key in client.scan_iter(match=pattern)
+        ]
+        if keys:
+            await client.delete(*keys)
+
+    async def drive(
+        self,
+        name: str,
+        paths: Callable[[], str],
+        total: int,
+        before_round: Callable[[], Awaitable[None]] | None = None,
+    ) -> ScenarioResult:
+        '''
+        Sends total requests from `clients` concurrent clients, round by round,
+        then one more round under tracemalloc for the memory peak
+        '''
+        result = ScenarioResult(name)
+        pool = self.app.state.redis_man.pool
+        async with aiohttp.ClientSession(base_url=self.base_url) as session:
+
+            async def one_request(path: str, timed: bool = True) -> None:
+                started_at = time.perf_counter()
+                try:
+                    async with session.get(path) as response:
+                        await response.content.readany()
+                        ttfb = time.perf_counter() - started_at
+                        async for _ in response.content.iter_any():
+                            pass
+                        if response.status >= 400:
+                            result.errors += 1
+                except aiohttp.ClientError:
+                    result.errors += 1
+                    return
+                if timed:
+                    result.ttfbs.append(ttfb)
+                    result.latencies.append(time.perf_counter() - started_at)
+
+            rss_before = RssSampler.current()
+            result.rss_before_mb = round(rss_before / 2**20, 1) if rss_before else None
+            sampler = RssSampler()
+            sampler.start()
+            started_at = time.perf_counter()
+            for _ in range(0, total, self.clients):
+                if before_round is not None:
+                    paused_at = time.perf_counter()
+                    await before_round()
+                    started_at += time.perf_counter() - paused_at
+                db_before, pool_before = self.db_queries, pool.acquired_total
+                await asyncio.gather(*[one_request(paths()) for _ in range(self.clients)])
+                result.db_queries += self.db_queries - db_before
+                result.redis_connections += pool.acquired_total - pool_before
+                result.requests += self.clients
+            result.duration = time.perf_counter() - started_at
+            result.peak_rss_mb = sampler.stop()
+
+            if before_round is not None:
+                await before_round()
+            tracemalloc.start()
+            try:
+                await asyncio.gather(
+                    *[one_request(paths(), timed=False) for _ in range(self.clients)]
+                )
+                result.peak_traced_mb = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            finally:
+                tracemalloc.stop()
+        return result
+
+    async def run(
+        self, total: int, large_page: int, scenarios: list[str] | None = None
+    ) -> dict[str, dict]:
+        ''' Runs the given scenarios (all by default) in their usual order '''
+        listing_paths = ["/articles/all", *[f"/articles/{category}" for category in CATEGORIES]]
+        hot_ids = self.rng.sample(self.article_ids, min(10, len(self.article_ids)))
+        results = []
+
+        async def scenario(name: str, *args, **kwargs) -> ScenarioResult | None:
+            if scenarios is not None and name not in scenarios:
+                return None
+            result = await self.drive(name, *args, **kwargs)
+            results.append(result)
+            return result
+
+        await scenario(
+            "cold_listing", lambda: "/articles/all", total, before_round=self.drop_caches
+        )
+        await scenario("warm_listing", lambda: self.rng.choice(listing_paths), total)
+        await scenario(
+            "detail", lambda: f"/articles/about/{self.rng.choice(self.article_ids)}", total
+        )
+        view_increment = await scenario(
+            "view_increment", lambda: f"/articles/about/{self.rng.choice(hot_ids)}", total
+        )
+        if view_increment is not None:
+            flush_started_at = time.perf_counter()
+            view_increment.extra["flushed_views"] = await self.app.state.view_counter.flush()
+            view_increment.extra["flush_s"] = round(time.perf_counter() - flush_started_at, 4)
+        # a whole day per request, a tenth of the requests keeps the run short
+        for mode, streaming in (("buffered", False), ("streaming", True)):
+            settings.pages.streaming = streaming
+            await scenario(
+                f"large_listing_{mode}",
+                lambda: f"/articles/all?limit={large_page}",
+                max(self.clients, total // 10),
+                before_round=self.drop_caches,
+            )
+        return {result.name: result.to_dict() for result in results}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main(args: argparse.Namespace) -> Path:
+    stub = await start_stub(port=args.stub_port, articles_per_category=args.articles)
+    settings.newsapi.url = f"http://127.0.0.1:{args.stub_port}/v2/everything"
+    settings.newsapi.rate_limit = 1000.0
+    settings.ingestion.in_app = False
+    settings.logging.level = "WARNING"
+    # the page size limit is bound into the routes on import
+    settings.pagination.max_page_size = max(settings.pagination.max_page_size, args.large_page)
+
+    from main import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning")
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    try:
+        harness = Harness(app, f"http://127.0.0.1:{args.port}", args.clients, args.seed)
+        await harness.seed()
+        scenarios = await harness.run(args.requests, args.large_page, args.scenarios)
+    finally:
+        server.should_exit = True
+        await server_task
+        await stub.cleanup()
+
+    revision = git_revision()
+    report = {
+        "revision": revision,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": vars(args),
+        "scenarios": scenarios,
+    }
+    output = Path(args.output) / f"{args.label or revision}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--clients", type=int, default=10, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--articles", type=int, default=100, help="stub articles per category")
+    parser.add_argument(
+        "--large-page", type=int, default=10000, help="page size of the large_listing scenarios"
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", default=None, choices=SCENARIOS, help="all by default"
+    )
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--stub-port", type=int, default=8099)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default=None, help="result file name, the git revision by default")
+    parser.add_argument("--output", default=str(Path(__file__).resolve().parent / "results"))
+    args = parser.parse_args()
+
+    print(f"Результаты записаны в {asyncio.run(main(args))}")
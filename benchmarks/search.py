@@ -0,0 +1,193 @@
+'''
+Latency of PostgresDataManager.search_articles on a large corpus, against
+the Postgres from the usual .env (DB_* settings):
+
+    python benchmarks/search.py --rows 1000000 --queries 2000 --concurrency 10
+
+The articles are generated in a separate "search_benchmark" schema, so the
+app tables are not touched. Words follow a skewed distribution, so common
+terms match hundreds of thousands of rows and rare ones a few hundred.
+Reports p50/p95/p99 per query kind. --keep leaves the schema for the next
+run, which then skips the seeding
+'''
+import argparse
+import asyncio
+import random
+import string
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import common  # noqa: F401  sets up sys.path and the settings
+import database
+from core import settings
+from article.service import PostgresDataManager
+from database import Base
+
+
+SCHEMA = "search_benchmark"
+VOCABULARY_SIZE = 20000
+
+CATEGORIES = ("business", "entertainment", "general", "health", "science", "sports", "technology")
+COLUMNS = ("category", "title", "description", "url", "views", "published_at", "content")
+
+
+def build_vocabulary() -> list[str]:
+    rng = random.Random(16)
+    words: set[str] = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))))
+    # set order changes between processes, the vocabulary must not
+    vocabulary = sorted(words)
+    rng.shuffle(vocabulary)
+    return vocabulary
+
+
+def word_frequency_rank(fraction: float) -> int:
+    ''' Vocabulary index below which the given fraction of word draws falls '''
+    return int(fraction ** 3 * VOCABULARY_SIZE)
+
+
+def build_queries(vocabulary: list[str], count: int) -> list[tuple[str, str]]:
+    rng = random.Random(61)
+    kinds = {
+        # about a tenth of all draws hit the first ~20 words
+        "common word": lambda: rng.choice(vocabulary[:word_frequency_rank(0.1)]),
+        "mid word": lambda: rng.choice(vocabulary[word_frequency_rank(0.5):word_frequency_rank(0.6)]),
+        "rare word": lambda: rng.choice(vocabulary[word_frequency_rank(0.95):]),
+        "two words": lambda: " ".join(rng.sample(vocabulary[word_frequency_rank(0.3):word_frequency_rank(0.6)], 2)),
+    }
+    names = list(kinds)
+    return [(name, kinds[name]()) for name in (names[number % len(names)] for number in range(count))]
+
+
+async def seed(engine, rows: int, batch_size: int) -> None:
+    async with engine.begin() as connection:
+        count = await connection.scalar(
+            text(
+                "SELECT count(*) FROM information_schema.tables "
+                "WHERE table_schema = :schema AND table_name = 'articles'"
+            ),
+            {"schema": SCHEMA},
+        )
+        if count and await connection.scalar(text("SELECT count(*) FROM articles")) == rows:
+            print(f"{rows} rows are already seeded")
+            return
+        await connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await connection.run_sync(Base.metadata.create_all)
+    vocabulary = build_vocabulary()
+    rng = random.Random(1)
+    # random()^3 favours the first words, so word frequencies are skewed like in text
+    draws = [vocabulary[int(rng.random() ** 3 * VOCABULARY_SIZE)] for _ in range(1 << 16)]
+
+    def words(count: int) -> str:
+        start = rng.randrange(len(draws) - count)
+        return " ".join(draws[start:start + count])
+
+    started_at = time.perf_counter()
+    for start in range(1, rows + 1, batch_size):
+        records = [
+            (
+                CATEGORIES[number % len(CATEGORIES)],
+                words(10)[:150],
+                words(30)[:300],
+                f"https://bench.local/{number}",
+                number % 1000,
+                datetime(2026, 1, 1) + timedelta(seconds=number * 20),
+                words(35),
+            )
+            for number in range(start, min(rows, start + batch_size - 1) + 1)
+        ]
+        async with engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            # COPY fills the generated search_vector like any insert
+            await raw_connection.driver_connection.copy_records_to_table(
+                "articles", records=records, columns=COLUMNS, schema_name=SCHEMA
+            )
+    async with engine.begin() as connection:
+        await connection.execute(text("VACUUM ANALYZE articles"))
+    print(f"seeded {rows} rows in {time.perf_counter() - started_at:.0f} s")
+
+
+async def run_queries(
+    postgre_man: PostgresDataManager,
+    queries: list[tuple[str, str]],
+    concurrency: int,
+    limit: int,
+    candidates: int,
+) -> dict[str, list[float]]:
+    durations: dict[str, list[float]] = {}
+    pending = list(queries)
+
+    async def client() -> None:
+        while pending:
+            kind, query_text = pending.pop()
+            started_at = time.perf_counter()
+            await postgre_man.search_articles(query_text, limit=limit, candidates=candidates)
+            durations.setdefault(kind, []).append(time.perf_counter() - started_at)
+
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return durations
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = create_async_engine(
+        database.url_connect_db,
+        pool_size=args.concurrency,
+        connect_args={"server_settings": {"search_path": SCHEMA}},
+    )
+    # create_session of the app reads this module attribute
+    database.async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    postgre_man = PostgresDataManager()
+    try:
+        await seed(engine.execution_options(isolation_level="AUTOCOMMIT"), args.rows, args.batch_size)
+        queries = build_queries(build_vocabulary(), args.queries)
+        # warms the index pages and the connection pool
+        await run_queries(
+            postgre_man, queries[: args.concurrency * 4], args.concurrency, args.limit, args.candidates
+        )
+        durations = await run_queries(
+            postgre_man, queries, args.concurrency, args.limit, args.candidates
+        )
+        print(
+            f"{args.rows} rows, {args.queries} queries, {args.concurrency} concurrent, "
+            f"first page of {args.limit}, {args.candidates} ranked candidates"
+        )
+        print(f"{'query':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for kind, values in durations.items():
+            print(
+                f"{kind:<14}"
+                + "".join(f"{percentile(values, fraction) * 1000:>10.1f}" for fraction in (0.5, 0.95, 0.99))
+            )
+        every = [value for values in durations.values() for value in values]
+        print(
+            f"{'all':<14}"
+            + "".join(f"{percentile(every, fraction) * 1000:>10.1f}" for fraction in (0.5, 0.95, 0.99))
+        )
+    finally:
+        if not args.keep:
+            async with engine.begin() as connection:
+                await connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=21, help="one extra row, as the endpoint reads")
+    parser.add_argument("--candidates", type=int, default=settings.search.rank_candidates)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded schema")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,68 @@
+'''
+Serialization cost of the JSON API per 1k articles, no services needed:
+
+    python benchmarks/serialization.py --articles 1000 --rounds 200
+
+Compares ArticleSchema.model_dump_json per article (the default pydantic
+path) with a TypeAdapter dump of the whole list and with JsonCodec (orjson
+over the selected fields), for full articles and for listing fields
+'''
+import argparse
+import timeit
+
+import orjson
+import pydantic
+from pydantic import TypeAdapter
+
+import common  # noqa: F401  sets up sys.path and the settings
+from article.schemas import ArticleSchema, Category
+from article.utils import JsonCodec
+
+
+def build_articles(count: int) -> list[ArticleSchema]:
+    categories = list(Category)
+    return [
+        ArticleSchema(
+            id=number,
+            category=categories[number % len(categories)],
+            title=f"Article title number {number} about markets and policy",
+            description="Short description of the article " * 4,
+            views=number * 7,
+            published_at="2026-10-17 12:00:00",
+            content="Body text of the article with some length " * 40,
+        )
+        for number in range(count)
+    ]
+
+
+def main(args: argparse.Namespace) -> None:
+    articles = build_articles(args.articles)
+    adapter = TypeAdapter(list[ArticleSchema])
+    cases = {
+        "model_dump_json per article": lambda: b"[" + b",".join(
+            article.model_dump_json().encode() for article in articles
+        ) + b"]",
+        "TypeAdapter.dump_json": lambda: adapter.dump_json(articles),
+        "JsonCodec all fields": lambda: JsonCodec.dump_page(articles, JsonCodec.DETAIL_FIELDS),
+        "JsonCodec listing fields": lambda: JsonCodec.dump_page(
+            articles, JsonCodec.LISTING_FIELDS
+        ),
+    }
+    print(
+        f"{args.articles} articles, pydantic {pydantic.VERSION}, orjson {orjson.__version__}, "
+        "best of 3"
+    )
+    print(f"{'case':<30}{'ms / 1k articles':>18}{'bytes / 1k articles':>22}")
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=args.rounds, repeat=3)) / args.rounds
+        scale = 1000 / args.articles
+        print(f"{name:<30}{seconds * 1000 * scale:>18.3f}{len(case()) * scale:>22.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,100 @@
+'''
+Local stand-in for https://newsapi.org/v2/everything.
+Answers with deterministic synthetic articles, so every run ingests the
+same data: the same (q, from) always gives the same titles, urls and times.
+The tests script error answers (429, 5xx, broken bodies) for the first requests
+'''
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Sequence
+
+from aiohttp import web
+
+
+WORDS = (
+    "market growth report study team city energy data policy health climate "
+    "model launch season record research network price player science vote"
+).split()
+REQUESTS = web.AppKey("requests", list[float])
+
+
+def build_articles(category: str, date_: str, count: int) -> list[dict]:
+    rng = random.Random(f"{category}:{date_}")
+    day_start = datetime.strptime(date_, "%Y-%m-%d")
+    articles = []
+    for number in range(count):
+        published_at = day_start + timedelta(seconds=rng.randrange(86400))
+        title = " ".join(rng.choices(WORDS, k=8)).capitalize()
+        articles.append(
+            {
+                "source": {"id": None, "name": "Stub"},
+                "title": f"{title} {category} {number}",
+                "description": " ".join(rng.choices(WORDS, k=30)),
+                "url": f"https://stub.local/{category}/{date_}/{number}",
+                "publishedAt": f"{published_at:%Y-%m-%dT%H:%M:%SZ}",
+                "content": " ".join(rng.choices(WORDS, k=40)) + " [+1200 chars]",
+            }
+        )
+    return articles
+
+
+def create_app(
+    articles_per_category: int = 100,
+    failures: Sequence[tuple] = (),
+) -> web.Application:
+    '''
+    failures - (status, headers) or (status, headers, body) answered to the
+    first requests in turn, the body is an error object by default.
+    app[REQUESTS] keeps the monotonic time of every request
+    '''
+    pending_failures = list(failures)
+
+    async def everything(request: web.Request) -> web.Response:
+        request.app[REQUESTS].append(time.monotonic())
+        if pending_failures:
+            status, headers, *body = pending_failures.pop(0)
+            return web.json_response(
+                body[0] if body else {
+                    "status": "error", "code": "stubFailure", "message": f"Stub answered {status}"
+                },
+                status=status,
+                headers=headers,
+            )
+        category = request.query.get("q", "general")
+        date_ = request.query.get("from") or f"{datetime.now():%Y-%m-%d}"
+        articles = build_articles(category, date_, articles_per_category)
+        return web.json_response(
+            {"status": "ok", "totalResults": len(articles), "articles": articles}
+        )
+
+    app = web.Application()
+    app[REQUESTS] = []
+    app.router.add_get("/v2/everything", everything)
+    return app
+
+
+async def start_stub(
+    host: str = "127.0.0.1",
+    port: int = 8099,
+    articles_per_category: int = 100,
+    failures: Sequence[tuple] = (),
+) -> web.AppRunner:
+    '''
+    Starts the stub inside the running loop, call runner.cleanup() to stop it.
+    With port=0 the bound port is in runner.addresses
+    '''
+    runner = web.AppRunner(create_app(articles_per_category, failures))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--articles", type=int, default=100)
+    args = parser.parse_args()
+    web.run_app(create_app(args.articles), host=args.host, port=args.port)
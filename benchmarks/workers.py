@@ -0,0 +1,219 @@
+'''
+Throughput of the production entry point with several gunicorn workers
+against a single uvicorn process, on the Postgres and Redis from the usual .env:
+
+    python benchmarks/workers.py --workers 1 4 --clients 50 --duration 20
+
+Yesterday is ingested once from the local stub NewsAPI, then every server
+runs as a subprocess from src: `uvicorn main:app` as the single process and
+`gunicorn -c gunicorn.conf.py main:app` with each --workers count. After a
+warm-up, so every worker has filled its own page and L1 caches, the clients
+request the listings of all categories and random detail pages for
+--duration seconds. The clients run in this process and share the CPU with
+the servers, so only numbers of the same machine are comparable
+'''
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+
+import common  # noqa: F401  sets up sys.path and the settings
+from stub_newsapi import start_stub
+from article.schemas import Category
+from article.utils import DateFormatter
+from core import settings
+from database import engine
+from resources import (
+    create_ingestion_worker,
+    create_postgre_man,
+    create_redis_man,
+    create_request_api_man,
+)
+
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+LISTING_PATHS = ["/articles/all", *[f"/articles/{category}" for category in Category]]
+
+
+async def seed(articles: int, stub_port: int) -> list[int]:
+    ''' Ingests yesterday from the stub, returns the ids of its articles '''
+    stub = await start_stub(port=stub_port, articles_per_category=articles)
+    settings.newsapi.url = f"http://127.0.0.1:{stub_port}/v2/everything"
+    settings.newsapi.rate_limit = 1000.0
+    redis_man = create_redis_man()
+    request_api_man = create_request_api_man(redis_man)
+    postgre_man = create_postgre_man()
+    try:
+        await create_ingestion_worker(redis_man, postgre_man, request_api_man).run_once()
+        day = DateFormatter.converting_date_to_string(1)
+        return [
+            article.id
+            async for articles in postgre_man.iter_articles(day)
+            for article in articles
+        ]
+    finally:
+        await request_api_man.close()
+        await redis_man.close()
+        await engine.dispose()
+        await stub.cleanup()
+
+
+def start_server(workers: int | None, port: int, metrics_dir: str) -> subprocess.Popen:
+    ''' gunicorn with the given workers, or uvicorn as a single process when it is None '''
+    env = {
+        **os.environ,
+        "UVICORN_HOST": "127.0.0.1",
+        "UVICORN_PORT": str(port),
+        "INGESTION_IN_APP": "false",
+        "LOGGING_LEVEL": "WARNING",
+    }
+    if workers is None:
+        command = [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", "--no-access-log",
+        ]
+    else:
+        env |= {"UVICORN_WORKERS": str(workers), "PROMETHEUS_MULTIPROC_DIR": metrics_dir}
+        command = [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app",
+            "--log-level", "warning",
+        ]
+    return subprocess.Popen(command, cwd=SRC, env=env)
+
+
+async def wait_ready(session: aiohttp.ClientSession, server: subprocess.Popen) -> None:
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Сервер завершился с кодом {server.returncode}")
+        try:
+            async with session.get("/articles/all") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("Сервер не запустился за 60 секунд")
+
+
+async def load(
+    session: aiohttp.ClientSession,
+    article_ids: list[int],
+    clients: int,
+    duration: float,
+    rng: random.Random,
+) -> tuple[list[float], int]:
+    ''' Latencies of the successful requests and the number of errors '''
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            if rng.random() < 0.5:
+                path = rng.choice(LISTING_PATHS)
+            else:
+                path = f"/articles/about/{rng.choice(article_ids)}"
+            started_at = time.perf_counter()
+            try:
+                async with session.get(path) as response:
+                    await response.read()
+                    if response.status >= 400:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started_at)
+
+    await asyncio.gather(*[client() for _ in range(clients)])
+    return latencies, errors
+
+
+async def measure(
+    name: str, workers: int | None, article_ids: list[int], args: argparse.Namespace
+) -> dict:
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        server = start_server(workers, args.port, metrics_dir)
+        try:
+            connector = aiohttp.TCPConnector(limit=args.clients)
+            async with aiohttp.ClientSession(
+                base_url=f"http://127.0.0.1:{args.port}", connector=connector
+            ) as session:
+                await wait_ready(session, server)
+                await load(session, article_ids, args.clients, args.warmup, rng)
+                latencies, errors = await load(
+                    session, article_ids, args.clients, args.duration, rng
+                )
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+    ordered = sorted(latencies) or [0.0]
+    result = {
+        "workers": workers or 1,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / args.duration, 1),
+        "latency_ms": {
+            "p50": round(statistics.median(ordered) * 1000, 2),
+            "p99": round(ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1000, 2),
+        },
+    }
+    print(
+        f"{name:<12}{result['throughput_rps']:>10}{result['latency_ms']['p50']:>10}"
+        f"{result['latency_ms']['p99']:>10}{errors:>8}"
+    )
+    return result
+
+
+async def main(args: argparse.Namespace) -> Path:
+    article_ids = await seed(args.articles, args.stub_port)
+    print(f"{len(article_ids)} articles, {args.clients} clients, {args.duration} s per mode")
+    print(f"{'mode':<12}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    modes = {"uvicorn": await measure("uvicorn", None, article_ids, args)}
+    for workers in args.workers:
+        name = f"gunicorn-{workers}"
+        modes[name] = await measure(name, workers, article_ids, args)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cpu_count": os.cpu_count(),
+        "params": vars(args),
+        "modes": modes,
+    }
+    output = Path(args.output) / f"workers-{args.label or time.strftime('%Y%m%d%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1],
+        help="gunicorn worker counts to compare with the single process",
+    )
+    parser.add_argument("--clients", type=int, default=50, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per mode")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds before measuring")
+    parser.add_argument("--articles", type=int, default=100, help="stub articles per category")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--stub-port", type=int, default=8099)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default=None, help="result file suffix, the time by default")
+    parser.add_argument("--output", default=str(Path(__file__).resolve().parent / "results"))
+    print(f"Результаты записаны в {asyncio.run(main(parser.parse_args()))}")
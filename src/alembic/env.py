@@ -6,9 +6,9 @@ from sqlalchemy import pool
 
 from alembic import context
 
-from src.database import Base
+from database import Base
 from core import settings
-from src.article.models import *  # noqa: F403
+from article.models import *  # noqa: F403
 
 
 # this is the Alembic Config object, which provides
@@ -17,7 +17,8 @@ from src.article.models import *  # noqa: F403
 config = context.config
 config.set_main_option(
     "sqlalchemy.url",
-        f"postgresql://{settings.db.username}:{settings.db.password}@{settings.db.host}/{settings.db.name}"
+        f"postgresql://{settings.db.username}:{settings.db.password.get_secret_value()}"
+        f"@{settings.db.host}:{settings.db.port}/{settings.db.name}"
 )
 
 # Interpret the config file for Python logging.
@@ -0,0 +1,43 @@
+"""add GIN index on search_vector in table Article
+
+Revision ID: 5e3a9d17c4b8
+Revises: b7e2f4a91c3d
+Create Date: 2026-10-18 22:10:41.503216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e3a9d17c4b8'
+down_revision: Union[str, Sequence[str], None] = 'b7e2f4a91c3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY does not block writes to a large table, it cannot run in a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_articles_search_vector',
+            'articles',
+            ['search_vector'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_articles_search_vector',
+            table_name='articles',
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
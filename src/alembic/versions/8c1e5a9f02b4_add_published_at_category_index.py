@@ -0,0 +1,41 @@
+"""add (published_at, category) index in table Article
+
+Revision ID: 8c1e5a9f02b4
+Revises: 3f6b2d8e41a7
+Create Date: 2026-10-18 12:42:07.518833
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1e5a9f02b4'
+down_revision: Union[str, Sequence[str], None] = '3f6b2d8e41a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY does not block writes to a large table, it cannot run in a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_articles_published_at_category',
+            'articles',
+            ['published_at', 'category'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_articles_published_at_category',
+            table_name='articles',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -1,6 +1,3 @@
-from .schemas import Article, DisplayOnPageArticle 
+from .models import Articles
 
-from ..utils.utils import decode_info, decode_keys_and_value, date_format, datetime_format 
-
-from .models import Articles  
-from database import create_session 
\ No newline at end of file
+from database import create_session
@@ -1,25 +1,59 @@
+from fastapi import Request
+
+from article.utils import CircuitBreaker
+
 from article.service  import (
+    ArticleDetailCache,
+    ArticleLoader,
+    ArticleSearch,
+    PageCache,
+    ViewCounter,
     RequestArticleApi,
     RedisDataManager,
     PostgresDataManager
 )
-from core import settings
 
 
-def get_request_api_man():
-    ''' Returns an object for getting information about articles '''
-    return RequestArticleApi(api_key=settings.api_key)
+def get_request_api_man(request: Request) -> RequestArticleApi:
+    ''' Returns the shared object for getting information about articles '''
+    return request.app.state.request_api_man
+
+
+def get_postgre_man(request: Request) -> PostgresDataManager:
+    ''' Returns the shared object for working with the db '''
+    return request.app.state.postgre_man
+
+
+def get_redis_man(request: Request) -> RedisDataManager:
+    ''' Returns the shared object for working with the redis '''
+    return request.app.state.redis_man
+
+
+def get_article_loader(request: Request) -> ArticleLoader:
+    ''' Returns the shared object that reads and fills the article listings '''
+    return request.app.state.article_loader
+
+
+def get_page_cache(request: Request) -> PageCache:
+    ''' Returns the shared cache of rendered listing pages '''
+    return request.app.state.page_cache
+
+
+def get_detail_cache(request: Request) -> ArticleDetailCache:
+    ''' Returns the shared two-tier cache of the detail pages '''
+    return request.app.state.detail_cache
+
+
+def get_view_counter(request: Request) -> ViewCounter:
+    ''' Returns the shared write-behind view counter '''
+    return request.app.state.view_counter
 
 
-def get_postgre_man():
-    ''' Returns an object for working with the db '''
-    return PostgresDataManager()
+def get_redis_breaker(request: Request) -> CircuitBreaker:
+    ''' Returns the circuit breaker that guards the reads from redis '''
+    return request.app.state.redis_breaker
 
 
-def get_redis_man():
-    ''' Returns an object for working with the redis '''
-    return RedisDataManager(
-        host=settings.redis.host,
-        port=settings.redis.port,
-        max_connetion=settings.redis.max_connection
-    )
\ No newline at end of file
+def get_article_search(request: Request) -> ArticleSearch:
+    ''' Returns the shared full-text search with its query cache '''
+    return request.app.state.article_search
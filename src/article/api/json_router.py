@@ -0,0 +1,109 @@
+from fastapi import Response, APIRouter, Depends, HTTPException, Query
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+from article.service import ArticleDetailCache, ArticleLoader, ViewCounter
+from article.schemas import Category, ArticleSchema, ArticlesPageSchema
+from article.api.dependencies import (
+    get_article_loader,
+    get_detail_cache,
+    get_view_counter,
+)
+from article.api.router import freshness_headers, resolve_days, validate_cursor
+from article.utils import JsonCodec
+from core import settings
+
+
+api_router = APIRouter(tags=["api"], prefix="/api/v1/articles")
+
+
+def select_fields(fields: str | None, allowed: tuple[str, ...]) -> tuple[str, ...]:
+    try:
+        return JsonCodec.parse_fields(fields, allowed)
+    except ValueError as error:
+        raise HTTPException(
+            status_code=400,
+            detail={"type": "fields", "desc": str(error)},
+        )
+
+
+def listing_response(articles_page: ArticlesPageSchema, fields: tuple[str, ...]) -> Response:
+    return Response(
+        content=JsonCodec.dump_page(
+            articles_page.articles, fields, next_cursor=articles_page.next_cursor
+        ),
+        media_type="application/json",
+        headers=freshness_headers(articles_page.freshness),
+    )
+
+
+@api_router.get("/all")
+async def api_all_articles(
+    cursor: str | None = None,
+    limit: int = Query(
+        settings.pagination.page_size, ge=1, le=settings.pagination.max_page_size
+    ),
+    date_: str | None = Query(None, alias="date"),
+    date_from: str | None = None,
+    date_to: str | None = None,
+    fields: str | None = Query(None, description="id,title,category,views"),
+    loader: ArticleLoader = Depends(get_article_loader),
+):
+    days = resolve_days(date_, date_from, date_to)
+    cursor = validate_cursor(cursor)
+    selected = select_fields(fields, JsonCodec.LISTING_FIELDS)
+    articles_page = await loader.get_all_articles(days, cursor=cursor, page_size=limit)
+    return listing_response(articles_page, selected)
+
+
+@api_router.get("/about/{id_article}")
+async def api_detail_article(
+    id_article: int,
+    fields: str | None = Query(
+        None, description="id,category,title,description,views,published_at,content"
+    ),
+    view_counter: ViewCounter = Depends(get_view_counter),
+    detail_cache: ArticleDetailCache = Depends(get_detail_cache),
+):
+    logger.info(f"Запрошен объект с ID - {id_article} через API")
+    selected = select_fields(fields, JsonCodec.DETAIL_FIELDS)
+    try:
+        article_data: ArticleSchema | None = await detail_cache.get(id_article)
+        if article_data is None:
+            raise HTTPException(
+                status_code=404,
+                detail={"type": "not found", "desc": f"Статья с ID {id_article} не найдена"},
+            )
+        # counted after the lookup, so a missing id never reaches the counters
+        await view_counter.count_view(id_article)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail={"type": "db connection", "desc": "Не удается связаться с бд"},
+        )
+    return Response(
+        content=JsonCodec.dump_object(article_data, selected),
+        media_type="application/json",
+    )
+
+
+@api_router.get("/{category}")
+async def api_specific_category(
+    category: Category,
+    cursor: str | None = None,
+    limit: int = Query(
+        settings.pagination.page_size, ge=1, le=settings.pagination.max_page_size
+    ),
+    date_: str | None = Query(None, alias="date"),
+    date_from: str | None = None,
+    date_to: str | None = None,
+    fields: str | None = Query(None, description="id,title,category,views"),
+    loader: ArticleLoader = Depends(get_article_loader),
+):
+    days = resolve_days(date_, date_from, date_to)
+    cursor = validate_cursor(cursor)
+    selected = select_fields(fields, JsonCodec.LISTING_FIELDS)
+    articles_page = await loader.get_articles_by_category(
+        days=days, category=category, cursor=cursor, page_size=limit
+    )
+    return listing_response(articles_page, selected)
@@ -1,119 +1,380 @@
 import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable
 
-from fastapi import Request, APIRouter, Depends, HTTPException
+import jinja2
+from fastapi import Request, Response, APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from fastapi.templating import Jinja2Templates
 from loguru import logger
-from redis import RedisError
 from sqlalchemy.exc import SQLAlchemyError
-import aiohttp
 
-from article.models.article_models import Articles
 from article.service import (
+    ArticleDetailCache,
+    ArticleLoader,
+    ArticleSearch,
+    PageCache,
     RedisDataManager,
-    PostgresDataManager,
-    RequestArticleApi
+    StreamedListing,
+    ViewCounter,
 )
-from article.schemas import Category, ArticleSchema
-from api.dependencies import (
-    get_postgre_man, 
+from article.schemas import (
+    CacheStatus,
+    Category,
+    ArticleSchema,
+    ArticlesPageSchema,
+    ListingFreshnessSchema,
+    SearchPageSchema,
+)
+from article.api.dependencies import (
+    get_article_loader,
+    get_article_search,
+    get_detail_cache,
+    get_page_cache,
+    get_redis_breaker,
     get_redis_man, 
-    get_request_api_man
+    get_view_counter,
 )
-from article.utils import DateFormatter
+from article.utils import DateFormatter, ArticleCursor, CircuitBreaker
+from core import settings
+from core.metrics import STAGE_DURATION
 
 
 article_router = APIRouter(tags=["articles"], prefix="/articles")
 
 templates = Jinja2Templates(directory="templates/")
+stream_templates = Jinja2Templates(
+    env=jinja2.Environment(
+        loader=jinja2.FileSystemLoader("templates/"),
+        autoescape=jinja2.select_autoescape(),
+        enable_async=True,
+    )
+)
+
+# put before every wait for the next chunk of rows, the buffered html goes out first
+FLUSH = object()
+
+
+def freshness_headers(
+    freshness: ListingFreshnessSchema | None, status: CacheStatus | None = None
+) -> dict[str, str]:
+    ''' X-Cache with the cache status and Age with the seconds since the listing was filled '''
+    if freshness is None:
+        return {}
+    headers = {"X-Cache": str(status or freshness.status).upper()}
+    if freshness.filled_at is not None:
+        headers["Age"] = str(max(0, int(time.time() - freshness.filled_at)))
+    return headers
+
+
+class LazyNextUrl:
+    ''' The next page link of a streamed page, known once its rows are read '''
+    def __init__(self, request: Request):
+        self.request = request
+        self.cursor: str | None = None
+
+    def __bool__(self) -> bool:
+        return self.cursor is not None
+
+    def __str__(self) -> str:
+        return str(self.request.url.include_query_params(cursor=self.cursor))
+
+
+async def stream_listing_page(
+    request: Request,
+    stream_articles: Callable[[], Awaitable[StreamedListing]],
+    on_rendered: Callable[[bytes, ListingFreshnessSchema], None],
+) -> AsyncIterator[bytes]:
+    '''
+    Renders main.html with generate_async in a task, the pieces pass through
+    a bounded queue. The buffer is sent when it reaches stream_flush_bytes
+    and before every wait for rows, so the head goes out before the listing
+    is filled and its ids are read. A page with rows that fits into
+    stream_cache_bytes is given to on_rendered, a larger one is not kept
+    '''
+    queue: asyncio.Queue = asyncio.Queue(maxsize=64)
+    next_url = LazyNextUrl(request)
+    streamed: StreamedListing | None = None
+    seen_rows = False
+
+    async def articles():
+        nonlocal streamed, seen_rows
+        await queue.put(FLUSH)
+        streamed = await stream_articles()
+        next_url.cursor = streamed.next_cursor
+        async for chunk in streamed.chunks:
+            seen_rows = seen_rows or bool(chunk)
+            for article in chunk:
+                yield article
+            await queue.put(FLUSH)
+
+    async def render() -> None:
+        template = stream_templates.get_template("main.html")
+        try:
+            async for piece in template.generate_async(
+                request=request, articles=articles(), next_url=next_url
+            ):
+                await queue.put(piece)
+        except Exception as error:
+            await queue.put(error)
+        else:
+            await queue.put(None)
+
+    render_task = asyncio.create_task(render())
+    body: list[bytes] | None = []
+    body_size = 0
+    buffer: list[bytes] = []
+    buffered = 0
+    try:
+        while True:
+            piece = await queue.get()
+            if isinstance(piece, Exception):
+                # the head is already sent, the client gets a cut off page
+                raise piece
+            if isinstance(piece, str):
+                buffer.append(piece.encode("utf-8"))
+                buffered += len(buffer[-1])
+                if buffered < settings.pages.stream_flush_bytes:
+                    continue
+            if buffer:
+                chunk = b"".join(buffer)
+                buffer.clear()
+                buffered = 0
+                if body is not None:
+                    body_size += len(chunk)
+                    if body_size <= settings.pages.stream_cache_bytes:
+                        body.append(chunk)
+                    else:
+                        body = None
+                yield chunk
+            if piece is None:
+                break
+    finally:
+        # the client went away or rendering failed, the task must not hang on the queue
+        render_task.cancel()
+    if body is not None and seen_rows:
+        on_rendered(b"".join(body), streamed.freshness)
+
+
+async def render_listing(
+    request: Request,
+    redis_man: RedisDataManager,
+    breaker: CircuitBreaker,
+    page_cache: PageCache,
+    load_articles: Callable[[], Awaitable[ArticlesPageSchema]],
+    cache_key: tuple,
+    stream_articles: Callable[[], Awaitable[StreamedListing]] | None = None,
+) -> Response:
+    '''
+    Serves the rendered listing from the page cache, renders main.html only on a miss.
+    With settings.pages.streaming a miss is streamed, a small page is cached once
+    it is sent. The streamed response goes out before the listing is read, so it
+    has no X-Cache and Age headers
+    '''
+    cache_key = (str(request.base_url), *cache_key)
+    version: int | None = None
+    if breaker.closed:
+        version = await redis_man.get_listing_version()
+    page = page_cache.get(cache_key, version)
+    if page is not None:
+        return page_cache.build_response(
+            request, page, freshness_headers(page.freshness, CacheStatus.hit)
+        )
+    if stream_articles is not None and settings.pages.streaming:
+
+        def cache_page(body: bytes, freshness: ListingFreshnessSchema) -> None:
+            page_cache.put(cache_key, version, body, freshness)
+
+        return StreamingResponse(
+            stream_listing_page(request, stream_articles, cache_page),
+            media_type="text/html",
+        )
+    articles_page: ArticlesPageSchema = await load_articles()
+    next_url = None
+    if articles_page.next_cursor is not None:
+        next_url = request.url.include_query_params(cursor=articles_page.next_cursor)
+    with STAGE_DURATION.labels("jinja2", "main.html").time():
+        rendered = templates.TemplateResponse(
+            request,
+            "main.html",
+            {
+                "articles": articles_page.articles,
+                "next_url": next_url,
+            },
+        )
+    page = page_cache.put(
+        cache_key,
+        version if articles_page.articles else None,
+        rendered.body,
+        articles_page.freshness,
+    )
+    return page_cache.build_response(
+        request, page, freshness_headers(articles_page.freshness)
+    )
+
+
+def validate_cursor(cursor: str | None) -> str | None:
+    if cursor is not None:
+        try:
+            ArticleCursor.decode(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail={"type": "cursor", "desc": "Некорректный курсор страницы"},
+            )
+    return cursor
+
+
+def resolve_days(
+    date_: str | None, date_from: str | None, date_to: str | None
+) -> list[str]:
+    ''' One day, an inclusive range (newest first) or yesterday when nothing is given '''
+    if date_ is not None:
+        date_from = date_to = date_
+    date_to = date_to or DateFormatter.converting_date_to_string(1)
+    date_from = date_from or date_to
+    try:
+        days = DateFormatter.converting_range_to_days(date_from, date_to)
+    except ValueError:
+        days = []
+    if not days or len(days) > settings.pagination.max_days:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "type": "date",
+                "desc": f"Некорректный период, не больше {settings.pagination.max_days} дней",
+            },
+        )
+    return days
 
 
 @article_router.get("/all")
 async def display_all_articles(
     request: Request,
+    cursor: str | None = None,
+    limit: int = Query(
+        settings.pagination.page_size, ge=1, le=settings.pagination.max_page_size
+    ),
+    date_: str | None = Query(None, alias="date"),
+    date_from: str | None = None,
+    date_to: str | None = None,
+    loader: ArticleLoader = Depends(get_article_loader),
     redis_man: RedisDataManager = Depends(get_redis_man),
-    postgre_man: PostgresDataManager = Depends(get_postgre_man),
-    request_man: RequestArticleApi = Depends(get_request_api_man),
+    breaker: CircuitBreaker = Depends(get_redis_breaker),
+    page_cache: PageCache = Depends(get_page_cache),
 ):
-    published_at_filter: str = DateFormatter.converting_date_to_string(1)
-    data_display_on_page: list[Articles] = []
-    cached_data: list[Articles] | None = await redis_man.get_all_articles_by_date(
-        published_at_filter
+    days = resolve_days(date_, date_from, date_to)
+    cursor = validate_cursor(cursor)
+    return await render_listing(
+        request,
+        redis_man,
+        breaker,
+        page_cache,
+        lambda: loader.get_all_articles(days, cursor=cursor, page_size=limit),
+        cache_key=(tuple(days), None, cursor, limit),
+        stream_articles=lambda: loader.stream_listing(
+            days, None, cursor=cursor, page_size=limit
+        ),
     )
-    if not cached_data:
-        data_from_postgre: list[Articles] = await postgre_man.select_all_articles(
-            date_publish=published_at_filter
+
+
+@article_router.get("/search")
+async def search_articles(
+    request: Request,
+    q: str = Query(min_length=2, max_length=200),
+    page: int = Query(1, ge=1, le=settings.search.max_page),
+    limit: int = Query(
+        settings.search.page_size, ge=1, le=settings.pagination.max_page_size
+    ),
+    article_search: ArticleSearch = Depends(get_article_search),
+):
+    ''' Only the settings.search.rank_candidates newest matches are ranked and paged '''
+    try:
+        search_page: SearchPageSchema = await article_search.search(
+            q, page=page, page_size=limit
         )
-        if data_from_postgre:
-            await redis_man.insert_articles(data_from_postgre)
-        else:
-            categories = (
-                "business",
-                "entertainment",
-                "general",
-                "health",
-                "science",
-                "sports",
-                "technology",
-            )
-            сategorization_news = {}
-            tasks_get_info_from_api = []
-            async with aiohttp.ClientSession() as client:
-                for category in categories:
-                    tasks_get_info_from_api.append(
-                        request_man.request_article(
-                        client=client,
-                        category=category,
-                        published_at=published_at_filter,
-                    )
-                )
-                info_about_articles: list[list] = await asyncio.gather(*tasks_get_info_from_api)
-            for i_categ, name_category in enumerate(categories):
-                сategorization_news[name_category] = info_about_articles[i_categ]
-            update_postgre_data = await postgre_man.insert_articles(
-                сategorization_news
-            )
-            await redis_man.insert_articles(update_postgre_data)
-    data_display_on_page = await redis_man.get_all_articles_by_date(
-        date_=published_at_filter
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail={"type": "db connection", "desc": "Не удается связаться с бд"},
+        )
+    next_url = None
+    if search_page.next_page is not None and search_page.next_page <= settings.search.max_page:
+        next_url = request.url.include_query_params(page=search_page.next_page)
+    return templates.TemplateResponse(
+        request,
+        "main.html",
+        {
+            "articles": search_page.articles,
+            "next_url": next_url,
+            "query": q,
+        },
     )
+
+
+@article_router.get("/trending")
+async def display_trending_articles(
+    request: Request,
+    limit: int = Query(
+        settings.trending.default_limit, ge=1, le=settings.trending.max_limit
+    ),
+    redis_man: RedisDataManager = Depends(get_redis_man),
+):
+    today: str = DateFormatter.converting_date_to_string(0)
+    data_display_on_page = await redis_man.get_trending(today, limit=limit)
     return templates.TemplateResponse(
-        "main.html", {"request": request, "articles": data_display_on_page}
+        request, "main.html", {"articles": data_display_on_page}
     )
 
 
-@article_router.get("/{category}")
-async def display_specific_category(
+@article_router.get("/trending/{category}")
+async def display_trending_category(
     request: Request,
     category: Category,
+    limit: int = Query(
+        settings.trending.default_limit, ge=1, le=settings.trending.max_limit
+    ),
     redis_man: RedisDataManager = Depends(get_redis_man),
-    postgre_man: PostgresDataManager = Depends(get_postgre_man),
-    request_man: RequestArticleApi = Depends(get_request_api_man),
 ):
-    published_at_filter: str = DateFormatter.converting_date_to_string(1)
-    data_display_on_page: list[Articles] = []
-    data_redis: list[Articles] = await redis_man.get_articles_by_date_category(
-        date_=published_at_filter, category=category
+    today: str = DateFormatter.converting_date_to_string(0)
+    data_display_on_page = await redis_man.get_trending(
+        today, category=str(category), limit=limit
     )
-    if not data_redis:
-        data_postgre = await postgre_man.select_articles(
-            category=category, date_publish=published_at_filter
-        )
-        if data_postgre:
-            await redis_man.insert_articles(data_postgre)
-        else:
-            data_from_request: dict = await request_man.request_article(
-                category=category
-            )
-            articles: list[Articles] = await postgre_man.insert_articles(
-                data_from_request
-            )
-            await redis_man.insert_articles(articles)
-    data_display_on_page = await redis_man.get_articles_by_date_category(
-        date_=published_at_filter, category=category
+    return templates.TemplateResponse(
+        request, "main.html", {"articles": data_display_on_page}
     )
 
-    return templates.TemplateResponse(
-        "main.html", {"request": request, "articles": data_display_on_page}
+
+@article_router.get("/{category}")
+async def display_specific_category(
+    request: Request,
+    category: Category,
+    cursor: str | None = None,
+    limit: int = Query(
+        settings.pagination.page_size, ge=1, le=settings.pagination.max_page_size
+    ),
+    date_: str | None = Query(None, alias="date"),
+    date_from: str | None = None,
+    date_to: str | None = None,
+    loader: ArticleLoader = Depends(get_article_loader),
+    redis_man: RedisDataManager = Depends(get_redis_man),
+    breaker: CircuitBreaker = Depends(get_redis_breaker),
+    page_cache: PageCache = Depends(get_page_cache),
+):
+    days = resolve_days(date_, date_from, date_to)
+    cursor = validate_cursor(cursor)
+    return await render_listing(
+        request,
+        redis_man,
+        breaker,
+        page_cache,
+        lambda: loader.get_articles_by_category(
+            days=days, category=category, cursor=cursor, page_size=limit
+        ),
+        cache_key=(tuple(days), str(category), cursor, limit),
+        stream_articles=lambda: loader.stream_listing(
+            days, category, cursor=cursor, page_size=limit
+        ),
     )
 
 
@@ -121,30 +382,25 @@ async def display_specific_category(
 async def detail_desc_article(
     id_article: int,
     request: Request,
-    redis_man: RedisDataManager = Depends(get_redis_man),
-    postgre_man: PostgresDataManager = Depends(get_postgre_man),
+    view_counter: ViewCounter = Depends(get_view_counter),
+    detail_cache: ArticleDetailCache = Depends(get_detail_cache),
 ):
     logger.info(f"Открыл страницу объекта с ID - {id_article}")
     try:
-        tasks_for_update_info_article = [
-            redis_man.update_info(id_article, "views", 1),
-            postgre_man.update_info_object(id_article, "views", 1),
-        ]
-        asyncio.gather(*tasks_for_update_info_article)
-        cached_data: ArticleSchema = await redis_man.get_specific_article(id_article)
-        return templates.TemplateResponse(
-            "about_article.html", {"request": request, "article": cached_data}
-        )
-    except RedisError:
-        try:
-            postgre_data = await postgre_man.get_specific_article(id_article)
-            return templates.TemplateResponse(
-                "about_article.html", {"request": request, "article": postgre_data}
-            )
-        except SQLAlchemyError:
+        article_data: ArticleSchema | None = await detail_cache.get(id_article)
+        if article_data is None:
             raise HTTPException(
-                status_code=500,
-                detail={"type": "db connection", "desc": "Не удается связаться с бд"},
+                status_code=404,
+                detail={"type": "not found", "desc": f"Статья с ID {id_article} не найдена"},
             )
-    except Exception as error:
-        logger.error(f"Неожиданная ошибка: {error}")
+        # counted after the lookup, so a missing id never reaches the counters
+        await view_counter.count_view(id_article)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail={"type": "db connection", "desc": "Не удается связаться с бд"},
+        )
+    with STAGE_DURATION.labels("jinja2", "about_article.html").time():
+        return templates.TemplateResponse(
+            request, "about_article.html", {"article": article_data}
+        )
@@ -0,0 +1 @@
+from .article_models import Articles
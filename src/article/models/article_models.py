@@ -1,23 +1,42 @@
 from datetime import datetime, timedelta
 
-from src.database import Base
+from database import Base
 from sqlalchemy.orm import Mapped, mapped_column, validates
-from sqlalchemy import String, Text, Integer, DateTime, TIMESTAMP
+from sqlalchemy import String, Text, Integer, DateTime, TIMESTAMP, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from loguru import logger
 
 
+# title matches rank above description, description above content
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'C')"
+)
+
+
 class Articles(Base):
     __tablename__ = "articles"
+    __table_args__ = (
+        Index("ix_articles_published_at_category", "published_at", "category"),
+        Index("ix_articles_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     category: Mapped[str | None] = mapped_column(String(20), nullable=True)
     title: Mapped[str] = mapped_column(String(150))
-    description: Mapped[str] = mapped_column(nullable=True)
+    description: Mapped[str] = mapped_column(String(300), nullable=True)
+    url: Mapped[str | None] = mapped_column(Text, nullable=True, unique=True)
     views: Mapped[int] = mapped_column(Integer, default=0)
     published_at: Mapped[TIMESTAMP] = mapped_column(
         DateTime, default=lambda: datetime.now() - timedelta(days=1)
     )
     content: Mapped[str] = mapped_column(Text)
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+        deferred=True,
+    )
     
     def __repr__(self):
         return f"<Article(id={self.id}, category={self.category}, title={self.title})>"
@@ -0,0 +1,9 @@
+from .article import (
+    ArticleSchema,
+    ArticlesPageSchema,
+    CacheStatus,
+    Category,
+    DisplayOnPageArticleSchema,
+    ListingFreshnessSchema,
+    SearchPageSchema,
+)
@@ -29,4 +29,31 @@ class DisplayOnPageArticleSchema(BaseModel):
     id: int
     title: str
     category: Category
-    views: int
\ No newline at end of file
+    views: int
+
+
+class CacheStatus(str, Enum):
+    hit = "hit"
+    stale = "stale"
+    miss = "miss"
+    bypass = "bypass"
+
+    def __str__(self):
+        return self.value
+
+
+class ListingFreshnessSchema(BaseModel):
+    status: CacheStatus = CacheStatus.hit
+    filled_at: float | None = None
+    stale_at: float | None = None
+
+
+class ArticlesPageSchema(BaseModel):
+    articles: list[DisplayOnPageArticleSchema]
+    next_cursor: str | None = None
+    freshness: ListingFreshnessSchema | None = None
+
+
+class SearchPageSchema(BaseModel):
+    articles: list[DisplayOnPageArticleSchema]
+    next_page: int | None = None
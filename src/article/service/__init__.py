@@ -1,5 +1,14 @@
 from .api import RequestArticleApi
 from.postgre import PostgresDataManager
 from .redis import RedisDataManager
+from .single_flight import SingleFlight
+from .loader import ArticleLoader, StreamedListing
+from .page_cache import PageCache
+from .views import ViewCounter
+from .dedup import ArticleDeduplicator
+from .ingestion import IngestionWorker
+from .trending import TrendingRebuilder
+from .detail_cache import ArticleDetailCache
+from .search import ArticleSearch
 
 
@@ -1,55 +1,231 @@
+import asyncio
+import random
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timedelta, timezone
+
 import aiohttp
 
 from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from article.utils import TokenBucket
+from core.metrics import instrument
+
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
+# newsapi:quota:{date} - requests of one UTC day, shared by all processes
+QUOTA_KEY_PREFIX = "newsapi:quota:"
+# a refused request does not count, so the key never goes past the quota
+TAKE_QUOTA_SCRIPT = """
+local used = redis.call("incr", KEYS[1])
+if used == 1 then
+    redis.call("expireat", KEYS[1], ARGV[2])
+end
+if used > tonumber(ARGV[1]) then
+    redis.call("decr", KEYS[1])
+    return -1
+end
+return used
+"""
 
+
+@instrument("newsapi")
 class RequestArticleApi:
-    def __init__(self, api_key):
+    def __init__(
+        self,
+        api_key,
+        base_url: str = "https://newsapi.org/v2/everything",
+        total_timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        connection_limit: int = 20,
+        limit_per_host: int = 10,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        rate_limit: float = 1.0,
+        burst: int = 7,
+        daily_quota: int = 100,
+        client: Redis | None = None,
+    ):
         self.api_key: str = api_key
-    
+        self.base_url = base_url
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connection_limit = connection_limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.limiter = TokenBucket(rate=rate_limit, capacity=burst)
+        self._session: aiohttp.ClientSession | None = None
+        self.requests_total: int = 0
+        self.retries_total: int = 0
+        self.limiter_wait_seconds: float = 0.0
+        self.daily_quota = daily_quota
+        self.client = client
+        self.requests_today: int = 0
+        self.rejected_total: int = 0
+        self._quota_day: str = ""
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        ''' Long-lived session, created on first use inside the running loop '''
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def _retry_delay(self, attempt: int, retry_after: str | None) -> float:
+        ''' Retry-After from the server wins, otherwise exponential backoff with full jitter '''
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+                except (TypeError, ValueError):
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
     async def request_article(
         self,
-        client: aiohttp.ClientSession,
         category: str,
         published_at: str,
     ) -> list:
-        try:
-            url = (
-                "https://newsapi.org/v2/everything"
-                f"?q={category}"
-                "&searchIn=title"
-                "&language=en"
-                f"&from={published_at}"
-                f"&to={published_at}"
-                f"&apiKey={self.api_key}"
-            )
-            async with client.get(url) as response:
-                data: dict = await response.json()
-                assert isinstance(data, dict)
-                logger.debug("Данные от API полученны")
-                if data.get("status", None) != "ok":
-                    raise aiohttp.client.ClientResponseError(
-                        request_info=response.request_info,
-                        history=response.history,
-                        status=response.status,
-                        message=f"Статус ответа {response.status}",
+        params = {
+            "q": category,
+            "searchIn": "title",
+            "language": "en",
+            "from": published_at,
+            "to": published_at,
+            "apiKey": self.api_key,
+        }
+        attempt = 0
+        while True:
+            if not await self._take_quota():
+                self.rejected_total += 1
+                logger.error(
+                    f"Дневная квота NewsAPI ({self.daily_quota}) исчерпана. Category: {category}"
+                )
+                return {
+                    "status": "quota_exceeded",
+                    "message": "Дневная квота запросов к API исчерпана",
+                    "url": self.base_url,
+                }
+            self.limiter_wait_seconds += await self.limiter.acquire()
+            try:
+                async with self.session.get(self.base_url, params=params) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                        delay = self._retry_delay(attempt, response.headers.get("Retry-After"))
+                        logger.warning(
+                            f"API ответил {response.status}. Повтор через {delay:.2f} c. Category: {category}"
+                        )
+                    else:
+                        try:
+                            data = await response.json()
+                        except ValueError:
+                            data = None
+                        if not isinstance(data, dict):
+                            raise aiohttp.client.ClientResponseError(
+                                request_info=response.request_info,
+                                history=response.history,
+                                status=response.status,
+                                message="Ответ API не является JSON-объектом",
+                            )
+                        logger.debug("Данные от API полученны")
+                        if data.get("status", None) != "ok":
+                            raise aiohttp.client.ClientResponseError(
+                                request_info=response.request_info,
+                                history=response.history,
+                                status=response.status,
+                                message=f"Статус ответа {response.status}",
+                            )
+                        logger.debug("Запрос успешен. Никаких проблем не возникло")
+                        return data["articles"]
+            except aiohttp.client.ClientResponseError as error:
+                logger.error(f"Статус API запроса {error.status}")
+                return {
+                    "status": error.status,
+                    "url": str(error.request_info.url),
+                    "message": error.message,
+                }
+            except (aiohttp.client.ClientError, asyncio.TimeoutError) as error:
+                if attempt >= self.max_retries:
+                    logger.error(
+                        f"Ошибка при запросе. \nURL: {self.base_url}. \nDate: {published_at}. \nCategory: {category}. \nDescription: {str(error)}"
                     )
-                logger.debug("Запрос успешен. Никаких проблем не возникло")
-                return data["articles"]
-        except aiohttp.client.ClientResponseError as error:
-            logger.error(f"Статус API запроса {error.status}")
-            return {
-                "status": error.status,
-                "url": error.request_info.url,
-                "message": error.message,
-            }
-        except aiohttp.client.ClientError as error:
-            logger.error(
-                f"Ошибка при запросе. \nURL: {url}. \nDate: {published_at}. \nCategory: {category}. \nDescription: {str(error)}"
+                    return {
+                        "status": "error",
+                        "message": "Возникла ошибка при попытке получить данные",
+                        "url": self.base_url,
+                        "description": str(error),
+                    }
+                delay = self._retry_delay(attempt, None)
+                logger.warning(f"Ошибка соединения с API. Повтор через {delay:.2f} c. {error}")
+            attempt += 1
+            self.retries_total += 1
+            await asyncio.sleep(delay)
+
+    async def _take_quota(self) -> bool:
+        '''
+        Counts a request against the daily quota, False once it is spent.
+        Retries are requests too. NewsAPI resets the quota at UTC midnight.
+        With a Redis client the count is shared by all processes and survives
+        restarts, without it (or while Redis fails) the process counts alone
+        '''
+        now = datetime.now(timezone.utc)
+        today = f"{now:%Y-%m-%d}"
+        if today != self._quota_day:
+            self._quota_day = today
+            self.requests_today = 0
+        if self.client is not None:
+            midnight = datetime.combine(
+                now.date() + timedelta(days=1), datetime.min.time(), timezone.utc
             )
-            return {
-                "status": "error",
-                "message": "Возникла ошибка при попытке получить данные",
-                "url": url,
-                "description": str(error),
-            }
+            try:
+                used: int = await self.client.eval(
+                    TAKE_QUOTA_SCRIPT,
+                    1,
+                    f"{QUOTA_KEY_PREFIX}{today}",
+                    self.daily_quota,
+                    int(midnight.timestamp()),
+                )
+            except RedisError as error:
+                logger.error(f"Квота NewsAPI считается в процессе, Redis недоступен. {error}")
+            else:
+                if used < 0:
+                    self.requests_today = self.daily_quota
+                    return False
+                self.requests_total += 1
+                self.requests_today = used
+                return True
+        if self.requests_today >= self.daily_quota:
+            return False
+        self.requests_total += 1
+        self.requests_today += 1
+        return True
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "requests_total": self.requests_total,
+            "retries_total": self.retries_total,
+            "limiter_wait_seconds": round(self.limiter_wait_seconds, 3),
+            "requests_today": self.requests_today,
+            "daily_quota": self.daily_quota,
+            "rejected_total": self.rejected_total,
+        }
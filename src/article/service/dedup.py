@@ -0,0 +1,160 @@
+import time
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from article.utils import ArticleFingerprint, BodyCodec, TTLLRUCache
+from .redis import RedisDataManager
+
+
+DEDUP_FINGERPRINTS_KEY = "dedup:fingerprints"
+# how many fingerprints share one SimHash band before the oldest is dropped
+BAND_BUCKET_SIZE = 8
+
+
+class ArticleDeduplicator:
+    '''
+    Drops copies of already seen stories before they reach Postgres and Redis.
+    A row is a duplicate when its normalized title or url matches exactly or
+    its SimHash is within max_distance bits of a recent one, and it comes from
+    another raw url. Re-fetches of the same url are left to ON CONFLICT.
+    The recent fingerprints are kept in bounded LRUs and mirrored to a capped
+    sorted set in Redis, so a restarted worker keeps its memory
+    '''
+    def __init__(
+        self,
+        redis_man: RedisDataManager,
+        capacity: int = 50000,
+        window: int = 172800,
+        max_distance: int = 3,
+    ):
+        self.redis_man = redis_man
+        self.capacity = capacity
+        self.window = window
+        self.max_distance = min(max_distance, ArticleFingerprint.BANDS - 1)
+        self.exact = TTLLRUCache(maxsize=capacity * 2, ttl=window)
+        self.bands = TTLLRUCache(maxsize=capacity * ArticleFingerprint.BANDS, ttl=window)
+        # every run re-fetches the day, a dropped copy is counted only the first time
+        self.dropped = TTLLRUCache(maxsize=capacity, ttl=window)
+        self._loaded = False
+        self.checked_total: int = 0
+        self.exact_duplicates_total: int = 0
+        self.near_duplicates_total: int = 0
+        self.saved_storage_bytes: int = 0
+        self.saved_cache_bytes: int = 0
+
+    def _remember(
+        self, title_hash: int, norm_url_hash: int, simhash: int, url_hash: int
+    ) -> None:
+        self.exact.set(("title", title_hash), url_hash)
+        if norm_url_hash:
+            self.exact.set(("url", norm_url_hash), url_hash)
+        for band in ArticleFingerprint.bands(simhash):
+            bucket: list[tuple[int, int]] = self.bands.get(band) or []
+            bucket = [*bucket[-(BAND_BUCKET_SIZE - 1):], (simhash, url_hash)]
+            self.bands.set(band, bucket)
+
+    def _find(
+        self, title_hash: int, norm_url_hash: int, simhash: int
+    ) -> tuple[str, int] | None:
+        ''' Returns the kind of match and the raw url hash of the stored copy '''
+        for exact_key in (("title", title_hash), ("url", norm_url_hash)):
+            url_hash = self.exact.get(exact_key)
+            if url_hash is not None:
+                return "exact", url_hash
+        for band in ArticleFingerprint.bands(simhash):
+            for seen_simhash, url_hash in self.bands.get(band) or []:
+                if ArticleFingerprint.distance(simhash, seen_simhash) <= self.max_distance:
+                    return "near", url_hash
+        return None
+
+    async def load(self) -> None:
+        ''' Restores the recent fingerprints from Redis once per process '''
+        if self._loaded:
+            return
+        try:
+            members: list[bytes] = await self.redis_man.client.zrangebyscore(
+                DEDUP_FINGERPRINTS_KEY, time.time() - self.window, "+inf"
+            )
+        except RedisError as error:
+            logger.error(f"Отпечатки статей не загружены из Redis. {error}")
+            return
+        for member in members:
+            self._remember(*(int(part, 16) for part in member.split(b":")))
+        self._loaded = True
+        logger.debug(f"Отпечатки статей загружены из Redis: {len(members)}")
+
+    async def filter(self, rows: list[dict]) -> list[dict]:
+        ''' Returns the rows that are not copies of a recent story, in their order '''
+        await self.load()
+        unique_rows: list[dict] = []
+        fingerprints: dict[bytes, float] = {}
+        for row in rows:
+            self.checked_total += 1
+            title_hash = ArticleFingerprint.hash_text(
+                ArticleFingerprint.normalize_title(row["title"])
+            )
+            simhash = ArticleFingerprint.simhash(
+                f"{row['title']} {row.get('description') or ''}"
+            )
+            url = row.get("url") or ""
+            url_hash = ArticleFingerprint.hash_text(url) if url else 0
+            norm_url = ArticleFingerprint.normalize_url(url)
+            norm_url_hash = ArticleFingerprint.hash_text(norm_url) if norm_url else 0
+            match = self._find(title_hash, norm_url_hash, simhash)
+            # without a url nothing else stops the copy, so it is dropped too
+            if match is not None and (match[1] != url_hash or not url_hash):
+                dropped_key = url_hash or title_hash
+                if self.dropped.get(dropped_key) is None:
+                    self.dropped.set(dropped_key, True)
+                    if match[0] == "exact":
+                        self.exact_duplicates_total += 1
+                    else:
+                        self.near_duplicates_total += 1
+                    self._count_saved(row)
+                continue
+            if match is None:
+                self._remember(title_hash, norm_url_hash, simhash, url_hash)
+                fingerprint = f"{title_hash:x}:{norm_url_hash:x}:{simhash:x}:{url_hash:x}"
+                fingerprints[fingerprint.encode()] = time.time()
+            unique_rows.append(row)
+
+        if fingerprints:
+            await self._store(fingerprints)
+        dropped = len(rows) - len(unique_rows)
+        if dropped:
+            logger.info(f"Дубликаты статей отброшены: {dropped} из {len(rows)}")
+        return unique_rows
+
+    def _count_saved(self, row: dict) -> None:
+        ''' Estimates the bytes a stored copy would take in Postgres and in Redis '''
+        title = row["title"].encode("utf-8")
+        description = (row.get("description") or "").encode("utf-8")
+        content = (row.get("content") or "").encode("utf-8")
+        url = (row.get("url") or "").encode("utf-8")
+        self.saved_storage_bytes += len(title) + len(description) + len(content) + len(url)
+        self.saved_cache_bytes += len(title) + len(
+            BodyCodec.encode(row.get("description"), row.get("content"))
+        )
+
+    async def _store(self, fingerprints: dict[bytes, float]) -> None:
+        ''' Mirrors the new fingerprints to Redis and trims the set to capacity '''
+        try:
+            async with self.redis_man.client.pipeline(transaction=True) as pipeline:
+                pipeline.zadd(DEDUP_FINGERPRINTS_KEY, fingerprints)
+                pipeline.zremrangebyscore(
+                    DEDUP_FINGERPRINTS_KEY, "-inf", time.time() - self.window
+                )
+                pipeline.zremrangebyrank(DEDUP_FINGERPRINTS_KEY, 0, -self.capacity - 1)
+                await pipeline.execute()
+        except RedisError as error:
+            logger.error(f"Отпечатки статей не сохранены в Redis. {error}")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "checked_total": self.checked_total,
+            "exact_duplicates_total": self.exact_duplicates_total,
+            "near_duplicates_total": self.near_duplicates_total,
+            "saved_storage_bytes": self.saved_storage_bytes,
+            "saved_cache_bytes": self.saved_cache_bytes,
+        }
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+from loguru import logger
+from redis.exceptions import RedisError
+from sqlalchemy import Row
+
+from article.schemas import ArticleSchema
+from article.utils import CircuitBreaker, TTLLRUCache
+from .postgre import PostgresDataManager
+from .redis import RedisDataManager, INVALIDATE_CHANNEL
+
+
+class ArticleDetailCache:
+    '''
+    Two-tier cache of the detail pages: a bounded in-process LRU of
+    validated ArticleSchema objects in front of the Redis hashes.
+    Workers drop their L1 entries when insert_articles publishes the ids.
+    Redis misses and failures are read through from Postgres
+    '''
+    def __init__(
+        self,
+        redis_man: RedisDataManager,
+        postgre_man: PostgresDataManager,
+        breaker: CircuitBreaker,
+        maxsize: int = 1024,
+        ttl: float = 5.0,
+    ):
+        self.redis_man = redis_man
+        self.postgre_man = postgre_man
+        self.breaker = breaker
+        self.l1 = TTLLRUCache(maxsize=maxsize, ttl=ttl)
+        self._task: asyncio.Task | None = None
+        self.l2_hits: int = 0
+        self.l2_misses: int = 0
+
+    async def get(self, id_object: int) -> ArticleSchema | None:
+        ''' L1, then Redis while the breaker allows it, then Postgres '''
+        article: ArticleSchema | None = self.l1.get(id_object)
+        if article is not None:
+            return article
+
+        redis_failed = True
+        if self.breaker.allow():
+            try:
+                article = await self.redis_man.get_specific_article(id_object)
+                self.breaker.record_success()
+                redis_failed = False
+            except RedisError as error:
+                self.breaker.record_failure()
+                logger.error(f"Redis недоступен, статья читается из БД. {error}")
+            if article is not None:
+                self.l2_hits += 1
+                self.l1.set(id_object, article)
+                return article
+            if not redis_failed:
+                self.l2_misses += 1
+
+        started_at = time.perf_counter()
+        article_model = await self.postgre_man.get_specific_article(id_object)
+        if redis_failed:
+            self.breaker.record_fallback(time.perf_counter() - started_at)
+        if article_model is None:
+            return None
+        if not redis_failed:
+            await self._cache_body(article_model)
+        article = ArticleSchema(
+            id=article_model.id,
+            category=article_model.category,
+            title=article_model.title,
+            description=article_model.description,
+            views=article_model.views,
+            published_at=f"{article_model.published_at:%Y-%m-%d %H:%M:%S}",
+            content=article_model.content,
+        )
+        self.l1.set(id_object, article)
+        return article
+
+    async def _cache_body(self, article_model: Row) -> None:
+        '''
+        Listings are filled without the body, the first detail read puts it into
+        Redis together with the hash, which may have expired. The listings are
+        left to the fills. Nothing is published: the row comes from Postgres as
+        it is, and the invalidation would drop the L1 entry just filled
+        '''
+        try:
+            await self.redis_man.insert_articles(
+                [article_model],
+                day_listing=False,
+                category_listing=False,
+                with_body=True,
+                invalidate=False,
+            )
+        except RedisError as error:
+            logger.error(f"Текст статьи {article_model.id} не сохранен в Redis. {error}")
+
+    async def listen_invalidations(self) -> None:
+        ''' Drops the L1 entries of the ids published by insert_articles, reconnects on errors '''
+        while True:
+            pubsub = self.redis_man.client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATE_CHANNEL)
+                # entries written while we were not subscribed could be stale
+                self.l1.clear()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    for id_object in message["data"].split(b","):
+                        try:
+                            self.l1.invalidate(int(id_object))
+                        except ValueError:
+                            logger.error(f"Некорректный id в инвалидации кэша: {id_object!r}")
+            except RedisError as error:
+                logger.error(f"Подписка на инвалидацию кэша прервана. {error}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.listen_invalidations())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            "l1": self.l1.stats(),
+            "l2": {"hits": self.l2_hits, "misses": self.l2_misses},
+        }
@@ -0,0 +1,154 @@
+import asyncio
+import time
+import uuid
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from article.schemas import Category
+from article.utils import DateFormatter
+from .api import RequestArticleApi
+from .dedup import ArticleDeduplicator
+from .postgre import PostgresDataManager
+from .redis import RedisDataManager
+from .single_flight import RELEASE_LOCK_SCRIPT
+
+
+INGESTION_STATUS_KEY = "ingestion:status"
+
+
+class IngestionWorker:
+    '''
+    Pre-fetches every category from NewsAPI on a schedule and warms
+    Postgres and Redis, so user requests only read.
+    Runs inside the app lifespan or as a separate process (python -m worker)
+    '''
+    def __init__(
+        self,
+        redis_man: RedisDataManager,
+        postgre_man: PostgresDataManager,
+        request_man: RequestArticleApi,
+        interval: float = 7200.0,
+        lock_ttl: int = 600,
+        deduplicator: ArticleDeduplicator | None = None,
+    ):
+        self.redis_man = redis_man
+        self.postgre_man = postgre_man
+        self.request_man = request_man
+        self.interval = interval
+        self.lock_ttl = lock_ttl
+        self.deduplicator = deduplicator
+        self._task: asyncio.Task | None = None
+        self.runs_total: int = 0
+        self.failed_runs_total: int = 0
+        self.last_success_at: float | None = None
+
+    async def run_once(self, date_: str | None = None) -> int:
+        '''
+        Ingests one date (yesterday by default), returns the number of new articles.
+        The run counts as a success only when at least one category was fetched
+        and both Postgres and Redis were written, otherwise it raises and the
+        last success (and so the reported lag) stays as it was
+        '''
+        date_ = date_ or DateFormatter.converting_date_to_string(1)
+        client = self.redis_man.client
+        lock_key = f"lock:ingestion:{date_}"
+        token = uuid.uuid4().hex
+        if not await client.set(lock_key, token, nx=True, ex=self.lock_ttl):
+            logger.debug(f"Загрузка статей за {date_} уже идет в другом процессе")
+            return 0
+        try:
+            started_at = time.time()
+            categorization_news = await self._request_categories(date_, list(Category))
+            if not categorization_news:
+                raise RuntimeError(f"Ни одна категория за {date_} не получена от API")
+            rows = self.postgre_man.parse_articles(categorization_news)
+            if self.deduplicator is not None:
+                rows = await self.deduplicator.filter(rows)
+            new_articles = await self.postgre_man.insert_rows(rows)
+            async for day_articles in self.postgre_man.iter_articles(date_):
+                await self.redis_man.insert_articles(day_articles)
+            finished_at = time.time()
+        finally:
+            await client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+        self.last_success_at = finished_at
+        await client.hset(
+            INGESTION_STATUS_KEY,
+            mapping={
+                "date": date_,
+                "last_success_at": finished_at,
+                "last_duration": round(finished_at - started_at, 3),
+                "last_new_articles": len(new_articles),
+                "categories_fetched": len(categorization_news),
+                **{
+                    f"dedup_{name}": value
+                    for name, value in (
+                        self.deduplicator.stats() if self.deduplicator else {}
+                    ).items()
+                },
+            },
+        )
+        logger.info(f"Статьи за {date_} загружены. Новых: {len(new_articles)}")
+        return len(new_articles)
+
+    async def _request_categories(
+        self, date_: str, categories: list[Category]
+    ) -> dict[str, list]:
+        ''' Requests the articles of every category from NewsAPI concurrently '''
+        info_about_articles = await asyncio.gather(
+            *[
+                self.request_man.request_article(
+                    category=str(category),
+                    published_at=date_,
+                )
+                for category in categories
+            ]
+        )
+        categorization_news = {}
+        for category, articles in zip(categories, info_about_articles):
+            if isinstance(articles, list):
+                categorization_news[str(category)] = articles
+            else:
+                logger.error(f"Категория {category} не получена от API: {articles}")
+        return categorization_news
+
+    async def run(self) -> None:
+        while True:
+            self.runs_total += 1
+            try:
+                await self.run_once()
+            except Exception as error:
+                # the loop must survive anything a run raises, or ingestion stops silently
+                self.failed_runs_total += 1
+                logger.exception(f"Не удалось загрузить статьи. {error}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @staticmethod
+    async def read_status(redis_man: RedisDataManager) -> dict[str, str | float]:
+        ''' Returns the last reported run of whichever process does the ingestion '''
+        try:
+            status: dict[bytes, bytes] = await redis_man.client.hgetall(INGESTION_STATUS_KEY)
+        except RedisError as error:
+            logger.error(f"Не удалось получить статус загрузки статей. {error}")
+            return {}
+        decode_status: dict[str, str | float] = {
+            key.decode("utf-8"): value.decode("utf-8") for key, value in status.items()
+        }
+        if "last_success_at" in decode_status:
+            decode_status["lag"] = round(
+                time.time() - float(decode_status["last_success_at"]), 3
+            )
+        return decode_status
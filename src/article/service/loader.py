@@ -0,0 +1,349 @@
+import asyncio
+import time
+from typing import AsyncIterator, NamedTuple
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from article.schemas import (
+    CacheStatus,
+    Category,
+    ArticlesPageSchema,
+    DisplayOnPageArticleSchema,
+    ListingFreshnessSchema,
+)
+from article.utils import ArticleCursor, CircuitBreaker, DateFormatter, TTLLRUCache
+from .postgre import PostgresDataManager
+from .redis import RedisDataManager
+from .single_flight import SingleFlight
+
+
+class StreamedListing(NamedTuple):
+    chunks: AsyncIterator[list[DisplayOnPageArticleSchema]]
+    next_cursor: str | None
+    freshness: ListingFreshnessSchema
+
+
+class ArticleLoader:
+    '''
+    Reads listings from Redis and fills them from Postgres on a miss.
+    A listing spans one or more per-day partitions. Days older than hot_days
+    are filled with the short cold_ttl, so browsing old dates does not keep
+    them in Redis. NewsAPI is only called by the IngestionWorker. When Redis
+    fails the breaker opens and listings are read from a snapshot or Postgres.
+    A listing past its soft deadline is served as it is and refreshed from
+    Postgres in the background, only a listing past the hard deadline (the
+    key TTL) is filled inside the request
+    '''
+    def __init__(
+        self,
+        redis_man: RedisDataManager,
+        postgre_man: PostgresDataManager,
+        single_flight: SingleFlight,
+        breaker: CircuitBreaker,
+        fill_batch_size: int = 500,
+        snapshot_size: int = 256,
+        snapshot_ttl: float = 300.0,
+        hot_days: int = 2,
+        cold_ttl: int = 900,
+        stream_chunk_size: int = 100,
+    ):
+        self.redis_man = redis_man
+        self.postgre_man = postgre_man
+        self.single_flight = single_flight
+        self.breaker = breaker
+        self.fill_batch_size = fill_batch_size
+        self.snapshots = TTLLRUCache(maxsize=snapshot_size, ttl=snapshot_ttl)
+        self.hot_days = hot_days
+        self.cold_ttl = cold_ttl
+        self.stream_chunk_size = stream_chunk_size
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self.reads_total: dict[CacheStatus, int] = {status: 0 for status in CacheStatus}
+        self.refreshes_total: int = 0
+        self.refresh_errors_total: int = 0
+
+    async def get_all_articles(
+        self,
+        days: list[str],
+        cursor: str | None = None,
+        page_size: int = 30,
+    ) -> ArticlesPageSchema:
+        return await self._read_listing(days, None, cursor, page_size)
+
+    async def get_articles_by_category(
+        self,
+        days: list[str],
+        category: Category,
+        cursor: str | None = None,
+        page_size: int = 30,
+    ) -> ArticlesPageSchema:
+        return await self._read_listing(days, str(category), cursor, page_size)
+
+    async def _read_listing(
+        self,
+        days: list[str],
+        category: str | None,
+        cursor: str | None,
+        page_size: int,
+    ) -> ArticlesPageSchema:
+        '''
+        Reads Redis while the breaker is closed. While it is open the page is
+        served from the in-process snapshot (bounded by its ttl) or from Postgres
+        '''
+        snapshot_key = (tuple(days), category, cursor, page_size)
+        if self.breaker.allow():
+            try:
+                articles_page = await self._read_from_redis(
+                    days, category, cursor, page_size
+                )
+                self.breaker.record_success()
+                self.snapshots.set(snapshot_key, articles_page)
+                return articles_page
+            except RedisError as error:
+                self.breaker.record_failure()
+                logger.error(f"Redis недоступен, список читается из БД. {error}")
+
+        self.reads_total[CacheStatus.bypass] += 1
+        articles_page = self.snapshots.get(snapshot_key)
+        if articles_page is not None:
+            freshness = articles_page.freshness or ListingFreshnessSchema()
+            return articles_page.model_copy(
+                update={"freshness": freshness.model_copy(update={"status": CacheStatus.bypass})}
+            )
+        started_at = time.perf_counter()
+        articles_page = await self._read_from_postgre(days, category, cursor, page_size)
+        self.breaker.record_fallback(time.perf_counter() - started_at)
+        articles_page.freshness = ListingFreshnessSchema(
+            status=CacheStatus.bypass, filled_at=time.time()
+        )
+        return articles_page
+
+    async def stream_listing(
+        self,
+        days: list[str],
+        category: Category | None,
+        cursor: str | None = None,
+        page_size: int = 30,
+    ) -> StreamedListing:
+        '''
+        Reads only the ids of the page up front, the rows are read from Redis
+        chunk by chunk while the page is rendered. While Redis is unavailable
+        the page is read as usual and given as a single chunk
+        '''
+        category = str(category) if category is not None else None
+        if self.breaker.allow():
+            try:
+                freshness = await self._ensure_listing(days, category)
+                id_articles, next_cursor = await self.redis_man.read_listing_ids(
+                    days, category, cursor=cursor, page_size=page_size
+                )
+                self.breaker.record_success()
+                return StreamedListing(
+                    self._stream_chunks(id_articles), next_cursor, freshness
+                )
+            except RedisError as error:
+                self.breaker.record_failure()
+                logger.error(f"Redis недоступен, список читается из БД. {error}")
+
+        articles_page = await self._read_listing(days, category, cursor, page_size)
+        return StreamedListing(
+            self._single_chunk(articles_page.articles),
+            articles_page.next_cursor,
+            articles_page.freshness,
+        )
+
+    async def _stream_chunks(
+        self, id_articles: list[int]
+    ) -> AsyncIterator[list[DisplayOnPageArticleSchema]]:
+        try:
+            async for articles in self.redis_man.iter_listing_rows(
+                id_articles, chunk_size=self.stream_chunk_size
+            ):
+                yield articles
+        except RedisError as error:
+            # the beginning of the page is already sent, it ends early
+            self.breaker.record_failure()
+            logger.error(f"Потоковая выдача списка прервана. {error}")
+
+    @staticmethod
+    async def _single_chunk(
+        articles: list[DisplayOnPageArticleSchema],
+    ) -> AsyncIterator[list[DisplayOnPageArticleSchema]]:
+        yield articles
+
+    async def _ensure_listing(
+        self, days: list[str], category: str | None
+    ) -> ListingFreshnessSchema:
+        '''
+        Fills the missing day partitions concurrently and schedules a background
+        refresh of the stale ones. The freshness of the page is the one of its
+        oldest partition
+        '''
+        states = await self.redis_man.listing_states(days, category)
+        now = time.time()
+        missing_days = [state.date for state in states if not state.exists]
+        stale_states = [
+            state for state in states
+            if state.exists and (state.stale_at is None or state.stale_at <= now)
+        ]
+        if missing_days:
+            await asyncio.gather(
+                *[self._fill_listing_once(date_, category) for date_ in missing_days]
+            )
+        for state in stale_states:
+            self._schedule_refresh(state.date, category)
+
+        status = CacheStatus.hit
+        if missing_days:
+            status = CacheStatus.miss
+        elif stale_states:
+            status = CacheStatus.stale
+        self.reads_total[status] += 1
+        # listings written before the deadlines existed have an unknown fill time
+        filled_at = [state.filled_at for state in states if state.filled_at is not None]
+        stale_at = [
+            state.stale_at or now for state in states if state.exists
+        ] + [
+            now + (self.listing_ttl(date_) or self.redis_man.ttl) * self.redis_man.soft_ttl_ratio
+            for date_ in missing_days
+        ]
+        return ListingFreshnessSchema(
+            status=status,
+            filled_at=min(filled_at, default=now if missing_days else None),
+            stale_at=min(stale_at, default=None),
+        )
+
+    def _schedule_refresh(self, date_: str, category: str | None) -> None:
+        ''' Starts at most one background refresh per listing in this process '''
+        refresh_key = self.fill_key(date_, category)
+        if refresh_key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh_listing_once(date_, category))
+        self._refreshing[refresh_key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(refresh_key, None))
+
+    async def _refresh_listing_once(self, date_: str, category: str | None) -> None:
+        try:
+            # the lock of the fill also keeps the other workers from refreshing
+            await self.single_flight.do(
+                f"{self.fill_key(date_, category)}:refresh",
+                lambda: self._refresh_listing(date_, category),
+            )
+        except Exception as error:
+            self.refresh_errors_total += 1
+            logger.error(f"Фоновое обновление списка {date_} {category} не удалось. {error}")
+
+    async def _refresh_listing(self, date_: str, category: str | None) -> None:
+        state, = await self.redis_man.listing_states([date_], category)
+        if state.exists and state.stale_at is not None and state.stale_at > time.time():
+            return
+        await self._copy_listing(date_, category)
+        self.refreshes_total += 1
+        logger.debug(f"Список {date_} {category} обновлен в фоне")
+
+    async def close(self) -> None:
+        ''' Cancels the background refreshes that are still running '''
+        tasks = list(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _read_from_redis(
+        self,
+        days: list[str],
+        category: str | None,
+        cursor: str | None,
+        page_size: int,
+    ) -> ArticlesPageSchema:
+        freshness = await self._ensure_listing(days, category)
+        if category is None:
+            articles_page = await self.redis_man.get_all_articles_by_days(
+                days, cursor=cursor, page_size=page_size
+            )
+        else:
+            articles_page = await self.redis_man.get_articles_by_days_category(
+                days=days, category=category, cursor=cursor, page_size=page_size
+            )
+        articles_page.freshness = freshness
+        return articles_page
+
+    async def _read_from_postgre(
+        self,
+        days: list[str],
+        category: str | None,
+        cursor: str | None,
+        page_size: int,
+    ) -> ArticlesPageSchema:
+        ''' Keyset page straight from Postgres, one extra row tells if there is a next page '''
+        articles = await self.postgre_man.select_articles_page(
+            days[0],
+            category=category,
+            cursor=cursor,
+            limit=page_size + 1,
+            first_date=days[-1],
+        )
+        next_cursor = None
+        if len(articles) > page_size:
+            articles = articles[:page_size]
+            next_cursor = ArticleCursor.encode(
+                ArticleCursor.datetime_to_timestamp(articles[-1].published_at),
+                articles[-1].id,
+            )
+        return ArticlesPageSchema(
+            articles=[
+                DisplayOnPageArticleSchema(
+                    id=article.id,
+                    title=article.title,
+                    category=article.category,
+                    views=article.views,
+                )
+                for article in articles
+                if article.category is not None
+            ],
+            next_cursor=next_cursor,
+        )
+
+    @staticmethod
+    def fill_key(date_: str, category: str | None) -> str:
+        single_flight_key = f"article:date:{date_}"
+        if category is not None:
+            single_flight_key += f":category:{category}"
+        return single_flight_key
+
+    async def _fill_listing_once(self, date_: str, category: str | None) -> None:
+        await self.single_flight.do(
+            self.fill_key(date_, category), lambda: self._fill_listing(date_, category)
+        )
+
+    def listing_ttl(self, date_: str) -> int | None:
+        ''' Hot days keep the cache TTL, older days expire after cold_ttl '''
+        if DateFormatter.days_ago(date_) > self.hot_days:
+            return self.cold_ttl
+        return None
+
+    async def _fill_listing(self, date_: str, category: str | None = None) -> None:
+        ''' Copies one day (and category) from Postgres to Redis in keyset batches '''
+        if await self.redis_man.has_listing(date_, category):
+            return
+        await self._copy_listing(date_, category)
+
+    async def _copy_listing(self, date_: str, category: str | None) -> None:
+        '''
+        A day fill writes the day listing and the listings of all its categories,
+        a category fill only its own: the day listing would miss the other categories
+        '''
+        ttl = self.listing_ttl(date_)
+        async for articles in self.postgre_man.iter_articles(
+            date_, category=category, batch_size=self.fill_batch_size
+        ):
+            await self.redis_man.insert_articles(
+                articles, ttl=ttl, day_listing=category is None
+            )
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **{f"{status}_total": total for status, total in self.reads_total.items()},
+            "refreshing": len(self._refreshing),
+            "refreshes_total": self.refreshes_total,
+            "refresh_errors_total": self.refresh_errors_total,
+        }
@@ -0,0 +1,148 @@
+import gzip
+import hashlib
+import time
+from typing import NamedTuple
+
+from fastapi import Request, Response, status
+from loguru import logger
+
+from article.schemas import ListingFreshnessSchema
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CachedPage(NamedTuple):
+    version: int
+    etag: str
+    body: bytes
+    gzip_body: bytes
+    br_body: bytes | None
+    freshness: ListingFreshnessSchema | None = None
+
+
+# the server preference between encodings the client weights equally
+ENCODINGS_PREFERENCE = ("br", "gzip", "identity")
+
+
+class PageCache:
+    '''
+    Keeps rendered listing pages with pre-compressed variants.
+    A page is valid while the listing version in Redis is unchanged,
+    RedisDataManager.insert_articles bumps the version when it writes a listing.
+    A page whose listing went stale is a miss, so the loader can refresh it
+    '''
+    def __init__(self, max_pages: int = 256, gzip_level: int = 6, br_quality: int = 5):
+        self.max_pages = max_pages
+        self.gzip_level = gzip_level
+        self.br_quality = br_quality
+        self._pages: dict[tuple, CachedPage] = {}
+        self.hits_total: int = 0
+        self.misses_total: int = 0
+        self.not_modified_total: int = 0
+
+    def get(self, key: tuple, version: int | None) -> CachedPage | None:
+        page = self._pages.get(key)
+        if (
+            version is not None
+            and page is not None
+            and page.version == version
+            and (
+                page.freshness is None
+                or page.freshness.stale_at is None
+                or page.freshness.stale_at > time.time()
+            )
+        ):
+            self.hits_total += 1
+            return page
+        self.misses_total += 1
+        return None
+
+    def put(
+        self,
+        key: tuple,
+        version: int | None,
+        body: bytes,
+        freshness: ListingFreshnessSchema | None = None,
+    ) -> CachedPage:
+        ''' Compresses the rendered page once and keeps it if the version is known '''
+        page = CachedPage(
+            version=version,
+            etag=f'W/"{version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"',
+            body=body,
+            gzip_body=gzip.compress(body, compresslevel=self.gzip_level),
+            br_body=brotli.compress(body, quality=self.br_quality) if brotli else None,
+            freshness=freshness,
+        )
+        if version is None:
+            return page
+        if key not in self._pages and len(self._pages) >= self.max_pages:
+            self._pages.pop(next(iter(self._pages)))
+        self._pages[key] = page
+        logger.debug(f"Страница {key} закэширована. Версия: {version}")
+        return page
+
+    @staticmethod
+    def choose_encoding(accept_encoding: str, with_br: bool = True) -> str:
+        '''
+        Picks the encoding with the highest q-value of the Accept-Encoding
+        header, "*" stands for the ones not listed and q=0 rules one out.
+        An unlisted identity only serves when no compression is acceptable
+        '''
+        weights: dict[str, float] = {}
+        for item in accept_encoding.lower().split(","):
+            name, *params = (part.strip() for part in item.split(";"))
+            if not name:
+                continue
+            weight = 1.0
+            for param in params:
+                key, _, value = param.partition("=")
+                if key.strip() == "q":
+                    try:
+                        weight = float(value)
+                    except ValueError:
+                        weight = 0.0
+            weights[name] = weight
+        candidates = ENCODINGS_PREFERENCE if with_br else ENCODINGS_PREFERENCE[1:]
+        wildcard = weights.get("*", 0.0)
+        best, best_weight = "identity", 0.0
+        for encoding in candidates:
+            weight = weights.get(encoding, 0.0 if encoding == "identity" else wildcard)
+            if weight > best_weight:
+                best, best_weight = encoding, weight
+        return best
+
+    def build_response(
+        self,
+        request: Request,
+        page: CachedPage,
+        headers: dict[str, str] | None = None,
+    ) -> Response:
+        ''' Answers 304 on a matching If-None-Match, otherwise the best encoding the client accepts '''
+        headers = {**(headers or {}), "ETag": page.etag, "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if page.etag in (tag.strip() for tag in if_none_match.split(",")):
+            self.not_modified_total += 1
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        encoding = self.choose_encoding(
+            request.headers.get("accept-encoding", ""), with_br=page.br_body is not None
+        )
+        body = page.body
+        if encoding == "br":
+            body = page.br_body
+            headers["Content-Encoding"] = "br"
+        elif encoding == "gzip":
+            body = page.gzip_body
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=body, media_type="text/html", headers=headers)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pages": len(self._pages),
+            "hits_total": self.hits_total,
+            "misses_total": self.misses_total,
+            "not_modified_total": self.not_modified_total,
+        }
@@ -1,121 +1,296 @@
-import datetime
+from datetime import datetime
+from typing import AsyncIterator
 
-from sqlalchemy import select, and_, cast, Date, Result, update
+from sqlalchemy import (
+    select,
+    and_,
+    tuple_,
+    column,
+    func,
+    values,
+    Integer,
+    Result,
+    Row,
+    Select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import (
     DatabaseError,
+    DBAPIError,
+    InterfaceError,
     OperationalError,
     TimeoutError as TimeoutErrorPostgre,
-    NoResultFound,
     SQLAlchemyError,
     ProgrammingError,
 )
 from loguru import logger
 
 from article import Articles, create_session
+from article.utils import DateFormatter, ArticleCursor
+from core.metrics import instrument
+
+
+# what a listing needs, the unbounded text columns are read only for the detail page
+LISTING_COLUMNS = (
+    Articles.id,
+    Articles.title,
+    Articles.category,
+    Articles.views,
+    Articles.published_at,
+)
+BODY_COLUMNS = (Articles.description, Articles.content)
+
+# lengths of the VARCHAR columns in the migrations
+TITLE_MAX_LENGTH = 150
+DESCRIPTION_MAX_LENGTH = 300
 
 
+@instrument("postgres")
 class PostgresDataManager:
-    async def insert_articles(self, articles: dict[str, list]) -> list[Articles]:
-        assert articles is not None
-        try:
-            list_articles_objects = []
-            async with create_session() as session:
-                for category, list_articles in articles.items():
-                    for article in list_articles:
-                        published_at = article["publishedAt"]
-                        date_publ = datetime.datetime.strptime(
-                            published_at, "%Y-%m-%dT%H:%M:%SZ"
-                        )
-                        try:
-                            article_model_object = Articles(
-                                category=category,
-                                title=article.get("title"),
-                                description=article.get("description"),
-                                published_at=date_publ,
-                                content=article.get("content"),
-                            )
-                            session.add(article_model_object)
-                            await session.flush()
-                            list_articles_objects.append(article_model_object)
-                            logger.debug(
-                                f"Данные в бд успешно записаны. ID: {article_model_object.id}"
-                            )
-                        except DatabaseError as error:
-                            logger.error(f"Ошибка при работе с БД. {error}")
-                    logger.debug("Список данных сформирован")
-                await session.commit()
-                return list_articles_objects
-
-        except KeyError as error:
-            logger.error(f"Ошибка при занесесии данных в бд.Отсутствует поле: {error}")
-        except Exception as error:
-            logger.error(f"Ошибка с БД: {error}")
-
-    async def get_specific_article(self, id_object: int) -> Articles:
+    def __init__(self, insert_batch_size: int = 500):
+        self.insert_batch_size = insert_batch_size
+
+    @staticmethod
+    def parse_articles(articles: dict[str, list]) -> list[dict]:
+        ''' Validates the NewsAPI payload and converts it into rows of the articles table '''
+        rows_by_url: dict[str, dict] = {}
+        rows_without_url: list[dict] = []
+        for category, list_articles in articles.items():
+            for article in list_articles:
+                try:
+                    date_publ = DateFormatter.converting_string_to_date(
+                        article["publishedAt"]
+                    )
+                except (KeyError, TypeError, ValueError) as error:
+                    logger.error(f"Статья пропущена, некорректная дата публикации: {error}")
+                    continue
+                title = article.get("title")
+                if not title:
+                    logger.error("Статья пропущена, отсутствует заголовок")
+                    continue
+                description = article.get("description")
+                row = {
+                    "category": category,
+                    "title": Articles.validate_len_value(title, TITLE_MAX_LENGTH),
+                    "description": (
+                        Articles.validate_len_value(description, DESCRIPTION_MAX_LENGTH)
+                        if description
+                        else description
+                    ),
+                    "url": article.get("url"),
+                    "published_at": date_publ,
+                    "content": article.get("content") or "",
+                }
+                if row["url"]:
+                    rows_by_url.setdefault(row["url"], row)
+                else:
+                    rows_without_url.append(row)
+        return [*rows_by_url.values(), *rows_without_url]
+
+    async def insert_rows(self, rows: list[dict]) -> list[Row]:
+        '''
+        Writes the rows with one multi-row INSERT ... RETURNING per batch, every
+        batch in its own transaction, so a failing batch does not roll back the
+        others, while a lost connection fails the whole write. Articles whose
+        url is already stored are skipped and not returned,
+        the new ones come back with the listing columns only
+        '''
+        list_articles_objects: list[Row] = []
+        query = (
+            insert(Articles)
+            .on_conflict_do_nothing(index_elements=[Articles.url])
+            .returning(*LISTING_COLUMNS)
+        )
+        for start in range(0, len(rows), self.insert_batch_size):
+            batch = rows[start:start + self.insert_batch_size]
+            try:
+                async with create_session() as session:
+                    inserted: Result = await session.execute(query, batch)
+                    list_articles_objects.extend(inserted.all())
+            except (OperationalError, InterfaceError):
+                # a lost database fails the whole write, only a bad batch is skipped
+                raise
+            except DBAPIError as error:
+                # asyncpg errors without a DB-API class (e.g. a too long value) come as plain DBAPIError
+                logger.error(
+                    f"Пакет из {len(batch)} статей не записан в БД. {error}"
+                )
+        logger.debug(
+            f"Данные в бд успешно записаны. Новых статей: {len(list_articles_objects)} из {len(rows)}"
+        )
+        return list_articles_objects
+
+    async def get_specific_article(self, id_object: int) -> Row | None:
+        ''' Primary key lookup of the listing and body columns, None if there is no such article '''
         try:
             async with create_session() as session:
-                query = select(Articles).where(id=id_object)
+                query = select(*LISTING_COLUMNS, *BODY_COLUMNS).where(Articles.id == id_object)
                 result_request: Result = await session.execute(query)
-                article_object = result_request.scalars().one()
-                return article_object
+                return result_request.one_or_none()
         except (OperationalError, TimeoutErrorPostgre) as conn_error:
             logger.error(f"Проблема с подклчением к бд.\nПодробнее: {conn_error}")
             raise SQLAlchemyError()
-        except (DatabaseError, NoResultFound) as req_error:
+        except DatabaseError as req_error:
             logger.error(f"Ошибка при запроса в бд.\nПодробнее: {req_error}")
             raise SQLAlchemyError()
 
-    async def select_all_articles(self, date_publish: str) -> list[Articles]:
+    @staticmethod
+    def articles_page_query(
+        date_publish: str,
+        category: str | None = None,
+        cursor: str | None = None,
+        limit: int = 30,
+        first_date: str | None = None,
+        with_body: bool = False,
+    ) -> Select:
+        ''' The keyset page statement of select_articles_page, served by ix_articles_published_at_category '''
+        day_start, _ = DateFormatter.converting_string_to_day_range(
+            first_date or date_publish
+        )
+        _, day_end = DateFormatter.converting_string_to_day_range(date_publish)
+        conditions = [
+            Articles.published_at >= day_start,
+            Articles.published_at < day_end,
+        ]
+        if category is not None:
+            conditions.append(Articles.category == category)
+        if cursor is not None:
+            published_ts, id_article = ArticleCursor.decode(cursor)
+            conditions.append(
+                tuple_(Articles.published_at, Articles.id)
+                < tuple_(
+                    ArticleCursor.timestamp_to_datetime(published_ts),
+                    id_article,
+                )
+            )
+        columns = (*LISTING_COLUMNS, *BODY_COLUMNS) if with_body else LISTING_COLUMNS
+        return (
+            select(*columns)
+            .where(and_(*conditions))
+            .order_by(Articles.published_at.desc(), Articles.id.desc())
+            .limit(limit)
+        )
+
+    async def select_articles_page(
+        self,
+        date_publish: str,
+        category: str | None = None,
+        cursor: str | None = None,
+        limit: int = 30,
+        first_date: str | None = None,
+        with_body: bool = False,
+    ) -> list[Row]:
+        '''
+        Keyset page ordered by (published_at, id) descending. Covers one day,
+        or the days from first_date to date_publish when first_date is given.
+        Returns plain rows of the listing columns, with description and content
+        only when with_body is set
+        '''
+        query = self.articles_page_query(
+            date_publish, category, cursor, limit, first_date, with_body
+        )
         try:
             async with create_session() as session:
-                publish_date = datetime.datetime.strptime(date_publish, "%Y-%m-%d").date()
-                query = select(Articles).where(
-                    cast(Articles.published_at, Date) == publish_date
-                )
-                logger.debug(
-                    f"Запрос для получения всех статей с датой: {date_publish}"
-                )
                 articles_responce: Result = await session.execute(query)
-                logger.debug("Запрос выполнен успешно. Все статьи полученны ")
-                articles_list: list = articles_responce.scalars().all()
+                return articles_responce.all()
+        except DatabaseError as error:
+            logger.error(f"Ошибка при работе с БД. {error}")
+            raise SQLAlchemyError("Ошибка при получении страницы статей")
 
-                return articles_list
+    async def select_most_viewed(
+        self,
+        published_since: datetime,
+        limit: int = 100,
+    ) -> list[Row]:
+        ''' Most viewed articles published after the given moment, listing columns only '''
+        try:
+            async with create_session() as session:
+                query = (
+                    select(*LISTING_COLUMNS)
+                    .where(Articles.published_at >= published_since)
+                    .order_by(Articles.views.desc())
+                    .limit(limit)
+                )
+                articles_responce: Result = await session.execute(query)
+                return articles_responce.all()
         except DatabaseError as error:
             logger.error(f"Ошибка при работе с БД. {error}")
-            return {
-                "status": "error",
-                "description": "Произошла ошибка при работе с БД при получении всех статей",
-            }
+            raise SQLAlchemyError("Ошибка при получении популярных статей")
 
-    async def select_articles(self, category: str, date_publish: str) -> list[Articles]:
+    async def search_articles(
+        self,
+        query_text: str,
+        offset: int = 0,
+        limit: int = 20,
+        candidates: int = 1000,
+    ) -> list[Row]:
+        '''
+        Full-text search over the GIN-indexed search_vector. Only the newest
+        `candidates` matches are ranked, best first, ties keep the newest id first.
+        Ranking every match of a common word reads hundreds of thousands of rows,
+        the bounded set is found by a backward primary key scan instead
+        '''
+        ts_query = func.websearch_to_tsquery("english", query_text)
+        newest_matches = (
+            select(
+                Articles.id,
+                Articles.title,
+                Articles.category,
+                Articles.views,
+                Articles.search_vector,
+            )
+            .where(Articles.search_vector.op("@@")(ts_query))
+            .order_by(Articles.id.desc())
+            .limit(candidates)
+            .subquery()
+        )
+        rank = func.ts_rank_cd(newest_matches.c.search_vector, ts_query)
         try:
             async with create_session() as session:
-                publish_date = datetime.datetime.strptime(date_publish, "%Y-%m-%d").date()
                 query = (
-                    select(Articles)
-                    .where(
-                        and_(
-                            Articles.category == category,
-                            cast(Articles.published_at, Date) == publish_date,
-                        )
+                    select(
+                        newest_matches.c.id,
+                        newest_matches.c.title,
+                        newest_matches.c.category,
+                        newest_matches.c.views,
                     )
-                    .limit(10)
+                    .order_by(rank.desc(), newest_matches.c.id.desc())
+                    .offset(offset)
+                    .limit(limit)
                 )
-                logger.debug(f"Запрос в бд с параметрами: {category}, {date_publish}")
                 articles_responce: Result = await session.execute(query)
-                logger.debug(
-                    f"Запрос выполнен успешно. Данные которые получил пользователь - {articles_responce}"
-                )
-                articles_list: list = articles_responce.scalars().all()
-
-                return articles_list
+                return articles_responce.all()
         except DatabaseError as error:
-            logger.error(f"Ошибка при работе с БД. {error}")
+            logger.error(f"Ошибка при поиске статей. {error}")
+            raise SQLAlchemyError("Ошибка при поиске статей")
 
-            return {
-                "status": "error",
-                "description": "Произошла ошибка при работе с БД",
-            }
+    async def iter_articles(
+        self,
+        date_publish: str,
+        category: str | None = None,
+        batch_size: int = 500,
+        with_body: bool = False,
+    ) -> AsyncIterator[list[Row]]:
+        ''' Walks over one day in keyset batches, so a cache fill never loads the whole day '''
+        cursor = None
+        while True:
+            articles = await self.select_articles_page(
+                date_publish,
+                category=category,
+                cursor=cursor,
+                limit=batch_size,
+                with_body=with_body,
+            )
+            if not articles:
+                return
+            yield articles
+            if len(articles) < batch_size:
+                return
+            cursor = ArticleCursor.encode(
+                ArticleCursor.datetime_to_timestamp(articles[-1].published_at),
+                articles[-1].id,
+            )
 
     async def update_info_object(self, id_object: int, field: str, value: any) -> None:
         try:
@@ -134,4 +309,24 @@ class PostgresDataManager:
             logger.error(
                 f"Невозможно преобразовать запрос в sql.\nПодробнее: {sql_error}"
             )
-            raise SQLAlchemyError("Ошибка синтаксиса")
\ No newline at end of file
+            raise SQLAlchemyError("Ошибка синтаксиса")
+
+    async def increment_views(self, deltas: dict[int, int]) -> None:
+        ''' Applies aggregated view deltas with one UPDATE ... FROM (VALUES ...) '''
+        if not deltas:
+            return
+        try:
+            async with create_session() as session:
+                deltas_table = values(
+                    column("id", Integer), column("delta", Integer), name="deltas"
+                ).data(list(deltas.items()))
+                query = (
+                    update(Articles)
+                    .where(Articles.id == deltas_table.c.id)
+                    .values(views=Articles.views + deltas_table.c.delta)
+                )
+                await session.execute(query)
+            logger.debug(f"Просмотры обновлены в БД. Статей: {len(deltas)}")
+        except (OperationalError, TimeoutErrorPostgre) as conn_error:
+            logger.error(f"Ошибка при обращении к БД.\nПодробнее: {conn_error}")
+            raise SQLAlchemyError("БД не отвечает")
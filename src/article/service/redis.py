@@ -1,7 +1,12 @@
+import asyncio
 import datetime
+import heapq
+import itertools
+import time
+from typing import AsyncIterator, NamedTuple
 
 from loguru import logger
-from redis.asyncio import Redis, ConnectionPool
+from redis.asyncio import Redis, BlockingConnectionPool
 from redis.exceptions import (
     ConnectionError,
     TimeoutError,
@@ -10,172 +15,496 @@ from redis.exceptions import (
     RedisError,
 )
 import redis
-from pydantic import ValidationError
-from fastapi import HTTPException, status
+from pydantic import TypeAdapter, ValidationError
 from article.schemas import (
     ArticleSchema,
+    ArticlesPageSchema,
     DisplayOnPageArticleSchema
 )
 from article.models import Articles
-from article.utils import DecodeValues, DateFormatter
+from article.utils import DecodeValues, ArticleCursor, BodyCodec
+from core.metrics import instrument
 
+LISTING_VERSION_KEY = "article:listing:version"
+PENDING_VIEWS_KEY = "article:views:pending"
+INVALIDATE_CHANNEL = "article:invalidate"
+
+TRENDING_TTL = 172800
+
+# validates a whole listing page in one call instead of one model per row
+LISTING_ROWS_ADAPTER = TypeAdapter(list[DisplayOnPageArticleSchema])
+
+
+class ListingState(NamedTuple):
+    date: str
+    exists: bool
+    filled_at: float | None
+    stale_at: float | None
+
+# KEYS: article hash, pending deltas, trending set of the day
+# ARGV: id, value, day, decay boost, trending ttl
+# only cached articles enter the trending sets, an unknown id is never ranked
+COUNT_VIEW_SCRIPT = """
+local member = string.format("%012d", ARGV[1])
+local boost = tonumber(ARGV[2]) * tonumber(ARGV[4])
+if redis.call("exists", KEYS[1]) == 1 then
+    redis.call("zincrby", KEYS[3], boost, member)
+    redis.call("expire", KEYS[3], ARGV[5])
+    redis.call("hincrby", KEYS[1], "views", ARGV[2])
+    local category = redis.call("hget", KEYS[1], "category")
+    if category then
+        local category_key = "article:trending:" .. category .. ":" .. ARGV[3]
+        redis.call("zincrby", category_key, boost, member)
+        redis.call("expire", category_key, ARGV[5])
+    end
+end
+return redis.call("hincrby", KEYS[2], ARGV[1], ARGV[2])
+"""
+
+
+class CountingConnectionPool(BlockingConnectionPool):
+    ''' Shared connection pool that keeps utilization counters for sizing max_connections '''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.acquired_total: int = 0
+        self.waited_total: int = 0
+        self.exhausted_total: int = 0
+        self.peak_in_use: int = 0
+
+    async def get_connection(self, *args, **kwargs):
+        if len(self._in_use_connections) >= self.max_connections:
+            self.waited_total += 1
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except redis.ConnectionError:
+            self.exhausted_total += 1
+            raise
+        self.acquired_total += 1
+        self.peak_in_use = max(self.peak_in_use, len(self._in_use_connections))
+        return connection
+
+    def stats(self) -> dict[str, int]:
+        ''' Returns a snapshot of the pool utilization '''
+        return {
+            "max_connections": self.max_connections,
+            "created": len(self._available_connections) + len(self._in_use_connections),
+            "in_use": len(self._in_use_connections),
+            "available": len(self._available_connections),
+            "peak_in_use": self.peak_in_use,
+            "acquired_total": self.acquired_total,
+            "waited_total": self.waited_total,
+            "exhausted_total": self.exhausted_total,
+        }
+
+
+@instrument("redis")
 class RedisDataManager:
-    def __init__(self, host: str, port: int, max_connetion: int):
+    '''
+    Cache layout:
+    article:id:{id} - small hash with the listing fields, kept in listpack encoding
+    article:body:{id} - compressed description and content, read only by the detail page
+    article:date:{date}, article:category:{category}:{date} - listings scored by publish time
+    article:fresh:{date}, article:fresh:{category}:{date} - fill time and soft deadline
+        of the listing, the key TTL of the listing is its hard deadline
+    '''
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        max_connetion: int,
+        db_number: int = 0,
+        pool_timeout: int = 5,
+        ttl: int = 172800,
+        trending_half_life: float = 3600.0,
+        compression_level: int = 6,
+        soft_ttl_ratio: float = 0.8,
+    ):
         self.host = host
         self.port = port
         self.max_connection = max_connetion
-        self.pool = ConnectionPool(
-            host=self.host, port=self.port, max_connections=self.max_connection
+        self.ttl = ttl
+        self.trending_half_life = trending_half_life
+        self.compression_level = compression_level
+        self.soft_ttl_ratio = soft_ttl_ratio
+        self.pool = CountingConnectionPool(
+            host=self.host,
+            port=self.port,
+            db=db_number,
+            max_connections=self.max_connection,
+            timeout=pool_timeout,
         )
         self.client: Redis = Redis(connection_pool=self.pool)
+        self.count_view_script = self.client.register_script(COUNT_VIEW_SCRIPT)
 
     async def close(self):
-        await self.client.close()
+        ''' Closes the client and drains the shared connection pool '''
+        await self.client.aclose()
+        await self.pool.disconnect()
+        logger.debug(f"Пул соединений Redis закрыт. Статистика: {self.pool.stats()}")
+
+    def pool_stats(self) -> dict[str, int]:
+        return self.pool.stats()
+
+    async def get_listing_version(self) -> int | None:
+        ''' Returns the version of the listings, it changes when insert_articles writes a listing '''
+        try:
+            version: bytes | None = await self.client.get(LISTING_VERSION_KEY)
+            return int(version) if version else 0
+        except RedisError as error:
+            logger.error(f"Не удалось получить версию списков статей. {error}")
+            return None
+
+    @staticmethod
+    def trending_key(date_: str, category: str | None = None) -> str:
+        ''' Sorted set of the views of one day with time-decayed scores '''
+        if category is None:
+            return f"article:trending:{date_}"
+        return f"article:trending:{category}:{date_}"
+
+    @staticmethod
+    def trending_seeded_key(date_: str) -> str:
+        ''' Set once the trending sets of the day were seeded from Postgres '''
+        return f"article:trending:seeded:{date_}"
 
-    async def update_info(self, id_object, field, value) -> None:
-        await self.client.hincrby(f"article:id:{id_object}", field, value)
+    @staticmethod
+    def trending_boost(now: datetime.datetime, half_life: float) -> float:
+        '''
+        Weight of a view made now. Weights double every half_life seconds
+        since the start of the day, which equals decaying all older views
+        while keeping every update a single ZINCRBY
+        '''
+        day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return 2 ** ((now - day_start).total_seconds() / half_life)
+
+    async def count_view(self, id_object: int, value: int = 1) -> None:
+        '''
+        Atomically increments the cached views, the pending delta that is
+        flushed to Postgres and the trending sets of today
+        '''
+        now = datetime.datetime.now(datetime.timezone.utc)
+        today = f"{now:%Y-%m-%d}"
+        await self.count_view_script(
+            keys=[
+                f"article:id:{id_object}",
+                PENDING_VIEWS_KEY,
+                self.trending_key(today),
+            ],
+            args=[
+                id_object,
+                value,
+                today,
+                self.trending_boost(now, self.trending_half_life),
+                TRENDING_TTL,
+            ],
+        )
+
+    async def get_trending(
+        self,
+        date_: str,
+        category: str | None = None,
+        limit: int = 10,
+    ) -> list[DisplayOnPageArticleSchema]:
+        ''' Top articles of the day, ZREVRANGE keeps it O(log n + limit) '''
+        members: list[bytes] = await self.client.zrange(
+            self.trending_key(date_, category), 0, limit - 1, desc=True
+        )
+        return await self.get_listing_rows([int(member) for member in members])
 
     async def get_specific_article(self, id_object: int) -> ArticleSchema:
         try:
-            cached_data_code: dict[bytes, bytes] = await self.client.hgetall(
-                f"article:id:{id_object}"
-            )
+            async with self.client.pipeline(transaction=False) as pipeline:
+                pipeline.hgetall(f"article:id:{id_object}")
+                pipeline.get(f"article:body:{id_object}")
+                cached_data_code, cached_body = await pipeline.execute()
+            if not cached_data_code:
+                logger.debug(f"Объекта {id_object} нет в Redis")
+                return None
             decode_cached_data: dict[str, str] = DecodeValues.decode_keys_and_value(cached_data_code)
+            if cached_body is not None:
+                try:
+                    decode_cached_data["description"], decode_cached_data["content"] = (
+                        BodyCodec.decode(cached_body)
+                    )
+                except ValueError as error:
+                    # e.g. written by a worker with zstandard, the detail page reads Postgres
+                    logger.error(f"Не удалось распаковать текст объекта {id_object}. {error}")
+                    return None
+            elif "content" not in decode_cached_data:
+                logger.debug(f"Текста объекта {id_object} нет в Redis")
+                return None
             object_article = ArticleSchema(**decode_cached_data)
             logger.debug(f"Получил данные по объекту - {id_object}")
             return object_article
         except (ConnectionError, TimeoutError) as conn_error:
             logger.error(f"Проблемы с подключением к Redis.\nПодробнее: {conn_error}")
+            raise
         except (ResponseError, DataError) as req_error:
             logger.error(f"Ошибка в запросе.\nПодробнее: {req_error}")
+            raise
+
+    @staticmethod
+    def listing_key(date_: str, category: str | None = None) -> str:
+        ''' Sorted set of one day (and category) scored by the publish timestamp '''
+        if category is None:
+            return f"article:date:{date_}"
+        return f"article:category:{category}:{date_}"
+
+    async def has_listing(self, date_: str, category: str | None = None) -> bool:
+        return bool(await self.client.exists(self.listing_key(date_, category)))
+
+    @staticmethod
+    def freshness_key(date_: str, category: str | None = None) -> str:
+        if category is None:
+            return f"article:fresh:{date_}"
+        return f"article:fresh:{category}:{date_}"
+
+    async def listing_states(
+        self, days: list[str], category: str | None = None
+    ) -> list[ListingState]:
+        ''' Presence and freshness of the day partitions, checked with one pipeline '''
+        async with self.client.pipeline(transaction=False) as pipeline:
+            for date_ in days:
+                pipeline.exists(self.listing_key(date_, category))
+                pipeline.hmget(self.freshness_key(date_, category), "filled_at", "stale_at")
+            replies: list = await pipeline.execute()
+        states: list[ListingState] = []
+        for date_, exists, (filled_at, stale_at) in zip(days, replies[::2], replies[1::2]):
+            states.append(
+                ListingState(
+                    date=date_,
+                    exists=bool(exists),
+                    filled_at=float(filled_at) if filled_at is not None else None,
+                    stale_at=float(stale_at) if stale_at is not None else None,
+                )
+            )
+        return states
+
+    async def _read_listing_positions(
+        self,
+        key: str,
+        after: tuple[int, int] | None,
+        limit: int,
+    ) -> list[tuple[int, int]]:
+        '''
+        Reads up to limit (published_ts, id) positions after the cursor with
+        ZRANGE ... BYSCORE REV LIMIT. Members are zero-padded ids, so Redis
+        orders equal scores by id exactly like the keyset of Postgres
+        '''
+        max_score: str | int = "+inf" if after is None else after[0]
+        positions: list[tuple[int, int]] = []
+        offset = 0
+        while len(positions) < limit:
+            members: list[tuple[bytes, float]] = await self.client.zrange(
+                key,
+                max_score,
+                "-inf",
+                desc=True,
+                byscore=True,
+                offset=offset,
+                num=limit,
+                withscores=True,
+            )
+            if not members:
+                break
+            offset += len(members)
+            for member, score in members:
+                position = (int(score), int(member))
+                if after is None or position < after:
+                    positions.append(position)
+        return positions[:limit]
+
+    async def _read_listing_ids(
+        self,
+        keys: list[str],
+        cursor: str | None,
+        page_size: int,
+    ) -> tuple[list[int], str | None]:
+        '''
+        Reads the ids of one page over several day partitions. Every partition gives
+        at most page_size + 1 positions after the cursor and a k-way merge keeps the
+        newest ones, so no day is loaded fully
+        '''
+        after = ArticleCursor.decode(cursor) if cursor is not None else None
+        partitions: list[list[tuple[int, int]]] = await asyncio.gather(
+            *[self._read_listing_positions(key, after, page_size + 1) for key in keys]
+        )
+        page = list(
+            itertools.islice(heapq.merge(*partitions, reverse=True), page_size + 1)
+        )
+
+        next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            next_cursor = ArticleCursor.encode(*page[-1])
+        return [id_article for _, id_article in page], next_cursor
+
+    async def _read_listing_page(
+        self,
+        keys: list[str],
+        cursor: str | None,
+        page_size: int,
+    ) -> ArticlesPageSchema:
+        id_articles, next_cursor = await self._read_listing_ids(keys, cursor, page_size)
+        return ArticlesPageSchema(
+            articles=await self.get_listing_rows(id_articles),
+            next_cursor=next_cursor,
+        )
 
-    async def get_all_articles_by_date(self, date_: str) -> list[DisplayOnPageArticleSchema]:
+    async def read_listing_ids(
+        self,
+        days: list[str],
+        category: str | None = None,
+        cursor: str | None = None,
+        page_size: int = 30,
+    ) -> tuple[list[int], str | None]:
+        ''' Ids of one listing page and the cursor of the next one, rows are read separately '''
+        return await self._read_listing_ids(
+            [self.listing_key(date_, category) for date_ in days], cursor, page_size
+        )
+
+    async def iter_listing_rows(
+        self, id_articles: list[int], chunk_size: int = 100
+    ) -> AsyncIterator[list[DisplayOnPageArticleSchema]]:
+        ''' Reads the listing rows chunk by chunk, one pipeline per chunk '''
+        for start in range(0, len(id_articles), chunk_size):
+            yield await self.get_listing_rows(id_articles[start:start + chunk_size])
+
+    async def get_listing_rows(
+        self, id_articles: list[int]
+    ) -> list[DisplayOnPageArticleSchema]:
+        ''' Reads the listing fields of the given articles with one pipeline '''
+        pipline_page = self.client.pipeline()
+        for id_article in id_articles:
+            pipline_page.hmget(
+                f"article:id:{id_article}", *DecodeValues.LISTING_FIELDS
+            )
+        cached_data: list[list[bytes | None]] = await pipline_page.execute()
         try:
-            data_from_redis: set[bytes] = await self.client.smembers(
-                f"article:date:{date_}"
+            return LISTING_ROWS_ADAPTER.validate_python(
+                DecodeValues.matching_listing_rows(cached_data)
+            )
+        except ValidationError as error:
+            logger.error(f"Объект не прошел валидацию.\nПодробнее об ошибке: {error}")
+            raise
+
+    async def get_all_articles_by_days(
+        self,
+        days: list[str],
+        cursor: str | None = None,
+        page_size: int = 30,
+    ) -> ArticlesPageSchema:
+        try:
+            return await self._read_listing_page(
+                [self.listing_key(date_) for date_ in days], cursor, page_size
             )
-            pipline_all_articles = self.client.pipeline()
-            for key in data_from_redis:
-                pipline_all_articles.hmget(
-                    key.decode("utf-8"), "id", "title", "category", "views"
-                )
-            cached_data: list[list[bytes]] = await pipline_all_articles.execute()
-
-            articles_decode: list[dict[str, str]] = [
-                DecodeValues.decoding_and_matching_with_fields(article_data_bytes) for article_data_bytes in cached_data
-            ]
-            try:
-                return [
-                    DisplayOnPageArticleSchema(**article_data)
-                    for article_data in articles_decode
-                ]
-            except ValidationError as error:
-                logger.debug(
-                    f"Объект не прошел валидацию.\nПодробнее об ошибке: {error}"
-                )
-                raise ValidationError("Объект не прошел валидацию")
         except redis.ConnectionError as error:
             logger.debug(f"Ошибка при работе с Redis\nПодробнее: {error}")
             raise ConnectionError("Ошибка при работе с Redis")
 
-    async def get_articles_by_date_category(
+    async def get_articles_by_days_category(
         self,
-        date_: datetime.date,
+        days: list[str],
         category: str,
-    ) -> list[DisplayOnPageArticleSchema]:
+        cursor: str | None = None,
+        page_size: int = 30,
+    ) -> ArticlesPageSchema:
         try:
-            article_ids = await self.client.sinter(
-                f"article:date:{date_}", f"article:category:{category}"
+            return await self._read_listing_page(
+                [self.listing_key(date_, category) for date_ in days], cursor, page_size
             )
-            category_pipline = self.client.pipeline()
-            for article_id in article_ids:
-                try:
-                    await category_pipline.hmget(
-                        article_id.decode("utf-8"), "id", "title", "category", "views"
-                    )
-                except (ValueError, AttributeError, TypeError) as error:
-                    logger.error(f"Ошибка, связанная с {error}")
-                    raise RedisError(f"Ошибка при работе с Redis.\nПодробнее: {error}")
-
-            cached_code_articles: list[list[bytes]] = await category_pipline.execute()
-            decode_cached_articles = [
-                DecodeValues.decoding_and_matching_with_fields(article_info) for article_info in cached_code_articles
-            ]
-            try:
-                return [
-                    DisplayOnPageArticleSchema(**article_info)
-                    for article_info in decode_cached_articles
-                ]
-            except ValidationError as valid_error:
-                logger.error(f"Объект не прошел валидацию.\nПодробнее {valid_error}")
-                raise ValidationError("Объект не прошел валидацию")
-
         except redis.ConnectionError as error:
             logger.error(f"Redis Server недоступен. {error}")
-            return {
-                "status": "error",
-                "desc": "Redis Server недоступен",
-                "detail": error,
-                "type": "connecton_type",
-            }
-        except Exception as error:
-            logger.error(f"Неизвестная ошибка: {error}")
-            return {
-                "status": "error",
-                "desc": "Непредвиденная ошибка",
-                "detail": error,
-                "type": "internal_error",
-            }
-
-    async def insert_articles(self, data: list[Articles]) -> None:
+            raise ConnectionError("Ошибка при работе с Redis")
+
+    async def insert_articles(
+        self,
+        data: list[Articles],
+        ttl: int | None = None,
+        day_listing: bool = True,
+        category_listing: bool = True,
+        with_body: bool = False,
+        invalidate: bool = True,
+    ) -> None:
+        '''
+        Writes the whole batch in one transactional pipeline, every key gets
+        the given TTL (the cache TTL by default). The touched listings become
+        stale after soft_ttl_ratio of it. day_listing and category_listing choose
+        which listings (and their freshness) are written, without both only the
+        article hashes are cached. with_body also writes the compressed body,
+        the rows must then carry description and content. The listing version
+        is bumped only when a listing is written. invalidate publishes the ids
+        so the workers drop their L1 entries. Redis errors reach the caller
+        '''
         assert data is not None, "Данные не могут быть пустыми"
+        ttl = ttl or self.ttl
         logger.debug("Вставка данных в Redis")
         try:
-            for article in data:
-                try:
-                    published_at: str = DateFormatter.converting_date_to_string(0)
-                    article_desc = article.description if article.description else ""
-                    await self.client.hset(
-                        f"article:id:{article.id}",
+            async with self.client.pipeline(transaction=True) as pipeline:
+                index_keys: set[str] = set()
+                freshness_keys: set[str] = set()
+                for article in data:
+                    article_key = f"article:id:{article.id}"
+                    published_day = f"{article.published_at:%Y-%m-%d}"
+                    date_key = self.listing_key(published_day)
+                    category_key = self.listing_key(published_day, article.category)
+                    listing_member = {
+                        f"{article.id:012d}": ArticleCursor.datetime_to_timestamp(
+                            article.published_at
+                        )
+                    }
+                    body_key = f"article:body:{article.id}"
+                    pipeline.hset(
+                        article_key,
                         mapping={
                             "id": article.id,
                             "title": article.title,
                             "category": article.category,
-                            "description": article_desc,
-                            "views": article.views,
-                            "published_at": published_at,
-                            "content": article.content,
+                            "published_at": f"{article.published_at:%Y-%m-%d %H:%M:%S}",
                         },
                     )
-                    await self.client.sadd(
-                        f"article:date:{published_at}", f"article:id:{article.id}"
-                    )
-                    await self.client.sadd(
-                        f"article:category:{article.category}",
-                        f"article:id:{article.id}",
-                    )
-                    logger.debug("Данные успешно вставленны в Redis")
-                except (ValueError, KeyError, AttributeError) as error:
-                    logger.error(
-                        f"Произошла ошибка связанная с: {type(error).__name__}\
-                        Подробнее: {error}"
+                    # a cached count already holds the views not yet flushed to Postgres
+                    pipeline.hsetnx(article_key, "views", article.views)
+                    pipeline.expire(article_key, ttl)
+                    if with_body:
+                        pipeline.set(
+                            body_key,
+                            BodyCodec.encode(
+                                article.description,
+                                article.content,
+                                level=self.compression_level,
+                            ),
+                            ex=ttl,
+                        )
+                    if day_listing:
+                        pipeline.zadd(date_key, listing_member)
+                        index_keys.add(date_key)
+                        freshness_keys.add(self.freshness_key(published_day))
+                    if category_listing:
+                        pipeline.zadd(category_key, listing_member)
+                        index_keys.add(category_key)
+                        freshness_keys.add(
+                            self.freshness_key(published_day, article.category)
+                        )
+                for index_key in index_keys:
+                    pipeline.expire(index_key, ttl)
+                filled_at = time.time()
+                for freshness_key in freshness_keys:
+                    pipeline.hset(
+                        freshness_key,
+                        mapping={
+                            "filled_at": filled_at,
+                            "stale_at": filled_at + ttl * self.soft_ttl_ratio,
+                        },
                     )
-                    raise HTTPException(
-                        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-                        detail=f"Ошибка при вставке даных в redis.\n \
-                        Тип ошибки: {type(error).__name__}",
+                    pipeline.expire(freshness_key, ttl)
+                if index_keys:
+                    pipeline.incr(LISTING_VERSION_KEY)
+                if invalidate:
+                    pipeline.publish(
+                        INVALIDATE_CHANNEL, ",".join(str(article.id) for article in data)
                     )
-        except redis.ConnectionError as error:
-            logger.error(f"Redis Server недоступен. {error}")
-            return {
-                "status": "error",
-                "desc": "Redis Server недоступен",
-                "detail": str(error),
-                "type": "connection_type",
-            }
-        except Exception as error:
-            logger.error(f"Ошибка типа: {type(error).__name__}\n{error}")
-            return {
-                "status": "error",
-                "detail": str(error),
-            }
+                await pipeline.execute()
+            logger.debug(f"Данные успешно вставленны в Redis. Статей: {len(data)}")
+        except RedisError as error:
+            logger.error(f"Данные не записаны в Redis. {error}")
+            raise
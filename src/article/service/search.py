@@ -0,0 +1,98 @@
+import hashlib
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from article.schemas import Category, DisplayOnPageArticleSchema, SearchPageSchema
+from article.utils import CircuitBreaker
+from .postgre import PostgresDataManager
+from .redis import RedisDataManager
+
+
+class ArticleSearch:
+    '''
+    Ranked full-text search in Postgres. Result pages of hot queries are
+    kept in Redis for a short ttl, so new articles show up after at most
+    cache_ttl seconds. Only the rank_candidates newest matches are ranked,
+    the pages end there: a deeper page is empty and has no next page
+    '''
+    def __init__(
+        self,
+        redis_man: RedisDataManager,
+        postgre_man: PostgresDataManager,
+        breaker: CircuitBreaker,
+        cache_ttl: int = 60,
+        rank_candidates: int = 1000,
+    ):
+        self.redis_man = redis_man
+        self.postgre_man = postgre_man
+        self.breaker = breaker
+        self.cache_ttl = cache_ttl
+        self.rank_candidates = rank_candidates
+        self.hits_total: int = 0
+        self.misses_total: int = 0
+
+    @staticmethod
+    def normalize_query(query_text: str) -> str:
+        return " ".join(query_text.lower().split())
+
+    @staticmethod
+    def cache_key(query_text: str, page: int, page_size: int) -> str:
+        query_hash = hashlib.blake2b(query_text.encode("utf-8"), digest_size=12).hexdigest()
+        return f"search:{query_hash}:{page}:{page_size}"
+
+    async def search(
+        self,
+        query_text: str,
+        page: int = 1,
+        page_size: int = 20,
+    ) -> SearchPageSchema:
+        query_text = self.normalize_query(query_text)
+        cache_key = self.cache_key(query_text, page, page_size)
+        if self.breaker.allow():
+            try:
+                cached_page: bytes | None = await self.redis_man.client.get(cache_key)
+                self.breaker.record_success()
+                if cached_page is not None:
+                    self.hits_total += 1
+                    return SearchPageSchema.model_validate_json(cached_page)
+            except RedisError as error:
+                self.breaker.record_failure()
+                logger.error(f"Кэш поиска недоступен. {error}")
+
+        self.misses_total += 1
+        offset = (page - 1) * page_size
+        # one extra row tells if there is a next page, unless the candidates end first
+        limit = min(page_size + 1, self.rank_candidates - offset)
+        articles = []
+        if limit > 0:
+            articles = await self.postgre_man.search_articles(
+                query_text, offset=offset, limit=limit, candidates=self.rank_candidates
+            )
+        search_page = SearchPageSchema(
+            articles=[
+                DisplayOnPageArticleSchema(
+                    id=article.id,
+                    title=article.title,
+                    category=Category(article.category),
+                    views=article.views,
+                )
+                for article in articles[:page_size]
+                if article.category is not None
+            ],
+            next_page=page + 1 if len(articles) > page_size else None,
+        )
+        if self.breaker.closed:
+            try:
+                await self.redis_man.client.set(
+                    cache_key, search_page.model_dump_json(), ex=self.cache_ttl
+                )
+            except RedisError as error:
+                logger.error(f"Результат поиска не закэширован. {error}")
+        return search_page
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits_total": self.hits_total,
+            "misses_total": self.misses_total,
+        }
@@ -0,0 +1,120 @@
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, TypeVar
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+
+T = TypeVar("T")
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    '''
+    Coalesces concurrent fills of the same key into a single call.
+    Inside one process the waiters share an asyncio future, between workers
+    the fill is guarded by a Redis SET NX lock
+    '''
+    def __init__(
+        self,
+        client: Redis | None = None,
+        lock_ttl: int = 30,
+        wait_timeout: float = 30.0,
+        poll_interval: float = 0.1,
+    ):
+        self.client = client
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self.leaders_total: int = 0
+        self.coalesced_total: int = 0
+        self.coalesced_remote_total: int = 0
+
+    async def do(self, key: str, fill: Callable[[], Awaitable[T]]) -> T:
+        '''
+        Runs fill once per key. fill must re-check the cache itself, because
+        requests waiting on another worker call it again after the lock is released.
+        When the leader is cancelled, its waiters retry and one of them leads
+        '''
+        while (future := self._in_flight.get(key)) is not None:
+            self.coalesced_total += 1
+            logger.debug(f"Запрос присоединен к уже идущему заполнению {key}")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                logger.debug(f"Заполнение {key} отменено, запрос повторяется")
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.leaders_total += 1
+        try:
+            result = await self._fill_with_lock(key, fill)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # the leader reports the error itself, waiters are optional
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+    async def _fill_with_lock(self, key: str, fill: Callable[[], Awaitable[T]]) -> T:
+        if self.client is None:
+            return await fill()
+
+        lock_key = f"lock:fill:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.client.set(lock_key, token, nx=True, ex=self.lock_ttl)
+        except RedisError as error:
+            logger.error(f"Не удалось взять блокировку {lock_key}. {error}")
+            return await fill()
+
+        if not acquired:
+            await self._wait_for_release(lock_key)
+            self.coalesced_remote_total += 1
+            return await fill()
+
+        try:
+            return await fill()
+        finally:
+            try:
+                await self.client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            except RedisError as error:
+                logger.error(f"Не удалось снять блокировку {lock_key}. {error}")
+
+    async def _wait_for_release(self, lock_key: str) -> None:
+        deadline = time.monotonic() + self.wait_timeout
+        try:
+            while await self.client.exists(lock_key):
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Не дождался снятия блокировки {lock_key}")
+                    return
+                await asyncio.sleep(self.poll_interval)
+        except RedisError as error:
+            logger.error(f"Ошибка при ожидании блокировки {lock_key}. {error}")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders_total": self.leaders_total,
+            "coalesced_total": self.coalesced_total,
+            "coalesced_remote_total": self.coalesced_remote_total,
+        }
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from loguru import logger
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+
+from .postgre import PostgresDataManager
+from .redis import RedisDataManager, TRENDING_TTL
+
+
+class TrendingRebuilder:
+    '''
+    Restores the trending sets of today from Postgres when Redis lost them
+    (flush, restart without persistence or simply a new day without views yet)
+    '''
+    def __init__(
+        self,
+        redis_man: RedisDataManager,
+        postgre_man: PostgresDataManager,
+        interval: float = 300.0,
+        lookback_days: int = 2,
+        rebuild_limit: int = 500,
+    ):
+        self.redis_man = redis_man
+        self.postgre_man = postgre_man
+        self.interval = interval
+        self.lookback_days = lookback_days
+        self.rebuild_limit = rebuild_limit
+        self._task: asyncio.Task | None = None
+        self.rebuilds_total: int = 0
+
+    async def rebuild_if_missing(self) -> bool:
+        '''
+        Seeds today's sets with the total views, as if they were made at the start
+        of the day. The sentinel key claims the seeding, the views counted meanwhile
+        recreate the sets themselves, so their existence says nothing
+        '''
+        now = datetime.now(timezone.utc)
+        today = f"{now:%Y-%m-%d}"
+        client = self.redis_man.client
+        seeded_key = self.redis_man.trending_seeded_key(today)
+        if not await client.set(seeded_key, now.timestamp(), nx=True, ex=TRENDING_TTL):
+            return False
+
+        try:
+            articles = await self.postgre_man.select_most_viewed(
+                published_since=(now - timedelta(days=self.lookback_days)).replace(tzinfo=None),
+                limit=self.rebuild_limit,
+            )
+            if not articles:
+                await client.delete(seeded_key)
+                return False
+            # the trending rows are read from the hashes, the listings are left to their fills
+            await self.redis_man.insert_articles(
+                articles, day_listing=False, category_listing=False
+            )
+            async with client.pipeline(transaction=True) as pipeline:
+                for article in articles:
+                    member = {f"{article.id:012d}": article.views}
+                    for key in (
+                        self.redis_man.trending_key(today),
+                        self.redis_man.trending_key(today, article.category),
+                    ):
+                        pipeline.zadd(key, member, gt=True)
+                        pipeline.expire(key, TRENDING_TTL)
+                await pipeline.execute()
+        except (RedisError, SQLAlchemyError):
+            # the next run tries again
+            await client.delete(seeded_key)
+            raise
+
+        self.rebuilds_total += 1
+        logger.info(f"Популярные статьи за {today} восстановлены из БД: {len(articles)}")
+        return True
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.rebuild_if_missing()
+            except (RedisError, SQLAlchemyError) as error:
+                logger.error(f"Не удалось восстановить популярные статьи. {error}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict[str, int]:
+        return {"rebuilds_total": self.rebuilds_total}
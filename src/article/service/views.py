@@ -0,0 +1,112 @@
+import asyncio
+import uuid
+
+from loguru import logger
+from redis.exceptions import RedisError, ResponseError
+from sqlalchemy.exc import SQLAlchemyError
+
+from article.utils import CircuitBreaker
+from .postgre import PostgresDataManager
+from .redis import RedisDataManager, PENDING_VIEWS_KEY
+from .single_flight import RELEASE_LOCK_SCRIPT
+
+
+FLUSHING_VIEWS_KEY = "article:views:flushing"
+FLUSH_LOCK_KEY = "lock:views:flush"
+
+
+class ViewCounter:
+    '''
+    Write-behind view counting. Page views only touch Redis, the aggregated
+    deltas are moved to Postgres by a periodic flush. A flush that failed
+    or crashed leaves its deltas in Redis and is repeated, so every view
+    reaches Postgres at least once
+    '''
+    def __init__(
+        self,
+        redis_man: RedisDataManager,
+        postgre_man: PostgresDataManager,
+        breaker: CircuitBreaker,
+        flush_interval: float = 10.0,
+        lock_ttl: int = 60,
+    ):
+        self.redis_man = redis_man
+        self.postgre_man = postgre_man
+        self.breaker = breaker
+        self.flush_interval = flush_interval
+        self.lock_ttl = lock_ttl
+        self._task: asyncio.Task | None = None
+        self.flushes_total: int = 0
+        self.flushed_views_total: int = 0
+        self.failed_flushes_total: int = 0
+
+    async def count_view(self, id_object: int) -> None:
+        ''' Counts in Redis, writes to Postgres directly only while Redis is unavailable '''
+        if self.breaker.allow():
+            try:
+                await self.redis_man.count_view(id_object)
+                self.breaker.record_success()
+                return
+            except RedisError as error:
+                self.breaker.record_failure()
+                logger.error(f"Просмотр записывается сразу в БД. {error}")
+        await self.postgre_man.update_info_object(id_object, "views", 1)
+
+    async def flush(self) -> int:
+        ''' Moves the pending deltas to Postgres, returns the number of flushed views '''
+        client = self.redis_man.client
+        token = uuid.uuid4().hex
+        if not await client.set(FLUSH_LOCK_KEY, token, nx=True, ex=self.lock_ttl):
+            return 0
+        try:
+            # the deltas of an interrupted flush are applied before new ones
+            if not await client.exists(FLUSHING_VIEWS_KEY):
+                try:
+                    await client.rename(PENDING_VIEWS_KEY, FLUSHING_VIEWS_KEY)
+                except ResponseError:
+                    return 0
+            pending: dict[bytes, bytes] = await client.hgetall(FLUSHING_VIEWS_KEY)
+            deltas = {int(id_object): int(delta) for id_object, delta in pending.items()}
+            await self.postgre_man.increment_views(deltas)
+            await client.delete(FLUSHING_VIEWS_KEY)
+        finally:
+            await client.eval(RELEASE_LOCK_SCRIPT, 1, FLUSH_LOCK_KEY, token)
+
+        flushed_views = sum(deltas.values())
+        self.flushes_total += 1
+        self.flushed_views_total += flushed_views
+        logger.debug(f"Просмотры перенесены в БД: {flushed_views}")
+        return flushed_views
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except (RedisError, SQLAlchemyError) as error:
+                self.failed_flushes_total += 1
+                logger.error(f"Не удалось перенести просмотры в БД. {error}")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        ''' Stops the periodic flush and moves the remaining deltas to Postgres '''
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except (RedisError, SQLAlchemyError) as error:
+            logger.error(f"Просмотры останутся в Redis до следующего запуска. {error}")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "flushes_total": self.flushes_total,
+            "flushed_views_total": self.flushed_views_total,
+            "failed_flushes_total": self.failed_flushes_total,
+        }
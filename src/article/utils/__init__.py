@@ -1,3 +1,16 @@
 from .date_formater import DateFormatter
 
-from .decode_values import DecodeValues
\ No newline at end of file
+from .decode_values import DecodeValues
+
+from .token_bucket import TokenBucket
+
+from .cursor import ArticleCursor
+
+from .lru_cache import TTLLRUCache
+
+from .circuit_breaker import CircuitBreaker
+
+from .body_codec import BodyCodec
+
+from .fingerprint import ArticleFingerprint
+from .json_codec import JsonCodec
\ No newline at end of file
@@ -0,0 +1,43 @@
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class BodyCodec:
+    '''
+    Packs the large text fields of an article into one compressed value.
+    The first byte tells the codec, so values written with zlib stay
+    readable after zstandard gets installed. A zstd value cannot be read
+    without zstandard, decode raises ValueError and the caller treats the
+    body as missing
+    '''
+    ZLIB = b"z"
+    ZSTD = b"s"
+
+    @staticmethod
+    def encode(description: str | None, content: str | None, level: int = 6) -> bytes:
+        raw: bytes = json.dumps(
+            [description or "", content or ""], ensure_ascii=False
+        ).encode("utf-8")
+        if zstandard is not None:
+            return BodyCodec.ZSTD + zstandard.ZstdCompressor(level=level).compress(raw)
+
+        return BodyCodec.ZLIB + zlib.compress(raw, level)
+
+    @staticmethod
+    def decode(value: bytes) -> tuple[str, str]:
+        ''' returns (description, content) '''
+        codec, payload = value[:1], value[1:]
+        if codec == BodyCodec.ZSTD:
+            if zstandard is None:
+                raise ValueError("Тело статьи сжато zstd, а zstandard не установлен")
+            raw = zstandard.ZstdDecompressor().decompress(payload)
+        else:
+            raw = zlib.decompress(payload)
+        description, content = json.loads(raw)
+
+        return description, content
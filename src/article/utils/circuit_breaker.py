@@ -0,0 +1,70 @@
+import time
+
+
+class CircuitBreaker():
+    ''' 
+    Circuit breaker around an unreliable dependency
+    failure_threshold - how many failures in a row open the circuit
+    reset_timeout - how many seconds the circuit stays open before one trial call
+    '''
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state: str = self.CLOSED
+        self.failures: int = 0
+        self.opened_at: float = 0.0
+        self.opened_total: int = 0
+        self.fallbacks_total: int = 0
+        self.fallback_seconds_total: float = 0.0
+        self.fallback_seconds_max: float = 0.0
+
+    @property
+    def closed(self) -> bool:
+        return self.state == self.CLOSED
+
+    def allow(self) -> bool:
+        ''' 
+        Closed lets everything through. Open lets one trial call through
+        every reset_timeout seconds, its result closes or reopens the circuit
+        '''
+        if self.state == self.CLOSED:
+            return True
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return False
+        self.state = self.HALF_OPEN
+        self.opened_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened_total += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def record_fallback(self, seconds: float) -> None:
+        ''' Keeps the latency of the requests served by the fallback '''
+        self.fallbacks_total += 1
+        self.fallback_seconds_total += seconds
+        self.fallback_seconds_max = max(self.fallback_seconds_max, seconds)
+
+    def stats(self) -> dict[str, str | int | float]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened_total": self.opened_total,
+            "fallbacks_total": self.fallbacks_total,
+            "fallback_seconds_avg": round(
+                self.fallback_seconds_total / self.fallbacks_total, 6
+            ) if self.fallbacks_total else 0.0,
+            "fallback_seconds_max": round(self.fallback_seconds_max, 6),
+        }
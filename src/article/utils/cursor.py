@@ -0,0 +1,29 @@
+from calendar import timegm
+from datetime import datetime, timezone
+
+
+class ArticleCursor():
+    ''' 
+    Keyset cursor of the article listings. Listings are ordered by
+    (published_at, id) descending, the cursor is the last shown pair
+    '''
+    @staticmethod
+    def encode(published_ts: int, id_article: int) -> str:
+        ''' converts the last shown (timestamp, id) pair into a cursor string '''
+        return f"{published_ts}-{id_article}"
+
+    @staticmethod
+    def decode(cursor: str) -> tuple[int, int]:
+        ''' converts a cursor string into a (timestamp, id) pair, raises ValueError if it is broken '''
+        published_ts, id_article = cursor.split("-")
+
+        return int(published_ts), int(id_article)
+
+    @staticmethod
+    def datetime_to_timestamp(date_: datetime) -> int:
+        ''' published_at is stored without a timezone in UTC '''
+        return timegm(date_.utctimetuple())
+
+    @staticmethod
+    def timestamp_to_datetime(published_ts: int) -> datetime:
+        return datetime.fromtimestamp(published_ts, timezone.utc).replace(tzinfo=None)
@@ -23,3 +23,28 @@ class DateFormatter():
         date_published: datetime = datetime.strptime(date_, "%Y-%m-%dT%H:%M:%SZ")
 
         return date_published
+
+    @staticmethod
+    def converting_string_to_day_range(date_: str) -> tuple[datetime, datetime]:
+        ''' converts a day string into the half-open range [start, end) for index-friendly filters '''
+        day_start: datetime = datetime.strptime(date_, "%Y-%m-%d")
+
+        return day_start, day_start + timedelta(days=1)
+
+    @staticmethod
+    def converting_range_to_days(date_from: str, date_to: str) -> list[str]:
+        ''' lists the days of an inclusive range, newest first '''
+        first_day: date = datetime.strptime(date_from, "%Y-%m-%d").date()
+        last_day: date = datetime.strptime(date_to, "%Y-%m-%d").date()
+
+        return [
+            f"{last_day - timedelta(days=shift):%Y-%m-%d}"
+            for shift in range((last_day - first_day).days + 1)
+        ]
+
+    @staticmethod
+    def days_ago(date_: str) -> int:
+        ''' how many days ago (UTC) the given day was '''
+        day: date = datetime.strptime(date_, "%Y-%m-%d").date()
+
+        return (datetime.now(timezone.utc).date() - day).days
@@ -0,0 +1,74 @@
+import hashlib
+import re
+from urllib.parse import urlsplit
+
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class ArticleFingerprint():
+    '''
+    Fingerprints for ingestion-time de-duplication:
+    exact hashes of the normalized title and url, and a 64-bit SimHash
+    of title and description for near-duplicates (rewritten syndicated copies)
+    '''
+    BITS = 64
+    BANDS = 4
+
+    @staticmethod
+    def hash_text(text: str) -> int:
+        return int.from_bytes(
+            hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+
+    @staticmethod
+    def normalize_title(title: str) -> str:
+        ''' lower case words only, so punctuation and spacing differences match '''
+        return " ".join(WORD_PATTERN.findall(title.lower()))
+
+    @staticmethod
+    def normalize_url(url: str | None) -> str:
+        ''' drops scheme, www, query, fragment and the trailing slash '''
+        if not url:
+            return ""
+        parts = urlsplit(url.strip().lower())
+        host = parts.netloc.removeprefix("www.")
+
+        return f"{host}{parts.path.rstrip('/')}"
+
+    @staticmethod
+    def simhash(text: str) -> int:
+        ''' 64-bit SimHash over word unigrams and bigrams '''
+        words = WORD_PATTERN.findall(text.lower())
+        features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+        if not features:
+            return 0
+        # bit columns are summed over "0"/"1" strings instead of shifting every bit
+        bit_rows = [
+            format(ArticleFingerprint.hash_text(feature), "064b").encode()
+            for feature in features
+        ]
+        half = len(bit_rows) * (ord("0") + ord("1")) / 2
+        bits = "".join(
+            "1" if sum(column) > half else "0" for column in zip(*bit_rows)
+        )
+
+        return int(bits, 2)
+
+    @staticmethod
+    def bands(simhash: int) -> list[tuple[int, int]]:
+        '''
+        Splits the SimHash into (band number, band value) pairs. Two hashes within
+        BANDS - 1 differing bits always share at least one band
+        '''
+        width = ArticleFingerprint.BITS // ArticleFingerprint.BANDS
+        mask = (1 << width) - 1
+
+        return [
+            (band, simhash >> (band * width) & mask)
+            for band in range(ArticleFingerprint.BANDS)
+        ]
+
+    @staticmethod
+    def distance(first: int, second: int) -> int:
+        return (first ^ second).bit_count()
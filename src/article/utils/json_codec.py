@@ -0,0 +1,46 @@
+from typing import Any, Iterable
+
+import orjson
+
+
+class JsonCodec:
+    '''
+    Serializes articles for the JSON API with orjson. Only the selected
+    fields are read from the objects, so the pydantic dump step is skipped
+    and fields a client did not ask for are never copied
+    '''
+    LISTING_FIELDS = ("id", "title", "category", "views")
+    DETAIL_FIELDS = ("id", "category", "title", "description", "views", "published_at", "content")
+
+    @staticmethod
+    def parse_fields(fields: str | None, allowed: tuple[str, ...]) -> tuple[str, ...]:
+        ''' "id,title" -> ("id", "title"), all allowed fields when nothing is given '''
+        if not fields:
+            return allowed
+        selected = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in selected if name not in allowed]
+        if unknown or not selected:
+            raise ValueError(f"Неизвестные поля: {', '.join(unknown)}")
+
+        return selected
+
+    @staticmethod
+    def project(obj: Any, fields: tuple[str, ...]) -> dict[str, Any]:
+        ''' Field values of a pydantic model, its own dict when all fields are selected in order '''
+        values: dict[str, Any] = obj.__dict__
+        if len(fields) == len(values) and fields == tuple(values):
+            return values
+        return {name: values[name] for name in fields}
+
+    @staticmethod
+    def dump_object(obj: Any, fields: tuple[str, ...]) -> bytes:
+        return orjson.dumps(JsonCodec.project(obj, fields))
+
+    @staticmethod
+    def dump_page(
+        objects: Iterable[Any], fields: tuple[str, ...], **extra: Any
+    ) -> bytes:
+        ''' {"articles": [...], **extra}, e.g. next_cursor of a listing page '''
+        return orjson.dumps(
+            {"articles": [JsonCodec.project(obj, fields) for obj in objects], **extra}
+        )
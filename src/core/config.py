@@ -1,11 +1,31 @@
+import os
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import SecretStr, BaseModel
 
 
-class RunSettings:
+class RunSettings(BaseModel):
     host: str = "localhost"
     port: int = 8080
-    
+    workers: int = 0  # 0 - one worker per CPU core
+    reload: bool = False
+    loop: str = "auto"  # auto picks uvloop when it is installed
+    http: str = "auto"  # auto picks httptools when it is installed
+    backlog: int = 2048
+    keepalive: int = 5
+    graceful_timeout: int = 30
+    preload: bool = True
+    max_requests: int = 0
+
+    @property
+    def worker_count(self) -> int:
+        return self.workers or os.cpu_count() or 1
+
+
+class LoggingSettings(BaseModel):
+    level: str = "DEBUG"
+    serialize: bool = False
+
 
 class DBSettings(BaseModel):
     host: str = "localhost"
@@ -13,28 +33,143 @@ class DBSettings(BaseModel):
     username: str = "postgres"
     name: str
     password: SecretStr
+    insert_batch_size: int = 500
 
 
 class RedisSettings(BaseModel):
     host: str
     port: int
     db_number: int = 0
-    max_connection = 50
-    
-    
+    max_connection: int = 50
+    pool_timeout: int = 5
+    ttl: int = 172800
+    compression_level: int = 6
+    # listings go stale after this share of their TTL and are refreshed in the background
+    soft_ttl_ratio: float = 0.8
+
+
+class FillSettings(BaseModel):
+    distributed: bool = True
+    lock_ttl: int = 30
+    wait_timeout: float = 30.0
+    poll_interval: float = 0.1
+    hot_days: int = 2
+    cold_ttl: int = 900
+
+
+class PageCacheSettings(BaseModel):
+    max_pages: int = 256
+    gzip_level: int = 6
+    br_quality: int = 5
+    streaming: bool = False
+    stream_rows_chunk: int = 100
+    stream_flush_bytes: int = 16384
+    # a larger streamed page is sent without being kept, so streaming bounds the memory
+    stream_cache_bytes: int = 262144
+
+
+class ViewsSettings(BaseModel):
+    flush_interval: float = 10.0
+    lock_ttl: int = 60
+
+
+class NewsApiSettings(BaseModel):
+    url: str = "https://newsapi.org/v2/everything"
+    timeout: float = 10.0
+    connect_timeout: float = 3.0
+    retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    connection_limit: int = 20
+    limit_per_host: int = 10
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30.0
+    rate_limit: float = 1.0
+    burst: int = 7
+    daily_quota: int = 100
+
+
+class IngestionSettings(BaseModel):
+    # None - only when the web server runs a single worker, several would each run the schedule
+    in_app: bool | None = None
+    # a run requests all 7 categories: 12 runs a day are 84 of the 100 free requests
+    interval: float = 7200.0
+    lock_ttl: int = 600
+
+
+class PaginationSettings(BaseModel):
+    page_size: int = 30
+    max_page_size: int = 100
+    max_days: int = 7
+
+
+class TrendingSettings(BaseModel):
+    half_life: float = 3600.0
+    default_limit: int = 10
+    max_limit: int = 100
+    rebuild_interval: float = 300.0
+    lookback_days: int = 2
+    rebuild_limit: int = 500
+
+
+class DetailCacheSettings(BaseModel):
+    maxsize: int = 1024
+    ttl: float = 5.0
+
+
+class BreakerSettings(BaseModel):
+    failure_threshold: int = 5
+    reset_timeout: float = 10.0
+    snapshot_size: int = 256
+    snapshot_ttl: float = 300.0
+
+
+class DedupSettings(BaseModel):
+    enabled: bool = True
+    capacity: int = 50000
+    window: int = 172800
+    max_distance: int = 3
+
+
+class SearchSettings(BaseModel):
+    page_size: int = 20
+    max_page: int = 50
+    cache_ttl: int = 60
+    # newest matches that are ranked, the result pages end after them
+    rank_candidates: int = 1000
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
         env_nested_delimiter="_",
+        # only the first "_" separates the section, so REDIS_DB_NUMBER reaches redis.db_number
+        env_nested_max_split=1,
         case_sensitive=False
     )
     api_key: str
+    newsapi: NewsApiSettings = NewsApiSettings()
     redis: RedisSettings 
     db: DBSettings       
+    fill: FillSettings = FillSettings()
+    pages: PageCacheSettings = PageCacheSettings()
+    pagination: PaginationSettings = PaginationSettings()
+    views: ViewsSettings = ViewsSettings()
+    ingestion: IngestionSettings = IngestionSettings()
+    dedup: DedupSettings = DedupSettings()
+    trending: TrendingSettings = TrendingSettings()
+    detail: DetailCacheSettings = DetailCacheSettings()
+    breaker: BreakerSettings = BreakerSettings()
+    search: SearchSettings = SearchSettings()
+    logging: LoggingSettings = LoggingSettings()
     uvicorn: RunSettings = RunSettings() 
+
+    @property
+    def ingestion_in_app(self) -> bool:
+        if self.ingestion.in_app is None:
+            return self.uvicorn.worker_count == 1
+        return self.ingestion.in_app
     
 
 settings = Settings()
-
-print(settings)
\ No newline at end of file
@@ -0,0 +1,12 @@
+import sys
+
+from loguru import logger
+
+
+def setup_logger(level: str = "DEBUG", serialize: bool = False) -> None:
+    '''
+    Replaces the default loguru sink. serialize=True writes one JSON object
+    per line, so the messages can be parsed by a log collector
+    '''
+    logger.remove()
+    logger.add(sys.stderr, level=level, serialize=serialize)
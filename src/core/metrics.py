@@ -0,0 +1,195 @@
+import functools
+import inspect
+import os
+import time
+from typing import Any, Callable, Iterator
+
+from prometheus_client import REGISTRY, CollectorRegistry, Histogram, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+from article.utils import CircuitBreaker
+
+
+# from 0.5 ms, most Redis calls finish below 1 ms
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_DURATION = Histogram(
+    "stage_duration_seconds",
+    "Duration of the Redis, Postgres, NewsAPI and template stages",
+    ["component", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def timed(component: str, method: Callable) -> Callable:
+    ''' Wraps a coroutine function, the labelled child is bound once to keep the overhead low '''
+    histogram = STAGE_DURATION.labels(component, method.__name__)
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started_at)
+
+    return wrapper
+
+
+def instrument(component: str) -> Callable[[type], type]:
+    ''' Class decorator, times every public coroutine method of the class '''
+    def decorate(cls: type) -> type:
+        for name, method in list(vars(cls).items()):
+            if not name.startswith("_") and inspect.iscoroutinefunction(method):
+                setattr(cls, name, timed(component, method))
+        return cls
+
+    return decorate
+
+
+class MetricsMiddleware:
+    '''
+    Pure ASGI middleware observing REQUEST_DURATION. The route label is the
+    path template set by the router, so ids and categories do not add series
+    '''
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started_at = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                scope["method"], getattr(route, "path", "other"), status_code
+            ).observe(time.perf_counter() - started_at)
+
+
+class AppStatsCollector(Collector):
+    '''
+    Exports the counters the shared objects already keep (the same ones as /stats)
+    at scrape time, so the request path pays nothing for them
+    '''
+    def __init__(self, state: Any):
+        self.state = state
+
+    def _cache_tiers(self) -> Iterator[tuple[str, int, int]]:
+        detail = self.state.detail_cache.stats()
+        snapshots = self.state.article_loader.snapshots.stats()
+        page_cache = self.state.page_cache.stats()
+        search = self.state.article_search.stats()
+        yield "page", page_cache["hits_total"], page_cache["misses_total"]
+        yield "detail_l1", detail["l1"]["hits"], detail["l1"]["misses"]
+        yield "detail_l2", detail["l2"]["hits"], detail["l2"]["misses"]
+        yield "listing_snapshot", snapshots["hits"], snapshots["misses"]
+        yield "search", search["hits_total"], search["misses_total"]
+
+    def collect(self) -> Iterator[Metric]:
+        hits = CounterMetricFamily("cache_hits", "Cache hits per tier", labels=["tier"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses per tier", labels=["tier"])
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Hit ratio per tier since start", labels=["tier"])
+        for tier, tier_hits, tier_misses in self._cache_tiers():
+            hits.add_metric([tier], tier_hits)
+            misses.add_metric([tier], tier_misses)
+            lookups = tier_hits + tier_misses
+            ratio.add_metric([tier], tier_hits / lookups if lookups else 0.0)
+        yield from (hits, misses, ratio)
+
+        listing = self.state.article_loader.stats()
+        listing_reads = CounterMetricFamily(
+            "listing_reads", "Listing reads by cache status", labels=["status"]
+        )
+        for status in ("hit", "stale", "miss", "bypass"):
+            listing_reads.add_metric([status], listing[f"{status}_total"])
+        yield listing_reads
+        yield CounterMetricFamily(
+            "listing_refreshes", "Background refreshes of stale listings",
+            value=listing["refreshes_total"],
+        )
+        yield CounterMetricFamily(
+            "listing_refresh_errors", "Failed background refreshes",
+            value=listing["refresh_errors_total"],
+        )
+
+        pool = self.state.redis_man.pool_stats()
+        connections = GaugeMetricFamily(
+            "redis_pool_connections", "Connections of the shared Redis pool", labels=["state"]
+        )
+        for pool_state in ("in_use", "available", "max_connections", "peak_in_use"):
+            connections.add_metric([pool_state], pool[pool_state])
+        yield connections
+        yield GaugeMetricFamily(
+            "redis_pool_saturation",
+            "Share of the pool connections in use",
+            value=pool["in_use"] / pool["max_connections"],
+        )
+        yield CounterMetricFamily(
+            "redis_pool_waits", "Connection requests that had to wait", value=pool["waited_total"]
+        )
+        yield CounterMetricFamily(
+            "redis_pool_exhausted",
+            "Connection requests that timed out",
+            value=pool["exhausted_total"],
+        )
+
+        breaker = self.state.redis_breaker.stats()
+        yield GaugeMetricFamily(
+            "redis_breaker_open", "1 while the Redis breaker is not closed",
+            value=int(breaker["state"] != CircuitBreaker.CLOSED),
+        )
+        yield CounterMetricFamily(
+            "redis_breaker_fallbacks", "Reads served by the fallback", value=breaker["fallbacks_total"]
+        )
+
+        newsapi = self.state.request_api_man.stats()
+        yield CounterMetricFamily(
+            "newsapi_requests", "Requests sent to NewsAPI", value=newsapi["requests_total"]
+        )
+        yield CounterMetricFamily(
+            "newsapi_retries", "Retried NewsAPI requests", value=newsapi["retries_total"]
+        )
+        yield CounterMetricFamily(
+            "newsapi_limiter_wait_seconds",
+            "Time spent waiting for the rate limiter",
+            value=newsapi["limiter_wait_seconds"],
+        )
+        yield GaugeMetricFamily(
+            "newsapi_quota_used_ratio",
+            "Share of the daily NewsAPI quota used, by all processes when it is kept in Redis",
+            value=newsapi["requests_today"] / newsapi["daily_quota"],
+        )
+
+
+def metrics_registry(stats_collector: AppStatsCollector) -> CollectorRegistry:
+    '''
+    With several workers (PROMETHEUS_MULTIPROC_DIR is set) the histograms are
+    merged from the files of all workers, the stats collector reports the
+    worker that answered the scrape
+    '''
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(stats_collector)
+    return registry
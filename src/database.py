@@ -3,12 +3,12 @@ from sqlalchemy.orm import  DeclarativeBase
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from contextlib import asynccontextmanager
 
-from .config import postg_config as post_conf
+from core import settings
 
 
 url_connect_db = ("postgresql+asyncpg://"
-                f"{post_conf.username}:{post_conf.password}"
-                f"@{post_conf.host}/{post_conf.name}"
+                f"{settings.db.username}:{settings.db.password.get_secret_value()}"
+                f"@{settings.db.host}:{settings.db.port}/{settings.db.name}"
             )
 engine = create_async_engine(url_connect_db)
 
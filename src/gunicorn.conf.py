@@ -0,0 +1,48 @@
+'''
+Production entry point, run from src:
+    gunicorn -c gunicorn.conf.py main:app
+The app is imported once in the master and forked (preload), every worker
+runs its own event loop and lifespan. SIGTERM stops accepting connections and
+gives the workers graceful_timeout seconds to finish requests and flush views.
+With several workers the ingestion runs in its own process:
+    python -m worker
+'''
+import os
+
+from core import settings
+
+
+# the metrics module opens its files when the preloaded app is imported, before on_starting
+multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if multiproc_dir:
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+bind = f"{settings.uvicorn.host}:{settings.uvicorn.port}"
+workers = settings.uvicorn.worker_count
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = settings.uvicorn.preload
+backlog = settings.uvicorn.backlog
+keepalive = settings.uvicorn.keepalive
+graceful_timeout = settings.uvicorn.graceful_timeout
+max_requests = settings.uvicorn.max_requests
+max_requests_jitter = settings.uvicorn.max_requests // 10
+accesslog = None
+
+
+def on_starting(server):
+    ''' Drops the metric files of the previous run, the master keeps its own open '''
+    if not multiproc_dir:
+        return
+    for name in os.listdir(multiproc_dir):
+        # files are named {type}_{pid}.db
+        pid = name.rpartition("_")[2].removesuffix(".db")
+        if name.endswith(".db") and pid != str(os.getpid()):
+            os.remove(os.path.join(multiproc_dir, name))
+
+
+def child_exit(server, worker):
+    if multiproc_dir:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
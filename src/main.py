@@ -1,28 +1,176 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
 from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 import uvicorn
 
 from core import settings
+from core.logger import setup_logger
+from core.metrics import AppStatsCollector, MetricsMiddleware, metrics_registry
+from article.utils import CircuitBreaker
+from database import engine
+from article.api.router import article_router
+from article.api.json_router import api_router
+from article.service import (
+    ArticleDetailCache,
+    ArticleLoader,
+    ArticleSearch,
+    IngestionWorker,
+    PageCache,
+    SingleFlight,
+    TrendingRebuilder,
+    ViewCounter,
+)
+from resources import (
+    create_ingestion_worker,
+    create_postgre_man,
+    create_redis_man,
+    create_request_api_man,
+)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ''' Creates the shared service objects on startup and drains them on shutdown '''
+    app.state.redis_man = create_redis_man()
+    app.state.postgre_man = create_postgre_man()
+    app.state.request_api_man = create_request_api_man(app.state.redis_man)
+    app.state.redis_breaker = CircuitBreaker(
+        failure_threshold=settings.breaker.failure_threshold,
+        reset_timeout=settings.breaker.reset_timeout,
+    )
+    app.state.single_flight = SingleFlight(
+        client=app.state.redis_man.client if settings.fill.distributed else None,
+        lock_ttl=settings.fill.lock_ttl,
+        wait_timeout=settings.fill.wait_timeout,
+        poll_interval=settings.fill.poll_interval,
+    )
+    app.state.article_loader = ArticleLoader(
+        redis_man=app.state.redis_man,
+        postgre_man=app.state.postgre_man,
+        single_flight=app.state.single_flight,
+        breaker=app.state.redis_breaker,
+        fill_batch_size=settings.db.insert_batch_size,
+        snapshot_size=settings.breaker.snapshot_size,
+        snapshot_ttl=settings.breaker.snapshot_ttl,
+        hot_days=settings.fill.hot_days,
+        cold_ttl=settings.fill.cold_ttl,
+        stream_chunk_size=settings.pages.stream_rows_chunk,
+    )
+    app.state.page_cache = PageCache(
+        max_pages=settings.pages.max_pages,
+        gzip_level=settings.pages.gzip_level,
+        br_quality=settings.pages.br_quality,
+    )
+    app.state.view_counter = ViewCounter(
+        redis_man=app.state.redis_man,
+        postgre_man=app.state.postgre_man,
+        breaker=app.state.redis_breaker,
+        flush_interval=settings.views.flush_interval,
+        lock_ttl=settings.views.lock_ttl,
+    )
+    app.state.view_counter.start()
+    app.state.ingestion_worker = create_ingestion_worker(
+        app.state.redis_man, app.state.postgre_man, app.state.request_api_man
+    )
+    if settings.ingestion_in_app:
+        app.state.ingestion_worker.start()
+    app.state.trending_rebuilder = TrendingRebuilder(
+        redis_man=app.state.redis_man,
+        postgre_man=app.state.postgre_man,
+        interval=settings.trending.rebuild_interval,
+        lookback_days=settings.trending.lookback_days,
+        rebuild_limit=settings.trending.rebuild_limit,
+    )
+    app.state.trending_rebuilder.start()
+    app.state.detail_cache = ArticleDetailCache(
+        redis_man=app.state.redis_man,
+        postgre_man=app.state.postgre_man,
+        breaker=app.state.redis_breaker,
+        maxsize=settings.detail.maxsize,
+        ttl=settings.detail.ttl,
+    )
+    app.state.detail_cache.start()
+    app.state.article_search = ArticleSearch(
+        redis_man=app.state.redis_man,
+        postgre_man=app.state.postgre_man,
+        breaker=app.state.redis_breaker,
+        cache_ttl=settings.search.cache_ttl,
+        rank_candidates=settings.search.rank_candidates,
+    )
+    app.state.stats_collector = AppStatsCollector(app.state)
+    REGISTRY.register(app.state.stats_collector)
+    logger.info("Общие ресурсы приложения созданы")
+    try:
+        yield
+    finally:
+        REGISTRY.unregister(app.state.stats_collector)
+        await app.state.article_loader.close()
+        await app.state.detail_cache.stop()
+        await app.state.trending_rebuilder.stop()
+        await app.state.ingestion_worker.stop()
+        await app.state.view_counter.stop()
+        await app.state.request_api_man.close()
+        await app.state.redis_man.close()
+        await engine.dispose()
+        logger.info("Общие ресурсы приложения освобождены")
+
 
-app = FastAPI()
+setup_logger(level=settings.logging.level, serialize=settings.logging.serialize)
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
+app.include_router(article_router)
+app.include_router(api_router)
+
 
 @app.get("/")
 async def main():
     return RedirectResponse("/articles/all")
 
 
+@app.get("/stats")
+async def stats(request: Request):
+    ''' Returns the counters of the shared resources '''
+    return {
+        "redis_breaker": request.app.state.redis_breaker.stats(),
+        "redis_pool": request.app.state.redis_man.pool_stats(),
+        "single_flight": request.app.state.single_flight.stats(),
+        "listing": request.app.state.article_loader.stats(),
+        "page_cache": request.app.state.page_cache.stats(),
+        "detail_cache": request.app.state.detail_cache.stats(),
+        "search": request.app.state.article_search.stats(),
+        "views": request.app.state.view_counter.stats(),
+        "trending": request.app.state.trending_rebuilder.stats(),
+        "newsapi": request.app.state.request_api_man.stats(),
+        "ingestion": await IngestionWorker.read_status(request.app.state.redis_man),
+    }
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    ''' Prometheus exposition of the request, stage and cache metrics '''
+    registry = metrics_registry(request.app.state.stats_collector)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     logger.info("Сервер запущен")
     uvicorn.run(
-        "src.main:app", 
-        port=settings.uvicorn.port, 
-        host=settings.uvicorn.host, 
-        reload=True
+        "main:app",
+        host=settings.uvicorn.host,
+        port=settings.uvicorn.port,
+        reload=settings.uvicorn.reload,
+        workers=None if settings.uvicorn.reload else settings.uvicorn.worker_count,
+        loop=settings.uvicorn.loop,
+        http=settings.uvicorn.http,
+        backlog=settings.uvicorn.backlog,
+        timeout_keep_alive=settings.uvicorn.keepalive,
+        timeout_graceful_shutdown=settings.uvicorn.graceful_timeout,
     )
     logger.info("Сервер остановлен")
@@ -0,0 +1,77 @@
+from core import settings
+from article.service import (
+    ArticleDeduplicator,
+    IngestionWorker,
+    RequestArticleApi,
+    RedisDataManager,
+    PostgresDataManager
+)
+
+
+def create_redis_man() -> RedisDataManager:
+    ''' Creates the object for working with the redis, it owns the shared pool '''
+    return RedisDataManager(
+        host=settings.redis.host,
+        port=settings.redis.port,
+        max_connetion=settings.redis.max_connection,
+        db_number=settings.redis.db_number,
+        pool_timeout=settings.redis.pool_timeout,
+        ttl=settings.redis.ttl,
+        trending_half_life=settings.trending.half_life,
+        compression_level=settings.redis.compression_level,
+        soft_ttl_ratio=settings.redis.soft_ttl_ratio,
+    )
+
+
+def create_postgre_man() -> PostgresDataManager:
+    ''' Creates the object for working with the db '''
+    return PostgresDataManager(
+        insert_batch_size=settings.db.insert_batch_size,
+    )
+
+
+def create_request_api_man(redis_man: RedisDataManager) -> RequestArticleApi:
+    ''' Creates the object for getting information about articles, the daily quota is kept in redis '''
+    return RequestArticleApi(
+        api_key=settings.api_key,
+        base_url=settings.newsapi.url,
+        total_timeout=settings.newsapi.timeout,
+        connect_timeout=settings.newsapi.connect_timeout,
+        max_retries=settings.newsapi.retries,
+        backoff_base=settings.newsapi.backoff_base,
+        backoff_max=settings.newsapi.backoff_max,
+        connection_limit=settings.newsapi.connection_limit,
+        limit_per_host=settings.newsapi.limit_per_host,
+        dns_cache_ttl=settings.newsapi.dns_cache_ttl,
+        keepalive_timeout=settings.newsapi.keepalive_timeout,
+        rate_limit=settings.newsapi.rate_limit,
+        burst=settings.newsapi.burst,
+        daily_quota=settings.newsapi.daily_quota,
+        client=redis_man.client,
+    )
+
+
+def create_deduplicator(redis_man: RedisDataManager) -> ArticleDeduplicator:
+    ''' Creates the ingestion-time filter of duplicated stories '''
+    return ArticleDeduplicator(
+        redis_man=redis_man,
+        capacity=settings.dedup.capacity,
+        window=settings.dedup.window,
+        max_distance=settings.dedup.max_distance,
+    )
+
+
+def create_ingestion_worker(
+    redis_man: RedisDataManager,
+    postgre_man: PostgresDataManager,
+    request_man: RequestArticleApi,
+) -> IngestionWorker:
+    ''' Creates the worker that pre-fetches articles from NewsAPI '''
+    return IngestionWorker(
+        redis_man=redis_man,
+        postgre_man=postgre_man,
+        request_man=request_man,
+        interval=settings.ingestion.interval,
+        lock_ttl=settings.ingestion.lock_ttl,
+        deduplicator=create_deduplicator(redis_man) if settings.dedup.enabled else None,
+    )
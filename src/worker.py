@@ -0,0 +1,36 @@
+import asyncio
+
+from loguru import logger
+
+from core import settings
+from core.logger import setup_logger
+from database import engine
+from resources import (
+    create_ingestion_worker,
+    create_postgre_man,
+    create_redis_man,
+    create_request_api_man,
+)
+
+
+async def run_worker():
+    ''' Runs the ingestion schedule outside of the web process '''
+    redis_man = create_redis_man()
+    request_api_man = create_request_api_man(redis_man)
+    worker = create_ingestion_worker(redis_man, create_postgre_man(), request_api_man)
+    try:
+        await worker.run()
+    finally:
+        await request_api_man.close()
+        await redis_man.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    setup_logger(level=settings.logging.level, serialize=settings.logging.serialize)
+    logger.info("Загрузчик статей запущен")
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        pass
+    logger.info("Загрузчик статей остановлен")
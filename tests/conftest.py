@@ -0,0 +1,113 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC))
+# the settings are read on import; the Postgres tests take the real values from the environment
+for name, value in (
+    ("API_KEY", "test"),
+    ("REDIS_HOST", "localhost"),
+    ("REDIS_PORT", "6379"),
+    ("DB_NAME", "articles"),
+    ("DB_PASSWORD", "postgres"),
+):
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def postgres(monkeypatch):
+    '''
+    Creates the tables in a throwaway "pytest" schema of the configured database
+    and points create_session at it. Skips the test when Postgres is unreachable
+    '''
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    import database
+    from database import Base
+
+    test_engine = create_async_engine(
+        database.url_connect_db,
+        connect_args={"server_settings": {"search_path": "pytest"}},
+    )
+    try:
+        async with test_engine.begin() as connection:
+            await connection.execute(text("DROP SCHEMA IF EXISTS pytest CASCADE"))
+            await connection.execute(text("CREATE SCHEMA pytest"))
+            await connection.run_sync(Base.metadata.create_all)
+    except Exception as error:
+        await test_engine.dispose()
+        pytest.skip(f"Postgres is unreachable: {error}")
+    monkeypatch.setattr(
+        database,
+        "async_session",
+        async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False),
+    )
+    try:
+        yield test_engine
+    finally:
+        async with test_engine.begin() as connection:
+            await connection.execute(text("DROP SCHEMA IF EXISTS pytest CASCADE"))
+        await test_engine.dispose()
+
+
+@pytest.fixture
+async def redis_man():
+    ''' RedisDataManager on a fresh fakeredis server, the Lua scripts run through lupa '''
+    import fakeredis
+    from fakeredis.aioredis import FakeAsyncRedisConnection
+    from redis.asyncio import Redis
+
+    from article.service import RedisDataManager
+    from article.service.redis import COUNT_VIEW_SCRIPT, CountingConnectionPool
+
+    manager = RedisDataManager("localhost", 6379, 10)
+    manager.pool = CountingConnectionPool(
+        connection_class=FakeAsyncRedisConnection,
+        server=fakeredis.FakeServer(),
+        max_connections=10,
+    )
+    manager.client = Redis(connection_pool=manager.pool)
+    manager.count_view_script = manager.client.register_script(COUNT_VIEW_SCRIPT)
+    try:
+        yield manager
+    finally:
+        await manager.close()
+
+
+@pytest.fixture
+async def serve(monkeypatch):
+    '''
+    Starts an app with uvicorn on a free port: await serve(app) returns its base url.
+    Templates and static files are resolved from src, the lifespan is not run
+    '''
+    import uvicorn
+
+    monkeypatch.chdir(SRC)
+    servers = []
+
+    async def start(app) -> str:
+        server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=0, lifespan="off", log_level="warning")
+        )
+        servers.append((server, asyncio.create_task(server.serve())))
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    try:
+        yield start
+    finally:
+        for server, task in servers:
+            server.should_exit = True
+            await task
@@ -0,0 +1,297 @@
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+
+import aiohttp
+import pytest
+from fastapi import FastAPI
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from stub_newsapi import REQUESTS, start_stub  # noqa: E402
+
+from article.api.json_router import api_router  # noqa: E402
+from article.schemas import (  # noqa: E402
+    ArticleSchema,
+    ArticlesPageSchema,
+    CacheStatus,
+    Category,
+    DisplayOnPageArticleSchema,
+    ListingFreshnessSchema,
+)
+from article.service import RequestArticleApi  # noqa: E402
+from article.utils import ArticleCursor  # noqa: E402
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def newsapi(request):
+    '''
+    Starts the stub NewsAPI on a free port and yields (runner, client).
+    Parametrize indirectly with {"failures": [...], **RequestArticleApi kwargs}
+    '''
+    options = dict(getattr(request, "param", {}))
+    failures = options.pop("failures", ())
+    runner = await start_stub(port=0, articles_per_category=3, failures=failures)
+    port = runner.addresses[0][1]
+    options.setdefault("backoff_base", 0.01)
+    options.setdefault("rate_limit", 1000.0)
+    client = RequestArticleApi(
+        "test", base_url=f"http://127.0.0.1:{port}/v2/everything", **options
+    )
+    try:
+        yield runner, client
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def stub_requests(runner) -> list[float]:
+    return runner.app[REQUESTS]
+
+
+@pytest.mark.parametrize(
+    "newsapi",
+    [
+        {"failures": [(429, {"Retry-After": "0"})]},
+        {"failures": [(503, {}), (502, {})]},
+        {"failures": [(429, {"Retry-After": "Sat, 01 Jan 2000 00:00:00 GMT"})]},
+    ],
+    indirect=True,
+    ids=["429 retry-after seconds", "5xx backoff", "429 retry-after date"],
+)
+async def test_retries_until_success(newsapi):
+    runner, client = newsapi
+
+    articles = await client.request_article("science", "2026-10-17")
+
+    assert isinstance(articles, list) and len(articles) == 3
+    assert len(stub_requests(runner)) > 1
+    assert client.retries_total == len(stub_requests(runner)) - 1
+    assert client.requests_today == len(stub_requests(runner))
+
+
+@pytest.mark.parametrize("newsapi", [{"failures": [(500, {})] * 3, "max_retries": 2}], indirect=True)
+async def test_gives_up_after_max_retries(newsapi):
+    runner, client = newsapi
+
+    result = await client.request_article("science", "2026-10-17")
+
+    assert result["status"] == 500
+    assert len(stub_requests(runner)) == 3
+
+
+def test_retry_after_header_forms():
+    client = RequestArticleApi("test", backoff_base=0.0)
+    in_ten_seconds = datetime.now(timezone.utc) + timedelta(seconds=10)
+
+    assert client._retry_delay(0, "7") == 7.0
+    assert 8.0 < client._retry_delay(0, format_datetime(in_ten_seconds, usegmt=True)) <= 10.0
+    assert client._retry_delay(0, "Sat, 01 Jan 2000 00:00:00 GMT") == 0.0
+    # an unparsable header falls back to the backoff
+    assert client._retry_delay(0, "soon") == 0.0
+
+
+@pytest.mark.parametrize("newsapi", [{"rate_limit": 20.0, "burst": 2}], indirect=True)
+async def test_limiter_paces_requests(newsapi):
+    runner, client = newsapi
+    started_at = time.monotonic()
+
+    for _ in range(6):
+        await client.request_article("science", "2026-10-17")
+
+    # the burst goes at once, the other 4 tokens take 1/20 s each
+    assert time.monotonic() - started_at >= 4 / 20 * 0.9
+    # tokens also accrue while a request is in flight, so the waits add up to less
+    assert 0 < client.limiter_wait_seconds <= 4 / 20
+    assert len(stub_requests(runner)) == 6
+
+
+@pytest.mark.parametrize(
+    "newsapi", [{"daily_quota": 3, "failures": [(429, {"Retry-After": "0"})]}], indirect=True
+)
+async def test_daily_quota_counts_retries_and_refuses(newsapi):
+    runner, client = newsapi
+
+    assert isinstance(await client.request_article("science", "2026-10-17"), list)
+    assert isinstance(await client.request_article("health", "2026-10-17"), list)
+    result = await client.request_article("sports", "2026-10-17")
+
+    assert result["status"] == "quota_exceeded"
+    assert len(stub_requests(runner)) == 3
+    assert client.stats()["rejected_total"] == 1
+
+
+@pytest.mark.parametrize("newsapi", [{"failures": [(200, {}, ["not", "an", "object"])]}], indirect=True)
+async def test_payload_that_is_not_an_object_is_an_error(newsapi):
+    runner, client = newsapi
+
+    result = await client.request_article("science", "2026-10-17")
+
+    assert result["status"] == 200
+    assert len(stub_requests(runner)) == 1
+
+
+async def test_daily_quota_is_shared_through_redis(redis_man):
+    runner = await start_stub(port=0, articles_per_category=1)
+    base_url = f"http://127.0.0.1:{runner.addresses[0][1]}/v2/everything"
+    # two processes, or one process before and after a restart
+    clients = [
+        RequestArticleApi(
+            "test", base_url=base_url, rate_limit=1000.0, daily_quota=3, client=redis_man.client
+        )
+        for _ in range(2)
+    ]
+    try:
+        results = [
+            await client.request_article("science", "2026-10-17")
+            for client in (clients[0], clients[0], clients[1], clients[1])
+        ]
+    finally:
+        for client in clients:
+            await client.close()
+        await runner.cleanup()
+
+    assert [isinstance(result, list) for result in results] == [True, True, True, False]
+    assert results[-1]["status"] == "quota_exceeded"
+    assert len(stub_requests(runner)) == 3
+    quota_key = f"newsapi:quota:{datetime.now(timezone.utc):%Y-%m-%d}"
+    assert await redis_man.client.get(quota_key) == b"3"
+    assert 0 < await redis_man.client.ttl(quota_key) <= 86400
+
+
+class OnePageLoader:
+    ''' Stands in for ArticleLoader, records the listings asked for '''
+    def __init__(self):
+        self.calls = []
+
+    def page(self) -> ArticlesPageSchema:
+        return ArticlesPageSchema(
+            articles=[
+                DisplayOnPageArticleSchema(
+                    id=number, title=f"Article {number}", category=Category.science, views=number
+                )
+                for number in (2, 1)
+            ],
+            next_cursor="next-cursor",
+            freshness=ListingFreshnessSchema(status=CacheStatus.hit, filled_at=time.time()),
+        )
+
+    async def get_all_articles(self, days, cursor=None, page_size=30):
+        self.calls.append((days, None, cursor, page_size))
+        return self.page()
+
+    async def get_articles_by_category(self, days, category, cursor=None, page_size=30):
+        self.calls.append((days, category, cursor, page_size))
+        return self.page()
+
+
+class OneDetail:
+    ''' Stands in for ArticleDetailCache and ViewCounter '''
+    article = ArticleSchema(
+        id=7,
+        category=Category.health,
+        title="Article 7",
+        description=None,
+        views=3,
+        published_at="2026-10-17 12:00:00",
+        content="Body",
+    )
+
+    def __init__(self):
+        self.viewed = []
+
+    async def get(self, id_object):
+        return self.article if id_object == self.article.id else None
+
+    async def count_view(self, id_object):
+        self.viewed.append(id_object)
+
+
+@pytest.fixture
+async def json_api(serve):
+    app = FastAPI()
+    app.include_router(api_router)
+    app.state.article_loader = OnePageLoader()
+    app.state.detail_cache = app.state.view_counter = OneDetail()
+    async with aiohttp.ClientSession(base_url=await serve(app)) as session:
+        yield app.state, session
+
+
+async def test_json_listing_shape(json_api):
+    state, session = json_api
+
+    async with session.get("/api/v1/articles/all?date=2026-10-17&limit=2") as response:
+        body = await response.read()
+        assert response.status == 200
+        assert response.content_type == "application/json"
+        assert response.headers["X-Cache"] == "HIT"
+
+    assert json.loads(body) == {
+        "articles": [
+            {"id": 2, "title": "Article 2", "category": "science", "views": 2},
+            {"id": 1, "title": "Article 1", "category": "science", "views": 1},
+        ],
+        "next_cursor": "next-cursor",
+    }
+    # orjson writes no spaces
+    assert body.startswith(b'{"articles":[{"id":2,"title":"Article 2"')
+    assert state.article_loader.calls == [(["2026-10-17"], None, None, 2)]
+
+
+async def test_json_category_listing_with_selected_fields(json_api):
+    state, session = json_api
+    cursor = ArticleCursor.encode(1760000000, 5)
+
+    async with session.get(
+        "/api/v1/articles/science", params={"fields": "id,views", "cursor": cursor}
+    ) as response:
+        assert response.status == 200
+        page = await response.json()
+
+    assert page["articles"] == [{"id": 2, "views": 2}, {"id": 1, "views": 1}]
+    [(_, category, called_cursor, _)] = state.article_loader.calls
+    assert (category, called_cursor) == (Category.science, cursor)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/api/v1/articles/all?fields=id,secret",
+        "/api/v1/articles/all?cursor=broken",
+        "/api/v1/articles/about/7?fields=password",
+    ],
+)
+async def test_json_api_rejects_bad_parameters(json_api, path):
+    state, session = json_api
+
+    async with session.get(path) as response:
+        assert response.status == 400
+    assert state.article_loader.calls == [] and state.view_counter.viewed == []
+
+
+async def test_json_detail_shape_and_views(json_api):
+    state, session = json_api
+
+    async with session.get("/api/v1/articles/about/7") as full, session.get(
+        "/api/v1/articles/about/7?fields=title,content"
+    ) as selected, session.get("/api/v1/articles/about/8") as missing:
+        assert full.status == selected.status == 200
+        assert await full.json() == {
+            "id": 7,
+            "category": "health",
+            "title": "Article 7",
+            "description": None,
+            "views": 3,
+            "published_at": "2026-10-17 12:00:00",
+            "content": "Body",
+        }
+        assert await selected.json() == {"title": "Article 7", "content": "Body"}
+        assert missing.status == 404
+
+    assert state.view_counter.viewed == [7, 7]
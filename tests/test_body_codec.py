@@ -0,0 +1,39 @@
+import zlib
+
+import pytest
+
+from article.utils import BodyCodec, body_codec
+
+
+def test_round_trip_with_zlib(monkeypatch):
+    monkeypatch.setattr(body_codec, "zstandard", None)
+
+    value = BodyCodec.encode("Описание", "Text")
+
+    assert value[:1] == BodyCodec.ZLIB
+    assert BodyCodec.decode(value) == ("Описание", "Text")
+
+
+def test_zstd_value_without_zstandard_raises_value_error(monkeypatch):
+    monkeypatch.setattr(body_codec, "zstandard", None)
+
+    with pytest.raises(ValueError):
+        BodyCodec.decode(BodyCodec.ZSTD + zlib.compress(b'["", ""]'))
+
+
+@pytest.mark.anyio
+async def test_unreadable_body_is_a_cache_miss(redis_man, monkeypatch):
+    monkeypatch.setattr(body_codec, "zstandard", None)
+    await redis_man.client.hset(
+        "article:id:1",
+        mapping={
+            "id": 1,
+            "title": "Title",
+            "category": "science",
+            "views": 0,
+            "published_at": "2026-10-17 12:00:00",
+        },
+    )
+    await redis_man.client.set("article:body:1", BodyCodec.ZSTD + b"\x28\xb5\x2f\xfd")
+
+    assert await redis_man.get_specific_article(1) is None
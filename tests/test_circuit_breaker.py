@@ -0,0 +1,85 @@
+import pytest
+
+from article.utils import CircuitBreaker, circuit_breaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_failures_in_a_row_open_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.closed and breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.opened_total == 1
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.closed
+
+
+def test_open_circuit_lets_one_trial_through_after_the_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0)
+    breaker.record_failure()
+
+    clock.now += 9.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # the other requests wait for the result of the trial
+    assert not breaker.allow()
+
+
+def test_trial_result_closes_or_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0)
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now += 10.0
+    assert breaker.allow()
+    breaker.record_failure()
+    # one failed trial is enough, the threshold is for the closed circuit
+    assert breaker.state == CircuitBreaker.OPEN and breaker.opened_total == 2
+    assert not breaker.allow()
+
+    clock.now += 10.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.closed and breaker.failures == 0
+    assert breaker.allow()
+
+
+def test_fallback_latency_is_kept(clock):
+    breaker = CircuitBreaker()
+
+    breaker.record_fallback(0.002)
+    breaker.record_fallback(0.004)
+
+    stats = breaker.stats()
+    assert stats["fallbacks_total"] == 2
+    assert stats["fallback_seconds_avg"] == 0.003
+    assert stats["fallback_seconds_max"] == 0.004
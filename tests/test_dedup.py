@@ -0,0 +1,33 @@
+import pytest
+
+from article.service import ArticleDeduplicator
+
+
+pytestmark = pytest.mark.anyio
+
+
+def row(title: str, url: str) -> dict:
+    return {
+        "title": title,
+        "description": "Central banks kept rates unchanged on Thursday",
+        "content": "The decision was expected by most analysts",
+        "url": url,
+    }
+
+
+async def test_refetched_copy_is_counted_once(redis_man):
+    deduplicator = ArticleDeduplicator(redis_man)
+    day = [
+        row("Rates stay on hold", "https://one.example/rates"),
+        row("Rates stay on hold", "https://two.example/rates"),
+    ]
+
+    assert await deduplicator.filter(day) == day[:1]
+    saved = (deduplicator.saved_storage_bytes, deduplicator.saved_cache_bytes)
+    # the next run fetches the same day again
+    assert await deduplicator.filter(day) == day[:1]
+
+    assert deduplicator.exact_duplicates_total == 1
+    assert (deduplicator.saved_storage_bytes, deduplicator.saved_cache_bytes) == saved
+    assert saved[0] > 0
+    assert deduplicator.checked_total == 4
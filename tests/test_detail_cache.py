@@ -0,0 +1,141 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ConnectionError
+
+from article.service import ArticleDetailCache
+from article.service.redis import INVALIDATE_CHANNEL
+from article.utils import CircuitBreaker
+
+
+pytestmark = pytest.mark.anyio
+
+
+def article_row(id_article: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=id_article,
+        title=f"Article {id_article}",
+        category="science",
+        description="Short description",
+        views=5,
+        published_at=datetime(2026, 10, 17, 12, 0),
+        content="Body text of the article",
+    )
+
+
+class OneArticle:
+    ''' Stands in for PostgresDataManager.get_specific_article '''
+    def __init__(self, row: SimpleNamespace):
+        self.row = row
+        self.reads = 0
+
+    async def get_specific_article(self, id_object):
+        self.reads += 1
+        return self.row if id_object == self.row.id else None
+
+
+async def test_listing_rows_are_cached_without_body(redis_man):
+    await redis_man.insert_articles([article_row(1)])
+
+    assert await redis_man.client.exists("article:id:1")
+    assert not await redis_man.client.exists("article:body:1")
+
+
+async def test_detail_read_caches_hash_and_body_without_listings(redis_man):
+    postgre_man = OneArticle(article_row(7))
+    detail_cache = ArticleDetailCache(redis_man, postgre_man, CircuitBreaker(), ttl=0.0)
+    version = await redis_man.get_listing_version()
+
+    # the listing hash has expired, only Postgres has the article
+    first = await detail_cache.get(7)
+    second = await detail_cache.get(7)
+
+    assert first == second and second.content == "Body text of the article"
+    assert postgre_man.reads == 1
+    assert (detail_cache.l2_misses, detail_cache.l2_hits) == (1, 1)
+    assert await redis_man.client.exists("article:id:7", "article:body:7") == 2
+    assert await redis_man.client.keys("article:date:*") == []
+    assert await redis_man.client.keys("article:category:*") == []
+    assert await redis_man.client.keys("article:fresh:*") == []
+    assert await redis_man.get_listing_version() == version
+
+
+@pytest.fixture
+def failing_writes(monkeypatch):
+    ''' MULTI/EXEC pipelines fail as if Redis went away, the reads still work '''
+    execute = Pipeline.execute
+
+    async def execute_or_fail(self, *args, **kwargs):
+        if self.is_transaction:
+            raise ConnectionError("Connection reset by peer")
+        return await execute(self, *args, **kwargs)
+
+    monkeypatch.setattr(Pipeline, "execute", execute_or_fail)
+
+
+async def test_failed_cache_write_still_serves_the_article(redis_man, failing_writes):
+    detail_cache = ArticleDetailCache(redis_man, OneArticle(article_row(7)), CircuitBreaker())
+
+    with pytest.raises(ConnectionError):
+        await redis_man.insert_articles([article_row(1)])
+    article = await detail_cache.get(7)
+
+    assert article is not None and article.id == 7
+    assert not await redis_man.client.exists("article:id:7")
+
+
+async def listening(detail_cache: ArticleDetailCache) -> None:
+    ''' Starts the invalidation listener and waits for its subscription '''
+    detail_cache.start()
+    for _ in range(100):
+        [(_, subscribers)] = await detail_cache.redis_man.client.pubsub_numsub(
+            INVALIDATE_CHANNEL
+        )
+        if subscribers:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("the listener did not subscribe")
+
+
+async def until(condition) -> None:
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("the condition was not met in time")
+
+
+async def test_detail_fill_publishes_no_invalidation(redis_man):
+    detail_cache = ArticleDetailCache(redis_man, OneArticle(article_row(7)), CircuitBreaker())
+    pubsub = redis_man.client.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(INVALIDATE_CHANNEL)
+    try:
+        await detail_cache.get(7)
+        await redis_man.insert_articles([article_row(1)])
+        # messages arrive in order, a publish by the fill would come first
+        message = None
+        while message is None:
+            message = await pubsub.get_message(timeout=1.0)
+    finally:
+        await pubsub.aclose()
+
+    assert message["data"] == b"1"
+
+
+async def test_malformed_invalidation_does_not_stop_the_listener(redis_man):
+    detail_cache = ArticleDetailCache(redis_man, OneArticle(article_row(7)), CircuitBreaker())
+    await listening(detail_cache)
+    try:
+        detail_cache.l1.set(1, "stale")
+        detail_cache.l1.set(2, "stale")
+        await redis_man.client.publish(INVALIDATE_CHANNEL, "oops,1")
+        await redis_man.client.publish(INVALIDATE_CHANNEL, "2")
+        await until(lambda: detail_cache.l1.stats()["invalidations"] == 2)
+
+        assert detail_cache.l1.stats()["size"] == 0
+        assert not detail_cache._task.done()
+    finally:
+        await detail_cache.stop()
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from article.service import IngestionWorker, PostgresDataManager
+from article.service.ingestion import INGESTION_STATUS_KEY
+from core import settings
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_run_is_counted_and_the_loop_goes_on(monkeypatch):
+    worker = IngestionWorker(None, None, None, interval=0.01)
+    calls = []
+
+    async def run_once():
+        calls.append(1)
+        raise ValueError("unexpected payload")
+
+    monkeypatch.setattr(worker, "run_once", run_once)
+    worker.start()
+    deadline = time.monotonic() + 5
+    while len(calls) < 2 and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    await worker.stop()
+
+    assert len(calls) > 1
+    assert worker.failed_runs_total == len(calls) == worker.runs_total
+
+
+class FailingApi:
+    async def request_article(self, category, published_at):
+        return {"status": "error", "message": "rateLimited"}
+
+
+class OneCategoryApi:
+    async def request_article(self, category, published_at):
+        if category != "science":
+            return {"status": "error", "message": "rateLimited"}
+        return [
+            {
+                "title": "Title",
+                "description": "Description",
+                "url": "https://example.com/1",
+                "publishedAt": f"{published_at}T10:00:00Z",
+                "content": "Content",
+            }
+        ]
+
+
+class FakePostgre:
+    parse_articles = staticmethod(PostgresDataManager.parse_articles)
+
+    def __init__(self):
+        self.inserted = []
+
+    async def insert_rows(self, rows):
+        self.inserted.extend(rows)
+        return rows
+
+    async def iter_articles(self, date_):
+        yield [object()]
+
+
+class FailingWarm:
+    def __init__(self, client):
+        self.client = client
+
+    async def insert_articles(self, articles):
+        raise RedisConnectionError("connection lost")
+
+
+async def test_run_without_any_category_is_not_a_success(redis_man):
+    postgre = FakePostgre()
+    worker = IngestionWorker(redis_man, postgre, FailingApi())
+
+    with pytest.raises(RuntimeError):
+        await worker.run_once("2025-10-01")
+
+    assert worker.last_success_at is None
+    assert postgre.inserted == []
+    assert not await redis_man.client.exists(INGESTION_STATUS_KEY)
+    # the lock is released for the next run
+    assert not await redis_man.client.exists("lock:ingestion:2025-10-01")
+
+
+async def test_failed_redis_warm_is_not_a_success(redis_man):
+    worker = IngestionWorker(FailingWarm(redis_man.client), FakePostgre(), OneCategoryApi())
+
+    with pytest.raises(RedisConnectionError):
+        await worker.run_once("2025-10-01")
+
+    assert worker.last_success_at is None
+    assert not await redis_man.client.exists(INGESTION_STATUS_KEY)
+
+
+@pytest.mark.parametrize(
+    ("in_app", "workers", "expected"),
+    [(None, 1, True), (None, 4, False), (True, 4, True), (False, 1, False)],
+)
+def test_ingestion_runs_in_app_only_with_one_worker(monkeypatch, in_app, workers, expected):
+    monkeypatch.setattr(settings.ingestion, "in_app", in_app)
+    monkeypatch.setattr(settings.uvicorn, "workers", workers)
+
+    assert settings.ingestion_in_app is expected
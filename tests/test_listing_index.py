@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from article.service import PostgresDataManager
+
+
+SEED_ROWS = """
+INSERT INTO articles (category, title, description, url, views, published_at, content)
+SELECT
+    (ARRAY['business', 'entertainment', 'general', 'health', 'science', 'sports', 'technology'])[n % 7 + 1],
+    'Title ' || n,
+    'Description ' || n,
+    'https://example.com/' || n,
+    n % 100,
+    TIMESTAMP '2026-07-01' + (n * INTERVAL '7 minutes'),
+    'Content ' || n
+FROM generate_series(1, 20000) AS n
+"""
+
+
+def explain(query) -> str:
+    compiled = query.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    return f"EXPLAIN {compiled}"
+
+
+@pytest.mark.postgres
+@pytest.mark.anyio
+@pytest.mark.parametrize("category", [None, "science"])
+async def test_listing_page_uses_published_at_category_index(postgres, category):
+    async with postgres.begin() as connection:
+        await connection.execute(text(SEED_ROWS))
+        await connection.execute(text("ANALYZE articles"))
+        query = PostgresDataManager.articles_page_query(
+            "2026-08-15", category=category, limit=31
+        )
+        plan = "\n".join((await connection.execute(text(explain(query)))).scalars())
+
+    assert "ix_articles_published_at_category" in plan, plan
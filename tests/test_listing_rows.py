@@ -0,0 +1,19 @@
+import pytest
+
+from article.schemas import Category, DisplayOnPageArticleSchema
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_listing_rows_skip_expired_hashes_and_decode_bytes(redis_man):
+    await redis_man.client.hset(
+        "article:id:7",
+        mapping={"id": 7, "title": "Заголовок", "category": "science", "views": 3},
+    )
+
+    rows = await redis_man.get_listing_rows([7, 8])
+
+    assert rows == [
+        DisplayOnPageArticleSchema(id=7, title="Заголовок", category=Category.science, views=3)
+    ]
@@ -0,0 +1,186 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from article.schemas import CacheStatus, Category
+from article.service import ArticleLoader, SingleFlight
+from article.utils import CircuitBreaker, DateFormatter
+
+
+pytestmark = pytest.mark.anyio
+
+CATEGORIES = ("science", "health", "sports")
+
+
+class DayArticles:
+    ''' Stands in for PostgresDataManager.iter_articles over a fixed set of rows '''
+    def __init__(self, date_: str, count: int = 9):
+        day_start = datetime.strptime(date_, "%Y-%m-%d")
+        self.rows = [
+            SimpleNamespace(
+                id=number,
+                title=f"Article {number}",
+                category=CATEGORIES[number % len(CATEGORIES)],
+                views=0,
+                published_at=day_start + timedelta(minutes=number),
+            )
+            for number in range(1, count + 1)
+        ]
+        self.reads = 0
+        self.page_reads = 0
+
+    async def iter_articles(self, date_, category=None, batch_size=500, with_body=False):
+        self.reads += 1
+        rows = [row for row in self.rows if category is None or row.category == category]
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    async def select_articles_page(
+        self, date_publish, category=None, cursor=None, limit=30, first_date=None
+    ):
+        ''' The first page only, the fallback tests do not follow the cursor '''
+        self.page_reads += 1
+        rows = [row for row in self.rows if category is None or row.category == category]
+        return sorted(rows, key=lambda row: (row.published_at, row.id), reverse=True)[:limit]
+
+
+@pytest.fixture
+def yesterday() -> str:
+    return DateFormatter.converting_date_to_string(1)
+
+
+@pytest.fixture
+async def loader_parts(redis_man, yesterday):
+    postgre_man = DayArticles(yesterday)
+    loader = ArticleLoader(
+        redis_man,
+        postgre_man,
+        SingleFlight(redis_man.client, poll_interval=0.01),
+        CircuitBreaker(),
+        fill_batch_size=4,
+    )
+    try:
+        yield loader, postgre_man
+    finally:
+        await loader.close()
+
+
+async def test_category_fill_does_not_complete_the_day_listing(loader_parts, redis_man, yesterday):
+    loader, postgre_man = loader_parts
+
+    category_page = await loader.get_articles_by_category([yesterday], Category.science)
+    day_page = await loader.get_all_articles([yesterday])
+
+    assert {article.category for article in category_page.articles} == {Category.science}
+    assert day_page.freshness.status == CacheStatus.miss
+    assert len(day_page.articles) == len(postgre_man.rows)
+    assert postgre_man.reads == 2
+
+
+async def test_day_fill_serves_the_categories_from_cache(loader_parts, yesterday):
+    loader, postgre_man = loader_parts
+
+    await loader.get_all_articles([yesterday])
+    category_page = await loader.get_articles_by_category([yesterday], Category.health)
+
+    assert category_page.freshness.status == CacheStatus.hit
+    assert [article.id for article in category_page.articles] == [7, 4, 1]
+    assert postgre_man.reads == 1
+
+
+async def test_stale_listing_is_served_and_refreshed_once(loader_parts, redis_man, yesterday):
+    loader, postgre_man = loader_parts
+    await loader.get_all_articles([yesterday])
+    # the soft deadline passes, the hard one (the key TTL) does not
+    await redis_man.client.hset(
+        redis_man.freshness_key(yesterday), "stale_at", time.time() - 1
+    )
+
+    pages = await asyncio.gather(*[loader.get_all_articles([yesterday]) for _ in range(3)])
+
+    assert {page.freshness.status for page in pages} == {CacheStatus.stale}
+    assert all(len(page.articles) == len(postgre_man.rows) for page in pages)
+    assert len(loader._refreshing) == 1
+    await asyncio.gather(*loader._refreshing.values())
+    assert loader.refreshes_total == 1
+    assert postgre_man.reads == 2
+    page = await loader.get_all_articles([yesterday])
+    assert page.freshness.status == CacheStatus.hit
+
+
+@pytest.fixture
+def redis_server(redis_man):
+    return redis_man.pool.connection_kwargs["server"]
+
+
+@pytest.fixture
+async def fragile_loader(redis_man, yesterday):
+    ''' A loader whose breaker opens on the first Redis failure '''
+    postgre_man = DayArticles(yesterday)
+    loader = ArticleLoader(
+        redis_man,
+        postgre_man,
+        SingleFlight(redis_man.client, poll_interval=0.01),
+        CircuitBreaker(failure_threshold=1, reset_timeout=60.0),
+    )
+    try:
+        yield loader, postgre_man
+    finally:
+        await loader.close()
+
+
+async def test_open_breaker_serves_the_last_page_from_the_snapshot(
+    fragile_loader, redis_server, yesterday
+):
+    loader, postgre_man = fragile_loader
+    cached_page = await loader.get_all_articles([yesterday], page_size=5)
+
+    redis_server.connected = False
+    failed_over = await loader.get_all_articles([yesterday], page_size=5)
+    while_open = await loader.get_all_articles([yesterday], page_size=5)
+
+    assert loader.breaker.state == CircuitBreaker.OPEN
+    for page in (failed_over, while_open):
+        assert page.freshness.status == CacheStatus.bypass
+        assert page.articles == cached_page.articles
+        assert page.next_cursor == cached_page.next_cursor
+    assert postgre_man.page_reads == 0
+    assert loader.breaker.fallbacks_total == 0
+    assert loader.stats()["bypass_total"] == 2
+
+
+async def test_open_breaker_without_a_snapshot_reads_postgres(
+    fragile_loader, redis_server, yesterday
+):
+    loader, postgre_man = fragile_loader
+    redis_server.connected = False
+
+    page = await loader.get_articles_by_category([yesterday], Category.science, page_size=2)
+
+    assert loader.breaker.state == CircuitBreaker.OPEN
+    assert page.freshness.status == CacheStatus.bypass
+    assert [article.id for article in page.articles] == [9, 6]
+    assert page.next_cursor is not None
+    assert postgre_man.page_reads == 1
+    assert loader.breaker.fallbacks_total == 1
+
+
+async def test_breaker_closes_when_redis_comes_back(fragile_loader, redis_server, yesterday):
+    loader, postgre_man = fragile_loader
+    redis_server.connected = False
+    await loader.get_all_articles([yesterday])
+
+    redis_server.connected = True
+    # still open: Redis is not tried until the reset timeout
+    page = await loader.get_all_articles([yesterday])
+    assert page.freshness.status == CacheStatus.bypass
+    loader.breaker.reset_timeout = 0.0
+    page = await loader.get_all_articles([yesterday])
+
+    assert loader.breaker.closed
+    assert page.freshness.status == CacheStatus.miss
+    assert len(page.articles) == len(postgre_man.rows)
+    assert postgre_man.page_reads == 2
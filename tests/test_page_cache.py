@@ -0,0 +1,92 @@
+import gzip
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Request
+
+from article.service import PageCache
+
+
+def request_with(**headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "headers": [
+                (name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()
+            ],
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        ("", "identity"),
+        ("gzip, deflate, br", "br"),
+        ("GZIP", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("gzip;q=0", "identity"),
+        ("gzip;q=0.5, br;q=0.4", "gzip"),
+        ("br;q=0.5, gzip;q=0.5", "br"),
+        ("*", "br"),
+        ("*;q=0.1, gzip;q=0.8", "gzip"),
+        ("identity", "identity"),
+        ("identity;q=1, gzip;q=0.5", "identity"),
+    ],
+)
+def test_choose_encoding_reads_q_values(accept_encoding, expected):
+    assert PageCache.choose_encoding(accept_encoding) == expected
+
+
+def test_choose_encoding_without_brotli():
+    assert PageCache.choose_encoding("br, gzip;q=0.5", with_br=False) == "gzip"
+
+
+def test_response_uses_the_chosen_encoding():
+    page_cache = PageCache()
+    page = page_cache.put(("day",), 1, b"<html>listing</html>")
+
+    response = page_cache.build_response(request_with(accept_encoding="br;q=0, gzip"), page)
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == b"<html>listing</html>"
+    assert "content-encoding" not in page_cache.build_response(
+        request_with(accept_encoding="gzip;q=0"), page
+    ).headers
+
+
+def test_matching_etag_answers_not_modified():
+    page_cache = PageCache()
+    page = page_cache.put(("day",), 1, b"<html>listing</html>")
+
+    not_modified = page_cache.build_response(
+        request_with(if_none_match=f'"other", {page.etag}'), page
+    )
+    modified = page_cache.build_response(request_with(if_none_match='"other"'), page)
+
+    assert not_modified.status_code == 304 and not_modified.headers["etag"] == page.etag
+    assert modified.status_code == 200
+    assert page_cache.stats()["not_modified_total"] == 1
+
+
+def test_new_version_misses_and_changes_the_etag():
+    page_cache = PageCache()
+    old_page = page_cache.put(("day",), 1, b"<html>listing</html>")
+
+    assert page_cache.get(("day",), 1) is old_page
+    assert page_cache.get(("day",), 2) is None
+    assert page_cache.put(("day",), 2, b"<html>listing</html>").etag != old_page.etag
+
+
+@pytest.mark.anyio
+async def test_listing_write_bumps_the_version(redis_man):
+    row = SimpleNamespace(
+        id=1, title="Title", category="science", views=0, published_at=datetime(2026, 10, 17, 9)
+    )
+    version = await redis_man.get_listing_version()
+
+    await redis_man.insert_articles([row], day_listing=False, category_listing=False)
+    assert await redis_man.get_listing_version() == version
+    await redis_man.insert_articles([row])
+    assert await redis_man.get_listing_version() == version + 1
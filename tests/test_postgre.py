@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import pytest
+
+from article.service import PostgresDataManager
+from article.service.postgre import DESCRIPTION_MAX_LENGTH, TITLE_MAX_LENGTH
+
+
+def newsapi_article(number: int, description: str = "short") -> dict:
+    return {
+        "title": f"Title {number}",
+        "description": description,
+        "url": f"https://example.com/{number}",
+        "publishedAt": "2026-10-17T10:00:00Z",
+        "content": "content",
+    }
+
+
+def test_parse_articles_truncates_long_text_columns():
+    long_text = "word " * 200
+    payload = {"science": [{**newsapi_article(1, long_text), "title": long_text}]}
+
+    row, = PostgresDataManager.parse_articles(payload)
+
+    assert 0 < len(row["title"]) <= TITLE_MAX_LENGTH
+    assert 0 < len(row["description"]) <= DESCRIPTION_MAX_LENGTH
+
+
+def test_parse_articles_skips_rows_without_title_or_date():
+    payload = {
+        "science": [
+            {**newsapi_article(1), "title": None},
+            {**newsapi_article(2), "publishedAt": "yesterday"},
+            newsapi_article(3),
+        ]
+    }
+
+    rows = PostgresDataManager.parse_articles(payload)
+
+    assert [row["url"] for row in rows] == ["https://example.com/3"]
+
+
+@pytest.mark.postgres
+@pytest.mark.anyio
+async def test_insert_rows_commits_every_batch_separately(postgres):
+    postgre_man = PostgresDataManager(insert_batch_size=1)
+    rows = [
+        {
+            "category": "science",
+            "title": f"Title {number}",
+            # bypasses parse_articles, so the second row breaks VARCHAR(300)
+            "description": "x" * (DESCRIPTION_MAX_LENGTH + 1 if number == 2 else 10),
+            "url": f"https://example.com/{number}",
+            "published_at": datetime(2026, 10, 17, 10, number),
+            "content": "content",
+        }
+        for number in range(1, 4)
+    ]
+
+    inserted = await postgre_man.insert_rows(rows)
+
+    assert sorted(article.title for article in inserted) == ["Title 1", "Title 3"]
+    assert set(inserted[0]._fields) == {"id", "title", "category", "views", "published_at"}
+
+
+@pytest.mark.postgres
+@pytest.mark.anyio
+async def test_increment_views_applies_every_delta(postgres):
+    postgre_man = PostgresDataManager()
+    inserted = await postgre_man.insert_rows(
+        [
+            {
+                "category": "science",
+                "title": f"Title {number}",
+                "description": "description",
+                "url": f"https://example.com/{number}",
+                "published_at": datetime(2026, 10, 17, 10, number),
+                "content": "content",
+            }
+            for number in range(1, 4)
+        ]
+    )
+    first, second, third = sorted(article.id for article in inserted)
+
+    await postgre_man.increment_views({first: 3, second: 1})
+    await postgre_man.increment_views({first: 2})
+
+    views = {
+        article.id: article.views
+        for article in await postgre_man.select_most_viewed(datetime(2026, 10, 17), limit=10)
+    }
+    assert views == {first: 5, second: 1, third: 0}
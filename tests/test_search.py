@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import pytest
+
+from article.service import PostgresDataManager
+
+
+pytestmark = [pytest.mark.postgres, pytest.mark.anyio]
+
+
+def row(number: int, title: str) -> dict:
+    return {
+        "category": "science",
+        "title": title,
+        "description": "description",
+        "url": f"https://example.com/{number}",
+        "published_at": datetime(2026, 10, 17, 10, number),
+        "content": "content",
+    }
+
+
+@pytest.fixture
+async def articles(postgres):
+    postgre_man = PostgresDataManager()
+    await postgre_man.insert_rows(
+        [
+            row(1, "comet comet comet over the city"),
+            row(2, "quiet day"),
+            row(3, "comet seen"),
+            row(4, "comet and comet again"),
+        ]
+    )
+    return postgre_man
+
+
+async def test_best_ranked_first(articles):
+    found = await articles.search_articles("comet")
+
+    assert [article.title for article in found] == [
+        "comet comet comet over the city",
+        "comet and comet again",
+        "comet seen",
+    ]
+
+
+async def test_only_the_newest_candidates_are_ranked(articles):
+    found = await articles.search_articles("comet", candidates=2)
+
+    assert [article.title for article in found] == ["comet and comet again", "comet seen"]
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import pytest
+
+from article.service import ArticleSearch
+from article.utils import CircuitBreaker
+
+
+pytestmark = pytest.mark.anyio
+
+
+class RankedMatches:
+    ''' Stands in for PostgresDataManager.search_articles over the ranked candidates '''
+    def __init__(self, count: int):
+        self.rows = [
+            SimpleNamespace(id=number, title=f"Comet {number}", category="science", views=0)
+            for number in range(count, 0, -1)
+        ]
+        self.calls = []
+
+    async def search_articles(self, query_text, offset=0, limit=20, candidates=1000):
+        self.calls.append((offset, limit))
+        return self.rows[:candidates][offset:offset + limit]
+
+
+@pytest.mark.parametrize(
+    ("page", "ids", "next_page", "calls"),
+    [
+        (1, [10, 9], 2, [(0, 3)]),
+        (3, [6], None, [(4, 1)]),
+        # past the ranked candidates, Postgres is not asked
+        (4, [], None, []),
+    ],
+)
+async def test_pages_end_at_the_ranked_candidates(redis_man, page, ids, next_page, calls):
+    postgre_man = RankedMatches(10)
+    search = ArticleSearch(redis_man, postgre_man, CircuitBreaker(), rank_candidates=5)
+
+    search_page = await search.search("comet", page=page, page_size=2)
+
+    assert [article.id for article in search_page.articles] == ids
+    assert search_page.next_page == next_page
+    assert postgre_man.calls == calls
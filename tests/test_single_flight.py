@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from article.service import SingleFlight
+
+
+pytestmark = pytest.mark.anyio
+
+
+class Fill:
+    ''' A fill that re-checks its cache like the loader fills do '''
+    def __init__(self, cache: dict, delay: float = 0.05, error: Exception | None = None):
+        self.cache = cache
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.loads = 0
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        if "listing" in self.cache:
+            return self.cache["listing"]
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        self.loads += 1
+        self.cache["listing"] = "rows"
+        return "rows"
+
+
+async def test_concurrent_callers_share_one_fill():
+    single_flight = SingleFlight()
+    fill = Fill({})
+
+    results = await asyncio.gather(*[single_flight.do("day", fill) for _ in range(10)])
+
+    assert results == ["rows"] * 10
+    assert fill.calls == 1
+    assert single_flight.stats() == {
+        "in_flight": 0, "leaders_total": 1, "coalesced_total": 9, "coalesced_remote_total": 0,
+    }
+
+
+async def test_other_worker_waits_for_the_lock_and_reads_the_cache(redis_man):
+    # two workers share Redis and the cache, not the in-process futures
+    first = SingleFlight(redis_man.client, poll_interval=0.01)
+    second = SingleFlight(redis_man.client, poll_interval=0.01)
+    fill = Fill({})
+
+    async def second_worker() -> str:
+        await asyncio.sleep(0.01)
+        return await second.do("day", fill)
+
+    results = await asyncio.gather(first.do("day", fill), second_worker())
+
+    assert results == ["rows", "rows"]
+    assert fill.loads == 1
+    assert second.coalesced_remote_total == 1
+    assert not await redis_man.client.exists("lock:fill:day")
+
+
+async def test_leader_error_reaches_the_waiters():
+    single_flight = SingleFlight()
+    fill = Fill({}, error=ValueError("Postgres is down"))
+
+    results = await asyncio.gather(
+        *[single_flight.do("day", fill) for _ in range(3)], return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert fill.calls == 1
+    assert single_flight.stats()["in_flight"] == 0
+
+
+async def test_waiters_retry_after_the_leader_is_cancelled():
+    single_flight = SingleFlight()
+    fill = Fill({})
+    leader = asyncio.create_task(single_flight.do("day", fill))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(single_flight.do("day", fill)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+
+    leader.cancel()
+
+    assert await asyncio.gather(*waiters) == ["rows"] * 3
+    assert leader.cancelled()
+    # the cancelled leader and the waiter that took over
+    assert fill.calls == 2 and fill.loads == 1
+
+
+async def test_cancelled_waiter_does_not_cancel_the_fill():
+    single_flight = SingleFlight()
+    fill = Fill({})
+    leader = asyncio.create_task(single_flight.do("day", fill))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(single_flight.do("day", fill))
+    await asyncio.sleep(0.01)
+
+    waiter.cancel()
+
+    assert await leader == "rows"
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
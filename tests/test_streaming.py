@@ -0,0 +1,84 @@
+import asyncio
+
+import aiohttp
+import pytest
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+
+from article.api.router import article_router
+from article.schemas import CacheStatus, DisplayOnPageArticleSchema, ListingFreshnessSchema
+from article.service import PageCache, StreamedListing
+from article.utils import CircuitBreaker
+from core import settings
+
+
+pytestmark = pytest.mark.anyio
+
+
+class SlowListing:
+    ''' Stands in for ArticleLoader.stream_listing, the listing is read once released '''
+    def __init__(self, count: int):
+        self.articles = [
+            DisplayOnPageArticleSchema(
+                id=number, title=f"Article {number}", category="science", views=0
+            )
+            for number in range(1, count + 1)
+        ]
+        self.released = asyncio.Event()
+        self.reads = 0
+
+    async def stream_listing(self, days, category, cursor=None, page_size=30):
+        self.reads += 1
+        await self.released.wait()
+
+        async def chunks():
+            for start in range(0, len(self.articles), 10):
+                yield self.articles[start:start + 10]
+
+        return StreamedListing(
+            chunks(), "next-cursor", ListingFreshnessSchema(status=CacheStatus.miss)
+        )
+
+
+@pytest.fixture
+async def streaming_app(monkeypatch, serve, redis_man):
+    monkeypatch.setattr(settings.pages, "streaming", True)
+    app = FastAPI()
+    app.mount("/static", StaticFiles(directory="static"), name="static")
+    app.include_router(article_router)
+    app.state.redis_man = redis_man
+    app.state.redis_breaker = CircuitBreaker()
+    app.state.page_cache = PageCache()
+    app.state.article_loader = SlowListing(25)
+    return app, await serve(app)
+
+
+async def test_head_is_sent_before_the_listing_is_read(streaming_app):
+    app, base_url = streaming_app
+    loader = app.state.article_loader
+
+    async with aiohttp.ClientSession(base_url=base_url) as session:
+        async with session.get("/articles/all") as response:
+            head = await response.content.readany()
+            assert b"<head>" in head and b"article_link" not in head
+            assert "X-Cache" not in response.headers
+            assert loader.reads == 1 and not loader.released.is_set()
+            loader.released.set()
+            page = head + await response.read()
+
+    assert page.count(b'class="article_link"') == 25
+    assert b"cursor=next-cursor" in page
+    assert app.state.page_cache.stats()["pages"] == 1
+
+
+async def test_page_over_the_cap_is_not_cached(monkeypatch, streaming_app):
+    monkeypatch.setattr(settings.pages, "stream_cache_bytes", 1024)
+    app, base_url = streaming_app
+    app.state.article_loader.released.set()
+
+    async with aiohttp.ClientSession(base_url=base_url) as session:
+        async with session.get("/articles/all") as response:
+            page = await response.read()
+
+    assert len(page) > 1024 and page.count(b'class="article_link"') == 25
+    assert app.state.page_cache.stats()["pages"] == 0
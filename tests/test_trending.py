@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from article.service import TrendingRebuilder
+
+
+pytestmark = pytest.mark.anyio
+
+
+def listing_row(id_article: int, views: int, category: str = "science") -> SimpleNamespace:
+    return SimpleNamespace(
+        id=id_article,
+        title=f"Article {id_article}",
+        category=category,
+        views=views,
+        published_at=datetime(2026, 10, 17, 12, 0, id_article % 60),
+    )
+
+
+class MostViewed:
+    ''' Stands in for PostgresDataManager.select_most_viewed '''
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.calls = 0
+
+    async def select_most_viewed(self, published_since, limit):
+        self.calls += 1
+        return self.rows
+
+
+def today() -> str:
+    return f"{datetime.now(timezone.utc):%Y-%m-%d}"
+
+
+async def leaderboard(redis_man, category: str | None = None) -> list[int]:
+    members = await redis_man.client.zrange(redis_man.trending_key(today(), category), 0, -1)
+    return [int(member) for member in members]
+
+
+async def test_views_of_uncached_ids_are_not_ranked(redis_man):
+    await redis_man.insert_articles([listing_row(1, 0)])
+
+    await redis_man.count_view(1)
+    await redis_man.count_view(999)
+
+    assert await leaderboard(redis_man) == [1]
+    assert await leaderboard(redis_man, "science") == [1]
+
+
+async def test_rebuild_runs_once_even_after_views_recreated_the_set(redis_man):
+    postgre_man = MostViewed([listing_row(1, 50), listing_row(2, 10, "health")])
+    rebuilder = TrendingRebuilder(redis_man, postgre_man)
+    await redis_man.insert_articles([listing_row(3, 0)])
+    await redis_man.count_view(3)
+
+    assert await rebuilder.rebuild_if_missing() is True
+    assert await rebuilder.rebuild_if_missing() is False
+    assert postgre_man.calls == 1
+    assert sorted(await leaderboard(redis_man)) == [1, 2, 3]
+
+
+async def test_rebuild_writes_only_the_article_hashes(redis_man):
+    rebuilder = TrendingRebuilder(redis_man, MostViewed([listing_row(1, 50)]))
+
+    await rebuilder.rebuild_if_missing()
+
+    keys = {key.decode() for key in await redis_man.client.keys("article:*")}
+    assert "article:id:1" in keys
+    assert not [key for key in keys if key.startswith(("article:date:", "article:category:", "article:fresh:"))]
+
+
+async def test_empty_rebuild_is_retried(redis_man):
+    postgre_man = MostViewed([])
+    rebuilder = TrendingRebuilder(redis_man, postgre_man)
+
+    assert await rebuilder.rebuild_if_missing() is False
+    postgre_man.rows = [listing_row(1, 5)]
+
+    assert await rebuilder.rebuild_if_missing() is True
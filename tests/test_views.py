@@ -0,0 +1,76 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+
+from article.service import ViewCounter
+from article.service.redis import PENDING_VIEWS_KEY
+from article.service.views import FLUSHING_VIEWS_KEY
+from article.utils import CircuitBreaker
+
+
+pytestmark = pytest.mark.anyio
+
+
+def listing_row(id_article: int, views: int = 0) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=id_article,
+        title=f"Article {id_article}",
+        category="science",
+        views=views,
+        published_at=datetime(2026, 10, 17, 12, 0),
+    )
+
+
+class ViewDeltas:
+    ''' Stands in for PostgresDataManager.increment_views, fails the first `failures` calls '''
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.applied: list[dict[int, int]] = []
+
+    async def increment_views(self, deltas: dict[int, int]) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise SQLAlchemyError("БД не отвечает")
+        self.applied.append(deltas)
+
+
+async def test_refill_keeps_the_views_not_yet_flushed(redis_man):
+    await redis_man.insert_articles([listing_row(1)])
+    await redis_man.count_view(1)
+    await redis_man.count_view(1)
+
+    # a fill or a refresh reads Postgres before the flush
+    await redis_man.insert_articles([listing_row(1, views=0)])
+
+    assert await redis_man.client.hget("article:id:1", "views") == b"2"
+
+
+async def test_flush_moves_the_pending_deltas(redis_man):
+    postgre_man = ViewDeltas()
+    view_counter = ViewCounter(redis_man, postgre_man, CircuitBreaker())
+    await redis_man.insert_articles([listing_row(1), listing_row(2)])
+    for id_article in (1, 1, 2):
+        await view_counter.count_view(id_article)
+
+    assert await view_counter.flush() == 3
+    assert postgre_man.applied == [{1: 2, 2: 1}]
+    assert not await redis_man.client.exists(PENDING_VIEWS_KEY, FLUSHING_VIEWS_KEY)
+    assert await view_counter.flush() == 0
+
+
+async def test_failed_flush_is_delivered_again_before_new_views(redis_man):
+    postgre_man = ViewDeltas(failures=1)
+    view_counter = ViewCounter(redis_man, postgre_man, CircuitBreaker())
+    await redis_man.insert_articles([listing_row(1), listing_row(2)])
+    await view_counter.count_view(1)
+
+    with pytest.raises(SQLAlchemyError):
+        await view_counter.flush()
+    await view_counter.count_view(2)
+
+    assert await view_counter.flush() == 1
+    assert await view_counter.flush() == 1
+    assert postgre_man.applied == [{1: 1}, {2: 1}]
+    assert view_counter.stats()["flushed_views_total"] == 2